@@ -0,0 +1,335 @@
+"""
+Compute BVC and HD activations for every step of a recorded trajectory.
+
+Usage:
+    python activation_pipeline.py recordings/run.traj --out activations \
+        --chunk-size 4096 --workers 4
+"""
+
+import os
+import argparse
+import json
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from recorder import TrajectoryReader
+from rate_map import RateMapAccumulator
+from world_compiler import parse_world
+
+from AlabiHippocampalModel.layers.head_direction_layer import HeadDirectionLayer
+from AlabiHippocampalModel.layers.boundary_vector_cell_layer import (
+    BoundaryVectorCellLayer,
+)
+
+
+class BatchedBVC:
+    """
+    BoundaryVectorCellLayer.get_bvc_activation applied to many scans at once.
+
+    Built from a layer's tuning parameters, so a chunk of C scans becomes a
+    handful of (C, num_bvc) array operations. The beam angles are the same
+    for every scan, so the angular tuning term is computed once up front.
+    Holds only NumPy arrays and can be sent to worker processes.
+    """
+
+    def __init__(self, layer: BoundaryVectorCellLayer, angles: np.ndarray) -> None:
+        """
+        Initialize the BatchedBVC.
+
+        Args:
+            layer (BoundaryVectorCellLayer): Layer whose cells to reproduce.
+            angles (np.ndarray): LiDAR beam angles in radians.
+        """
+        self.input_indices = np.asarray(layer.input_indices)
+        self.d_i = np.asarray(layer.d_i, dtype=np.float64).ravel()
+        sigma_d = float(layer.sigma_d)
+        sigma_ang = float(layer.sigma_ang)
+        self.distance_scale = -1 / (2 * sigma_d**2)
+        self.distance_norm = 1 / np.sqrt(2 * np.pi * sigma_d**2)
+        phi_i = np.asarray(layer.phi_i, dtype=np.float64).ravel()
+        angles = np.asarray(angles, dtype=np.float64)
+        self.angular = np.exp(
+            -((angles[self.input_indices] - phi_i) ** 2) / (2 * sigma_ang**2)
+        ) / np.sqrt(2 * np.pi * sigma_ang**2)
+        self.num_cells = len(self.d_i)
+
+    def __call__(self, ranges: np.ndarray) -> np.ndarray:
+        """
+        Compute BVC activations.
+
+        Args:
+            ranges (np.ndarray): (C, num_beams) LiDAR ranges.
+
+        Returns:
+            np.ndarray: (C, num_bvc) activations.
+        """
+        offsets = ranges[:, self.input_indices] - self.d_i
+        offsets *= offsets
+        offsets *= self.distance_scale
+        np.exp(offsets, out=offsets)
+        offsets *= self.distance_norm * self.angular
+        return offsets
+
+
+class BatchedHD:
+    """
+    HeadDirectionLayer.get_head_direction_activation applied to many
+    headings at once, as one (C, 2) x (2, num_cells) product.
+    """
+
+    def __init__(self, layer: HeadDirectionLayer) -> None:
+        """
+        Initialize the BatchedHD.
+
+        Args:
+            layer (HeadDirectionLayer): Layer whose cells to reproduce.
+        """
+        self.tuning_kernel = np.asarray(layer.tuning_kernel, dtype=np.float64)
+        self.num_cells = self.tuning_kernel.shape[1]
+
+    def __call__(self, directions: np.ndarray) -> np.ndarray:
+        """
+        Compute HD activations.
+
+        Args:
+            directions (np.ndarray): (C,) headings in degrees.
+
+        Returns:
+            np.ndarray: (C, num_cells) activations.
+        """
+        theta = np.deg2rad(directions)
+        return np.stack([np.cos(theta), np.sin(theta)], axis=1) @ self.tuning_kernel
+
+
+def make_layers(num_beams: int) -> tuple[BoundaryVectorCellLayer, HeadDirectionLayer]:
+    """
+    Build the layers with the parameters main.py plots.
+
+    Args:
+        num_beams (int): Number of LiDAR beams, the BVC input dimension.
+
+    Returns:
+        tuple: (BoundaryVectorCellLayer, HeadDirectionLayer)
+    """
+    bvc_layer = BoundaryVectorCellLayer(
+        max_dist=300, input_dim=num_beams, n_hd=8, sigma_ang=90, sigma_d=20
+    )
+    hd_layer = HeadDirectionLayer(num_cells=8, theta_0=0.0, unit="degree")
+    return bvc_layer, hd_layer
+
+
+def check_against_layers(
+    bvc: BatchedBVC,
+    hd: BatchedHD,
+    bvc_layer: BoundaryVectorCellLayer,
+    hd_layer: HeadDirectionLayer,
+    reader: TrajectoryReader,
+    angles: np.ndarray,
+) -> None:
+    """
+    Compare the batched cells with the layers on the first recorded step.
+
+    Raises:
+        ValueError: If the batched activations do not match, e.g. because
+            the layer implementation has changed.
+    """
+    ranges = reader.ranges(slice(0, 1))
+    direction = float(reader[0]["direction"])
+    expected_bvc = np.asarray(bvc_layer.get_bvc_activation(ranges[0], angles))
+    expected_hd = np.asarray(hd_layer.get_head_direction_activation(theta_i=direction))
+    if not np.allclose(bvc(ranges)[0], expected_bvc.ravel(), rtol=1e-5, atol=1e-12):
+        raise ValueError("Batched BVC activations do not match the layer")
+    if not np.allclose(hd(np.array([direction]))[0], expected_hd.ravel(), atol=1e-9):
+        raise ValueError("Batched HD activations do not match the layer")
+
+
+def _process_chunk(
+    path: str,
+    start: int,
+    stop: int,
+    bvc: BatchedBVC,
+    hd: BatchedHD,
+    bvc_path: str,
+    hd_path: str,
+) -> int:
+    """
+    Compute one chunk of steps and write it into the output arrays.
+
+    Opens the trajectory and outputs itself, so it runs the same in the
+    calling process or in a worker.
+
+    Returns:
+        int: Number of steps processed.
+    """
+    reader = TrajectoryReader(path)
+    bvc_out = np.load(bvc_path, mmap_mode="r+")
+    hd_out = np.load(hd_path, mmap_mode="r+")
+    bvc_out[start:stop] = bvc(reader.ranges(slice(start, stop)))
+    hd_out[start:stop] = hd(np.asarray(reader[start:stop]["direction"]))
+    bvc_out.flush()
+    hd_out.flush()
+    return stop - start
+
+
+def recording_bounds(reader: TrajectoryReader) -> tuple | None:
+    """
+    Get the arena bounds of the world a recording was made in.
+
+    Args:
+        reader (TrajectoryReader): The recording.
+
+    Returns:
+        tuple: (left, top, right, bottom) from the recording's metadata, or
+            else from its world file if that still exists. None if neither
+            gives bounds, meaning the default arena.
+    """
+    metadata = reader.metadata
+    if metadata.get("bounds") is not None:
+        return tuple(metadata["bounds"])
+    world = metadata.get("world")
+    if world and os.path.exists(world):
+        with open(world, "r") as f:
+            _, bounds = parse_world(json.load(f))
+        return bounds
+    return None
+
+
+def accumulate_rate_maps(
+    reader: TrajectoryReader,
+    activations: np.ndarray,
+    bin_size: float,
+    chunk_size: int = 4096,
+) -> RateMapAccumulator:
+    """
+    Bin per-step activations by the recorded positions.
+
+    The map covers the arena of the recording's world, see recording_bounds.
+
+    Args:
+        reader (TrajectoryReader): The recording the activations came from.
+        activations (np.ndarray): (steps, cells) activations, typically
+            memory-mapped.
+        bin_size (float): Side length of a bin in pixels.
+        chunk_size (int, optional): Steps added at a time. Defaults to 4096.
+
+    Returns:
+        RateMapAccumulator: The filled accumulator.
+    """
+    rate_maps = RateMapAccumulator(
+        activations.shape[1], bin_size, recording_bounds(reader)
+    )
+    for start in range(0, len(reader), chunk_size):
+        records = reader[start : start + chunk_size]
+        rate_maps.add(
+            records["x"], records["y"], activations[start : start + chunk_size]
+        )
+    return rate_maps
+
+
+def run_pipeline(
+    path: str,
+    out_dir: str,
+    chunk_size: int = 4096,
+    workers: int = 0,
+    dtype: str = "float32",
+    angles: np.ndarray | None = None,
+    rate_map_bin: float | None = None,
+) -> dict:
+    """
+    Stream a trajectory through the BVC and HD layers into .npy files.
+
+    Peak memory is a few chunks of ranges and activations regardless of the
+    length of the recording. Outputs are created with open_memmap, so they
+    can be read back with np.load(..., mmap_mode="r").
+
+    Args:
+        path (str): Trajectory file written by TrajectoryRecorder.
+        out_dir (str): Directory for bvc.npy and hd.npy.
+        chunk_size (int, optional): Steps per chunk. Defaults to 4096.
+        workers (int, optional): Worker processes; 0 processes chunks in
+            this process. Defaults to 0.
+        dtype (str, optional): Output dtype. Defaults to "float32".
+        angles (np.ndarray, optional): Beam angles in radians. Defaults to
+            num_beams evenly spaced angles, as in Agent.
+        rate_map_bin (float, optional): If given, also save occupancy and
+            rate maps with bins of this size to bvc_rate_maps.npz and
+            hd_rate_maps.npz.
+
+    Returns:
+        dict: Output paths, step count and elapsed seconds.
+    """
+    start_time = time.perf_counter()
+    reader = TrajectoryReader(path)
+    num_beams = reader.header["num_beams"]
+    if angles is None:
+        angles = np.deg2rad(np.arange(num_beams) * (360 / num_beams))
+
+    bvc_layer, hd_layer = make_layers(num_beams)
+    bvc = BatchedBVC(bvc_layer, angles)
+    hd = BatchedHD(hd_layer)
+    if len(reader):
+        check_against_layers(bvc, hd, bvc_layer, hd_layer, reader, angles)
+
+    os.makedirs(out_dir, exist_ok=True)
+    bvc_path = os.path.join(out_dir, "bvc.npy")
+    hd_path = os.path.join(out_dir, "hd.npy")
+    count = len(reader)
+    for out_path, width in ((bvc_path, bvc.num_cells), (hd_path, hd.num_cells)):
+        out = np.lib.format.open_memmap(
+            out_path, mode="w+", dtype=dtype, shape=(count, width)
+        )
+        del out
+
+    chunks = [
+        (path, start, min(start + chunk_size, count), bvc, hd, bvc_path, hd_path)
+        for start in range(0, count, chunk_size)
+    ]
+    if workers:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(_process_chunk, *zip(*chunks)))
+    else:
+        for chunk in chunks:
+            _process_chunk(*chunk)
+
+    result = {"bvc": bvc_path, "hd": hd_path, "steps": count}
+    if rate_map_bin:
+        for name, out_path in (("bvc", bvc_path), ("hd", hd_path)):
+            rate_maps = accumulate_rate_maps(
+                reader, np.load(out_path, mmap_mode="r"), rate_map_bin, chunk_size
+            )
+            result[f"{name}_rate_maps"] = os.path.join(
+                out_dir, f"{name}_rate_maps.npz"
+            )
+            rate_maps.save(result[f"{name}_rate_maps"])
+    result["seconds"] = time.perf_counter() - start_time
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("trajectory")
+    parser.add_argument("--out", default="activations")
+    parser.add_argument("--chunk-size", type=int, default=4096)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--dtype", default="float32")
+    parser.add_argument(
+        "--rate-map-bin", type=float, default=None, help="Also save rate maps."
+    )
+    args = parser.parse_args()
+
+    result = run_pipeline(
+        args.trajectory,
+        args.out,
+        args.chunk_size,
+        args.workers,
+        args.dtype,
+        rate_map_bin=args.rate_map_bin,
+    )
+    print(
+        f"{result['steps']} steps in {result['seconds']:.2f} s, "
+        f"activations written to {result['bvc']} and {result['hd']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
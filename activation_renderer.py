@@ -0,0 +1,238 @@
+import numpy as np
+import pygame
+from constants import BLACK, BLUE, RED
+
+# Anchor colors of matplotlib's viridis map, interpolated into a lookup table
+VIRIDIS_ANCHORS = np.array(
+    [
+        (68, 1, 84),
+        (59, 82, 139),
+        (33, 145, 140),
+        (94, 201, 98),
+        (253, 231, 37),
+    ],
+    dtype=np.float64,
+)
+
+
+def make_colormap(anchors: np.ndarray = VIRIDIS_ANCHORS, size: int = 256) -> np.ndarray:
+    """
+    Build a color lookup table by interpolating between anchor colors.
+
+    Args:
+        anchors (np.ndarray): (A, 3) RGB anchor colors, evenly spaced.
+        size (int, optional): Number of entries in the table. Defaults to 256.
+
+    Returns:
+        np.ndarray: (size, 3) uint8 RGB table.
+    """
+    positions = np.linspace(0, 1, len(anchors))
+    samples = np.linspace(0, 1, size)
+    return np.stack(
+        [np.interp(samples, positions, anchors[:, c]) for c in range(3)], axis=1
+    ).astype(np.uint8)
+
+
+class ActivationPanel:
+    """
+    Draws activation vectors straight onto a preallocated pygame surface.
+
+    Replaces the matplotlib figure -> PNG -> PIL -> pygame round trip used by
+    plot_to_surface. Geometry that only depends on the number of cells
+    (wedges, pixel-to-cell maps) and the buffers it is drawn through are
+    built once per layout and reused every frame.
+    """
+
+    def __init__(
+        self,
+        size: tuple[int, int] = (400, 300),
+        background: tuple[int, int, int] = (200, 200, 200),
+    ) -> None:
+        """
+        Initialize the ActivationPanel.
+
+        Args:
+            size (tuple, optional): (width, height) of the panel. Defaults to (400, 300).
+            background (tuple, optional): RGB background color.
+        """
+        self.size = size
+        self.background = background
+        self.surface = pygame.Surface(size)
+        # One palette slot is kept for the background
+        self.colormap = make_colormap(size=255)
+        self.font = pygame.font.Font(None, 24)
+        self.title_height = 24
+        width, height = size
+        self.center = (width / 2, self.title_height + (height - self.title_height) / 2)
+        self.radius = min(width, height - self.title_height) / 2 - 8
+        self._titles: dict[str, pygame.Surface] = {}
+        self._wedges: dict[int, np.ndarray] = {}
+        self._layouts: dict[tuple, tuple] = {}
+
+    def _begin(self, title: str) -> None:
+        """Clear the panel and draw its title."""
+        self.surface.fill(self.background)
+        if title not in self._titles:
+            self._titles[title] = self.font.render(title, True, BLACK)
+        text = self._titles[title]
+        self.surface.blit(text, ((self.size[0] - text.get_width()) // 2, 4))
+
+    def draw_radial(self, values: np.ndarray, title: str = "") -> pygame.Surface:
+        """
+        Draw one wedge per cell, evenly spaced around the circle.
+
+        Wedge length is proportional to |value|; positive values are blue and
+        negative values red. Suited to head direction cells.
+
+        Args:
+            values (np.ndarray): (N,) activation of every cell, cell i
+                preferring direction 360 * i / N degrees.
+            title (str, optional): Text drawn above the plot.
+
+        Returns:
+            pygame.Surface: The panel surface.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        count = len(values)
+        if count not in self._wedges:
+            centers = 2 * np.pi * np.arange(count) / count
+            half = 0.4 * 2 * np.pi / count
+            angles = np.stack([centers, centers - half, centers + half], axis=1)
+            radii = np.array([0.0, 1.0, 1.0])
+            unit = np.stack([np.cos(angles), -np.sin(angles)], axis=-1)
+            self._wedges[count] = unit * radii[None, :, None]
+
+        self._begin(title)
+        for fraction in (1 / 3, 2 / 3, 1):
+            pygame.draw.circle(
+                self.surface, BLACK, self.center, self.radius * fraction, 1
+            )
+        scale = np.abs(values).max()
+        lengths = np.abs(values) * (self.radius / scale if scale > 0 else 0)
+        points = self._wedges[count] * lengths[:, None, None] + self.center
+        for polygon, value in zip(points, values):
+            pygame.draw.polygon(self.surface, BLUE if value >= 0 else RED, polygon)
+        return self.surface
+
+    def draw_polar(
+        self, values: np.ndarray, shape: tuple[int, int], title: str = ""
+    ) -> pygame.Surface:
+        """
+        Draw cells as colored sectors of a polar grid.
+
+        Row i of the grid is the direction 360 * i / rows degrees and column j
+        the j-th distance ring, which matches the layout of boundary vector
+        cells.
+
+        Args:
+            values (np.ndarray): Activation of every cell, row-major.
+            shape (tuple): (rows, columns); one entry may be -1.
+            title (str, optional): Text drawn above the plot.
+
+        Returns:
+            pygame.Surface: The panel surface.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        rows, cols = self._grid_shape(len(values), shape)
+        key = ("polar", rows, cols)
+        if key not in self._layouts:
+            diameter = int(2 * self.radius)
+            offset = (
+                int(self.center[0] - self.radius),
+                int(self.center[1] - self.radius),
+            )
+            dx = np.arange(diameter)[:, None] + 0.5 - self.radius
+            dy = np.arange(diameter)[None, :] + 0.5 - self.radius
+            angle = np.arctan2(-dy, dx) % (2 * np.pi)
+            row = np.rint(angle / (2 * np.pi / rows)).astype(np.intp) % rows
+            col = (np.hypot(dx, dy) / self.radius * cols).astype(np.intp)
+            cell_of_pixel = np.where(col < cols, row * cols + col, rows * cols)
+            self._layouts[key] = self._make_layout(cell_of_pixel, rows * cols, offset)
+
+        self._begin(title)
+        self._blit_cells(self._layouts[key], values)
+        return self.surface
+
+    def draw_heatmap(
+        self, values: np.ndarray, shape: tuple[int, int], title: str = ""
+    ) -> pygame.Surface:
+        """
+        Draw cells as a heatmap, one row of the grid per row of cells.
+
+        Args:
+            values (np.ndarray): Activation of every cell, row-major.
+            shape (tuple): (rows, columns); one entry may be -1.
+            title (str, optional): Text drawn above the plot.
+
+        Returns:
+            pygame.Surface: The panel surface.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        rows, cols = self._grid_shape(len(values), shape)
+        key = ("heatmap", rows, cols)
+        if key not in self._layouts:
+            width = self.size[0] - 16
+            height = self.size[1] - self.title_height - 8
+            column = np.arange(width) * cols // width
+            row = np.arange(height) * rows // height
+            cell_of_pixel = row[None, :] * cols + column[:, None]
+            self._layouts[key] = self._make_layout(
+                cell_of_pixel, rows * cols, (8, self.title_height)
+            )
+
+        self._begin(title)
+        self._blit_cells(self._layouts[key], values)
+        return self.surface
+
+    def _make_layout(
+        self, cell_of_pixel: np.ndarray, count: int, offset: tuple[int, int]
+    ) -> tuple:
+        """
+        Allocate the buffers for drawing cells through a pixel-to-cell map.
+
+        Args:
+            cell_of_pixel (np.ndarray): (width, height) cell index of every
+                pixel; index count marks background.
+            count (int): Number of cells.
+            offset (tuple): Where the image goes on the panel.
+
+        Returns:
+            tuple: (image, cell_of_pixel, cell_levels, pixels, offset)
+        """
+        image = pygame.Surface(cell_of_pixel.shape, depth=8)
+        image.set_palette([*map(tuple, self.colormap), self.background])
+        cell_levels = np.empty(count + 1, dtype=np.uint8)
+        cell_levels[-1] = len(self.colormap)
+        pixels = np.empty(cell_of_pixel.shape, dtype=np.uint8)
+        return image, cell_of_pixel, cell_levels, pixels, offset
+
+    def _blit_cells(self, layout: tuple, values: np.ndarray) -> None:
+        """
+        Color every pixel by the value of its cell and blit the result.
+
+        The image is an 8-bit surface whose palette is the colormap, so only
+        one byte per pixel is written and no image is encoded or decoded.
+        """
+        image, cell_of_pixel, cell_levels, pixels, offset = layout
+        cell_levels[:-1] = self._levels(values)
+        np.take(cell_levels, cell_of_pixel, out=pixels)
+        pygame.surfarray.blit_array(image, pixels)
+        self.surface.blit(image, offset)
+
+    @staticmethod
+    def _grid_shape(count: int, shape: tuple[int, int]) -> tuple[int, int]:
+        """Resolve a -1 entry in (rows, columns) from the number of cells."""
+        rows, cols = shape
+        if rows == -1:
+            rows = count // cols
+        elif cols == -1:
+            cols = count // rows
+        if rows * cols != count:
+            raise ValueError(f"Cannot lay out {count} cells as {shape}")
+        return rows, cols
+
+    def _levels(self, values: np.ndarray) -> np.ndarray:
+        """Map values to colormap indices, spreading min..max over the table."""
+        low, high = values.min(), values.max()
+        span = high - low if high > low else 1.0
+        return ((values - low) * ((len(self.colormap) - 1) / span)).astype(np.uint8)
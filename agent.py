@@ -1,12 +1,10 @@
 import math
+import numpy as np
 import pygame
-from constants import (
-    LEFT_BOUNDARY,
-    RIGHT_BOUNDARY,
-    TOP_BOUNDARY,
-    BOTTOM_BOUNDARY,
-    RED,
-)
+from constants import RED
+from lidar import arena_bounds, make_lidar
+from collision import free_distance, free_distance_scalar, wall_rects
+from scan_cache import ScanCache
 
 
 class Agent:
@@ -17,6 +15,10 @@ class Agent:
     It also has collision detection with walls and boundaries.
     """
 
+    # Worlds up to this many walls are swept in plain Python, larger ones
+    # with NumPy
+    SCALAR_SWEEP_LIMIT = 64
+
     def __init__(
         self,
         x: float,
@@ -24,6 +26,10 @@ class Agent:
         direction: float,
         walls: list,
         num_lidar_beams: int = 360,
+        lidar_backend: str = "python",
+        scan_cache: ScanCache | None = None,
+        bounds: tuple[float, float, float, float] | None = None,
+        reuse_rotated_scans: bool = True,
     ) -> None:
         """
         Initialize the Agent.
@@ -32,8 +38,23 @@ class Agent:
             x (float): Initial x-coordinate of the agent.
             y (float): Initial y-coordinate of the agent.
             direction (float): Initial direction of the agent in degrees.
-            walls (list): List of Wall objects in the environment.
+            walls (list): List of Wall objects in the environment, or a
+                CompiledWorld.
             num_lidar_beams (int, optional): Number of LiDAR beams. Defaults to 360.
+            lidar_backend (str, optional): "python" for the reference per-beam
+                scan, or the name of an engine registered in lidar.py such as
+                "numpy" or "grid". Defaults to "python".
+            scan_cache (ScanCache, optional): Cache of scans keyed on the pose.
+                It is cleared whenever walls are replaced. Defaults to None.
+            bounds (tuple, optional): (left, top, right, bottom) of the arena.
+                Defaults to the bounds of a CompiledWorld, else the bounds
+                in constants.py.
+            reuse_rotated_scans (bool, optional): Let scan rotate the last
+                scan when the agent has only turned, see rotate_last_scan.
+                Reused ranges can differ from a fresh scan by a fraction of
+                a pixel, so turn this off where scans must not depend on
+                history, e.g. recordings or comparisons against VectorEnv.
+                Defaults to True.
         """
         self.x = x
         self.y = y
@@ -45,54 +66,288 @@ class Agent:
         self.lidar_angles = [
             i * (360 / num_lidar_beams) for i in range(num_lidar_beams)
         ]
-        self.lidar_ranges: list[float] = []
+        self.lidar_ranges: list[float] | np.ndarray = []
         self.lidar_visible = False
+        self.lidar_draw_step = 1  # Draw every k-th beam
+        self._lidar_marker: pygame.Surface | None = None
         self.bump_sensor = False
+        self.scan_cache = scan_cache
+        self.reuse_rotated_scans = reuse_rotated_scans
+        # Pose, world and ranges of the last scan, for reusing it on rotation
+        self._last_scan: tuple | None = None
+        self.world_version = 0
+        self._bounds = tuple(bounds) if bounds is not None else arena_bounds()
+        self.lidar_backend = lidar_backend
         self.walls = walls
 
-    def draw(self, screen: pygame.Surface) -> None:
+    @property
+    def walls(self) -> list:
+        """Walls the agent scans and collides against, a list of Wall objects or a CompiledWorld."""
+        return self._walls
+
+    @walls.setter
+    def walls(self, walls: list) -> None:
+        self._walls = walls
+        # A compiled world brings the arena it was built for
+        if hasattr(walls, "bounds"):
+            self._bounds = tuple(walls.bounds)
+        self.rebuild_geometry()
+
+    @property
+    def bounds(self) -> tuple[float, float, float, float]:
+        """(left, top, right, bottom) of the arena the agent is confined to."""
+        return self._bounds
+
+    @bounds.setter
+    def bounds(self, bounds: tuple[float, float, float, float]) -> None:
+        self._bounds = tuple(bounds)
+        self.rebuild_geometry()
+
+    @property
+    def lidar_backend(self) -> str:
+        """Name of the engine used by scan()."""
+        return self._lidar_backend
+
+    @lidar_backend.setter
+    def lidar_backend(self, backend: str) -> None:
+        self._lidar_backend = backend
+        if hasattr(self, "_walls"):
+            self.rebuild_geometry()
+
+    def rebuild_geometry(self) -> None:
+        """
+        Rebuild the LiDAR engine and collision arrays from the current walls.
+
+        Called automatically when walls or the backend are replaced. Call it
+        manually after mutating the wall list in place. Bumps world_version
+        and clears the scan cache, since earlier scans may now be stale.
+        """
+        self.world_version += 1
+        if self.scan_cache is not None:
+            self.scan_cache.clear()
+        self._last_scan = None
+
+        self._rects = wall_rects(self._walls)
+        # Only small worlds are swept in Python, see try_move
+        self._rect_list = (
+            [tuple(rect) for rect in self._rects.tolist()]
+            if len(self._rects) <= self.SCALAR_SWEEP_LIMIT
+            else []
+        )
+        if self._lidar_backend == "python":
+            self._lidar = None
+        else:
+            self._lidar = make_lidar(self._lidar_backend, self._walls, self._bounds)
+            self._lidar_angles = np.array(self.lidar_angles, dtype=np.float64)
+
+    def draw(
+        self, screen: pygame.Surface, offset: tuple[float, float] = (0, 0)
+    ) -> None:
         """
         Draw the agent on the screen.
 
         Args:
             screen (pygame.Surface): The surface to draw on.
+            offset (tuple, optional): World position drawn at the screen
+                origin, e.g. Viewport.offset. Defaults to (0, 0).
         """
+        x, y = self.x - offset[0], self.y - offset[1]
+
         # Calculate the end point of the arrow
-        end_x = self.x + self.body_radius * math.cos(math.radians(self.direction))
-        end_y = self.y - self.body_radius * math.sin(math.radians(self.direction))
+        end_x = x + self.body_radius * math.cos(math.radians(self.direction))
+        end_y = y - self.body_radius * math.sin(math.radians(self.direction))
 
         # Draw the LiDAR beams if visible
         if self.lidar_visible:
-            self.draw_lidar(screen)
+            self.draw_lidar(screen, offset)
 
         # Draw the circle
-        pygame.draw.circle(screen, (0, 0, 255), (self.x, self.y), self.body_radius)
+        pygame.draw.circle(screen, (0, 0, 255), (x, y), self.body_radius)
 
         # Draw the arrow
-        pygame.draw.line(screen, (255, 0, 0), (self.x, self.y), (end_x, end_y), 2)
+        pygame.draw.line(screen, (255, 0, 0), (x, y), (end_x, end_y), 2)
 
-    def draw_lidar(self, screen: pygame.Surface) -> None:
+    def draw_lidar(
+        self, screen: pygame.Surface, offset: tuple[float, float] = (0, 0)
+    ) -> None:
         """
         Draw the LiDAR beams on the screen.
 
+        The scan is drawn as one filled polygon fanning out from the agent,
+        an outline through the beam endpoints and a marker blitted at every
+        endpoint. Only every lidar_draw_step-th beam is drawn.
+
         Args:
             screen (pygame.Surface): The surface to draw on.
+            offset (tuple, optional): World position drawn at the screen
+                origin. Defaults to (0, 0).
         """
-        for angle, distance in zip(self.lidar_angles, self.lidar_ranges):
-            laser_angle = math.radians(self.direction + angle)
-            end_x = self.x + distance * math.cos(laser_angle)
-            end_y = self.y - distance * math.sin(laser_angle)
-            pygame.draw.line(screen, (0, 255, 0), (self.x, self.y), (end_x, end_y), 1)
-            # Debug visualization
-            pygame.draw.circle(
-                screen, RED, (int(end_x), int(end_y)), 3
-            )  # Draw the laser endpoint
+        step = max(int(self.lidar_draw_step), 1)
+        distances = np.asarray(self.lidar_ranges, dtype=np.float64)[::step]
+        if not len(distances):
+            return
+        angles = np.radians(
+            self.direction + np.asarray(self.lidar_angles[::step], dtype=np.float64)
+        )
+        x, y = self.x - offset[0], self.y - offset[1]
+        end_x = x + distances * np.cos(angles)
+        end_y = y - distances * np.sin(angles)
+        points = np.stack([end_x, end_y], axis=1).tolist()
+
+        if len(points) > 1:
+            pygame.draw.polygon(screen, (190, 255, 190), [(x, y), *points])
+            pygame.draw.lines(screen, (0, 255, 0), True, points, 1)
+
+        # Debug visualization of the laser endpoints
+        if self._lidar_marker is None:
+            self._lidar_marker = pygame.Surface((7, 7))
+            self._lidar_marker.set_colorkey((0, 0, 0))
+            pygame.draw.circle(self._lidar_marker, RED, (3, 3), 3)
+        corners = np.stack([end_x.astype(int) - 3, end_y.astype(int) - 3], axis=1)
+        screen.blits(
+            [(self._lidar_marker, corner) for corner in corners.tolist()],
+            doreturn=False,
+        )
+
+    def get_draw_rect(self, offset: tuple[float, float] = (0, 0)) -> pygame.Rect:
+        """
+        Get the area of the screen that draw touches.
+
+        Args:
+            offset (tuple, optional): The offset passed to draw. Defaults to (0, 0).
 
-    def scan(self) -> None:
+        Returns:
+            pygame.Rect: Bounding box of the body and heading arrow, or of the
+                whole arena plus the endpoint markers when LiDAR is visible.
+        """
+        if self.lidar_visible:
+            left, top, right, bottom = self._bounds
+            return pygame.Rect(
+                left - offset[0], top - offset[1], right - left, bottom - top
+            ).inflate(8, 8)
+        size = 2 * self.body_radius + 4
+        return pygame.Rect(0, 0, size, size).move(
+            int(self.x - offset[0]) - size // 2, int(self.y - offset[1]) - size // 2
+        ).inflate(2, 2)
+
+    def scan(self, out: np.ndarray | None = None) -> None:
         """
         Perform a LiDAR scan of the environment.
 
         Updates the lidar_ranges list with the distances to the nearest obstacles.
+        Engine backends store a NumPy array instead of a list. With a scan
+        cache attached, scans from an already seen pose are served from it.
+        If the agent has only turned by a multiple of the beam spacing since
+        the last scan, the previous ranges are rotated instead of rescanned,
+        unless reuse_rotated_scans is off.
+
+        Args:
+            out (np.ndarray, optional): (num_beams,) float64 array to write
+                the ranges into. lidar_ranges is then set to it, so repeated
+                scans reuse one buffer instead of allocating a new one.
+        """
+        key = None
+        if self.scan_cache is not None:
+            key = (int(self.x), int(self.y), self.direction, self.world_version)
+            ranges = self.scan_cache.get(key)
+            if ranges is not None:
+                if self._lidar is None and out is None:
+                    ranges = ranges.tolist()
+                self._store_ranges(ranges, out)
+                self._remember_scan()
+                return
+
+        if self.reuse_rotated_scans and self.rotate_last_scan(out):
+            if key is not None:
+                self.scan_cache.put(key, self.lidar_ranges)
+            return
+
+        if self._lidar is not None:
+            self.lidar_ranges = self._lidar.scan(
+                self.x,
+                self.y,
+                self.direction,
+                self._lidar_angles,
+                self.lidar_max_range,
+                out=out,
+            )
+        else:
+            self.scan_python()
+            if out is not None:
+                self._store_ranges(self.lidar_ranges, out)
+
+        if key is not None:
+            self.scan_cache.put(key, self.lidar_ranges)
+        self._remember_scan()
+
+    def _store_ranges(self, ranges, out: np.ndarray | None) -> None:
+        """Set lidar_ranges, copying into out if a buffer was given."""
+        if out is None:
+            self.lidar_ranges = ranges
+        else:
+            out[:] = ranges
+            self.lidar_ranges = out
+
+    def _remember_scan(self) -> None:
+        """Store what rotate_last_scan needs to reuse the current ranges."""
+        self._last_scan = (
+            self.x,
+            self.y,
+            self.direction,
+            self.world_version,
+            self.lidar_max_range,
+            self.lidar_ranges,
+        )
+
+    def rotate_last_scan(self, out: np.ndarray | None = None) -> bool:
+        """
+        Derive the scan from the previous one if the agent has only rotated.
+
+        With evenly spaced beams, turning by k beam spacings in place moves
+        the reading of beam i + k to beam i, so the ranges are a circular
+        shift of the last scan. Any translation, wall change, range change
+        or outside change of lidar_ranges (e.g. by a replay) requires a
+        full scan.
+
+        Args:
+            out (np.ndarray, optional): Array to write the ranges into, as
+                in scan().
+
+        Returns:
+            bool: True if lidar_ranges was updated from the last scan.
+        """
+        last = self._last_scan
+        if (
+            last is None
+            or last[0] != self.x
+            or last[1] != self.y
+            or last[3] != self.world_version
+            or last[4] != self.lidar_max_range
+            or last[5] is not self.lidar_ranges
+        ):
+            return False
+        num_beams = len(self.lidar_angles)
+        if num_beams == 0 or len(self.lidar_ranges) != num_beams:
+            return False
+        shift = (self.direction - last[2]) % 360 / (360 / num_beams)
+        if abs(shift - round(shift)) > 1e-9:
+            return False
+
+        shift = round(shift) % num_beams
+        ranges = self.lidar_ranges
+        if shift:
+            if isinstance(ranges, np.ndarray):
+                ranges = np.roll(ranges, -shift)
+            else:
+                ranges = ranges[shift:] + ranges[:shift]
+        if shift or out is not None:
+            self._store_ranges(ranges, out)
+        self._remember_scan()
+        return True
+
+    def scan_python(self) -> None:
+        """
+        Reference LiDAR scan that tests each beam against each wall in Python.
         """
         self.lidar_ranges = []
         agent_x, agent_y = int(self.x), int(self.y)
@@ -144,33 +399,34 @@ class Agent:
         """
         dx = end_x - start_x
         dy = end_y - start_y
+        left, top, right, bottom = self._bounds
 
         # Check collision with all four boundaries
         collisions = []
 
         # Top boundary
         if dy < 0:
-            t = (TOP_BOUNDARY - start_y) / dy if dy != 0 else float("inf")
+            t = (top - start_y) / dy if dy != 0 else float("inf")
             if 0 <= t <= 1:
-                collisions.append((start_x + t * dx, TOP_BOUNDARY, t))
+                collisions.append((start_x + t * dx, top, t))
 
         # Bottom boundary
         if dy > 0:
-            t = (BOTTOM_BOUNDARY - start_y) / dy if dy != 0 else float("inf")
+            t = (bottom - start_y) / dy if dy != 0 else float("inf")
             if 0 <= t <= 1:
-                collisions.append((start_x + t * dx, BOTTOM_BOUNDARY, t))
+                collisions.append((start_x + t * dx, bottom, t))
 
         # Left boundary
         if dx < 0:
-            t = (LEFT_BOUNDARY - start_x) / dx if dx != 0 else float("inf")
+            t = (left - start_x) / dx if dx != 0 else float("inf")
             if 0 <= t <= 1:
-                collisions.append((LEFT_BOUNDARY, start_y + t * dy, t))
+                collisions.append((left, start_y + t * dy, t))
 
         # Right boundary
         if dx > 0:
-            t = (RIGHT_BOUNDARY - start_x) / dx if dx != 0 else float("inf")
+            t = (right - start_x) / dx if dx != 0 else float("inf")
             if 0 <= t <= 1:
-                collisions.append((RIGHT_BOUNDARY, start_y + t * dy, t))
+                collisions.append((right, start_y + t * dy, t))
 
         if collisions:
             # Sort collisions by distance (represented by t)
@@ -202,13 +458,10 @@ class Agent:
             next_y = self.y + self.linear_speed * math.sin(math.radians(self.direction))
 
         # Check if the next position is within the boundaries considering the radius of the agent
+        left, top, right, bottom = self._bounds
         if not (
-            LEFT_BOUNDARY + self.body_radius
-            <= next_x
-            <= RIGHT_BOUNDARY - self.body_radius
-            and TOP_BOUNDARY + self.body_radius
-            <= next_y
-            <= BOTTOM_BOUNDARY - self.body_radius
+            left + self.body_radius <= next_x <= right - self.body_radius
+            and top + self.body_radius <= next_y <= bottom - self.body_radius
         ):
             return True
 
@@ -221,27 +474,61 @@ class Agent:
 
     def try_move(self, move_forward: bool = True) -> None:
         """
-        Attempt to move the agent, reducing speed if necessary to avoid collisions.
+        Attempt to move the agent, stopping at the first contact on the way.
+
+        The largest collision-free distance up to linear_speed is found in one
+        swept-circle time-of-impact query against the walls and boundaries.
+        The bump sensor is set when the agent cannot move at all.
 
         Args:
             move_forward (bool): True if moving forward, False if moving backward.
         """
-        original_speed = self.linear_speed
-        while self.linear_speed > 0:
-            if not self.detect_collision(move_forward):
-                if move_forward:
-                    self.x += self.linear_speed * math.cos(math.radians(self.direction))
-                    self.y -= self.linear_speed * math.sin(math.radians(self.direction))
-                else:
-                    self.x -= self.linear_speed * math.cos(math.radians(self.direction))
-                    self.y += self.linear_speed * math.sin(math.radians(self.direction))
-                self.bump_sensor = False
-                break
-            self.linear_speed -= 0.1
-        self.linear_speed = original_speed
-        if self.linear_speed <= 0:
+        sign = 1 if move_forward else -1
+        dir_x = sign * math.cos(math.radians(self.direction))
+        dir_y = -sign * math.sin(math.radians(self.direction))
+        if len(self._rects) <= self.SCALAR_SWEEP_LIMIT:
+            distance = free_distance_scalar(
+                self.x,
+                self.y,
+                dir_x,
+                dir_y,
+                self.linear_speed,
+                self.body_radius,
+                self._rect_list,
+                self._bounds,
+            )
+        else:
+            distance = float(
+                free_distance(
+                    np.array([self.x]),
+                    np.array([self.y]),
+                    np.array([dir_x]),
+                    np.array([dir_y]),
+                    self.linear_speed,
+                    self.body_radius,
+                    self._rects,
+                    self._bounds,
+                )[0]
+            )
+        if distance > 0:
+            self.x += distance * dir_x
+            self.y += distance * dir_y
+            self.bump_sensor = False
+        else:
             self.bump_sensor = True
 
+    def move_forward(self) -> None:
+        """
+        Move the agent forward along its heading.
+        """
+        self.try_move(move_forward=True)
+
+    def move_backward(self) -> None:
+        """
+        Move the agent backward along its heading.
+        """
+        self.try_move(move_forward=False)
+
     def rotate_left(self) -> None:
         """
         Rotate the agent to the left.
@@ -0,0 +1,76 @@
+"""
+Compare the brute-force and grid LiDAR engines on synthetic worlds.
+
+Usage:
+    python benchmarks/bench_spatial_index.py [--sizes 10 100 1000 10000]
+"""
+
+import os
+import sys
+import argparse
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lidar import NumpyLidar, GridLidar
+from synthetic import synthetic_walls
+
+
+def time_scans(engine, poses: list, angles: np.ndarray, max_range: float) -> tuple:
+    """
+    Run one scan per pose and time them.
+
+    Args:
+        engine: A LiDAR engine.
+        poses (list): (x, y, direction) tuples to scan from.
+        angles (np.ndarray): Beam angles in degrees.
+        max_range (float): Maximum range of the LiDAR.
+
+    Returns:
+        tuple: (mean seconds per scan, list of range arrays)
+    """
+    start = time.perf_counter()
+    ranges = [engine.scan(x, y, d, angles, max_range) for x, y, d in poses]
+    return (time.perf_counter() - start) / len(poses), ranges
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000]
+    )
+    parser.add_argument("--beams", type=int, default=360)
+    parser.add_argument("--scans", type=int, default=20)
+    parser.add_argument("--max-range", type=float, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    angles = np.arange(args.beams) * (360 / args.beams)
+    rng = np.random.default_rng(args.seed)
+    print(f"{'walls':>7} {'build ms':>9} {'brute ms':>9} {'grid ms':>9} {'speedup':>8}")
+    for size in args.sizes:
+        walls, bounds = synthetic_walls(size, seed=args.seed)
+        poses = [
+            (rng.uniform(bounds[0], bounds[2]), rng.uniform(bounds[1], bounds[3]), d)
+            for d in rng.integers(0, 72, args.scans) * 5
+        ]
+
+        brute = NumpyLidar(walls, bounds)
+        start = time.perf_counter()
+        grid = GridLidar(walls, bounds)
+        build = time.perf_counter() - start
+
+        brute_time, brute_ranges = time_scans(brute, poses, angles, args.max_range)
+        grid_time, grid_ranges = time_scans(grid, poses, angles, args.max_range)
+        error = max(np.abs(a - b).max() for a, b in zip(brute_ranges, grid_ranges))
+        if error > 1e-6:
+            print(f"  warning: engines disagree by {error:.3g} px")
+        print(
+            f"{size:>7} {build * 1e3:>9.2f} {brute_time * 1e3:>9.2f} "
+            f"{grid_time * 1e3:>9.2f} {brute_time / grid_time:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""
+Time the hot paths of the simulator and compare them against a baseline.
+
+Usage:
+    python benchmarks/run_benchmarks.py --out results.json
+    python benchmarks/run_benchmarks.py --baseline results.json --out new.json
+"""
+
+import os
+import sys
+import argparse
+import glob
+import json
+import math
+import platform
+import random
+import time
+import numpy as np
+
+# Frame phases draw onto a real display surface, so no window is needed
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+from agent import Agent
+from wall import Wall
+from lidar import arena_bounds
+from collision import circle_collisions, wall_rects
+from simulation import Simulation
+from renderer import LayeredRenderer
+from viewport import Viewport
+from world_compiler import parse_world
+from controller_random import RandomController
+from synthetic import synthetic_walls
+
+# Phases whose cost depends on the number of LiDAR beams
+BEAM_PHASES = ["scan_python", "scan_numpy", "scan_grid", "step", "frame"]
+# The reference scan is skipped when walls x beams exceeds this
+PYTHON_SCAN_BUDGET = 50_000
+
+
+def load_worlds(names: list) -> list:
+    """
+    Load shipped world files and generate synthetic ones.
+
+    Args:
+        names (list): World file paths, or "synthetic:N" for a generated
+            world of N walls.
+
+    Returns:
+        list: (name, walls, bounds) tuples, bounds being the (left, top,
+            right, bottom) arena of the world.
+    """
+    worlds = []
+    for name in names:
+        if name.startswith("synthetic:"):
+            walls, bounds = synthetic_walls(int(name.split(":")[1]))
+        else:
+            with open(name, "r") as f:
+                wall_data, bounds = parse_world(json.load(f))
+            walls = [Wall.from_dict(data) for data in wall_data]
+            name = os.path.relpath(name, ROOT)
+        worlds.append((name, walls, bounds if bounds is not None else arena_bounds()))
+    return worlds
+
+
+def free_poses(
+    walls: list, bounds: tuple[float, float, float, float], count: int, seed: int
+) -> list:
+    """
+    Pick collision-free agent poses inside the arena.
+
+    Args:
+        walls (list): List of Wall objects.
+        bounds (tuple): (left, top, right, bottom) of the arena.
+        count (int): Number of poses.
+        seed (int): Seed for the generator.
+
+    Returns:
+        list: (x, y, direction) tuples with directions in 5 degree steps.
+    """
+    rng = np.random.default_rng(seed)
+    left, top, right, bottom = bounds
+    rects = wall_rects(walls)
+    poses = []
+    for _ in range(1000):
+        x = rng.uniform(left + 20, right - 20, count)
+        y = rng.uniform(top + 20, bottom - 20, count)
+        free = ~circle_collisions(x, y, 20, rects, bounds)
+        directions = rng.integers(0, 72, count) * 5
+        poses += list(zip(x[free], y[free], directions[free].tolist()))
+        if len(poses) >= count:
+            return poses[:count]
+    raise RuntimeError("Could not find enough free poses")
+
+
+def time_phase(fn, poses: list, min_time: float, max_rounds: int = 50) -> dict:
+    """
+    Call fn once per pose in rounds until min_time has passed.
+
+    Args:
+        fn (callable): Called with an (x, y, direction) pose.
+        poses (list): Poses cycled through in every round.
+        min_time (float): Minimum total time in seconds. At least three
+            rounds are run unless a single round already takes min_time.
+        max_rounds (int, optional): Upper bound on rounds. Defaults to 50.
+
+    Returns:
+        dict: Median and minimum microseconds per call over the rounds.
+    """
+    per_call = []
+    total = 0.0
+    while len(per_call) < max_rounds:
+        start = time.perf_counter()
+        for pose in poses:
+            fn(pose)
+        elapsed = time.perf_counter() - start
+        per_call.append(elapsed / len(poses))
+        total += elapsed
+        if total >= min_time and (len(per_call) >= 3 or elapsed >= min_time):
+            break
+    return {
+        "median_us": float(np.median(per_call)) * 1e6,
+        "min_us": min(per_call) * 1e6,
+        "rounds": len(per_call),
+        "calls": len(per_call) * len(poses),
+    }
+
+
+def place(agent: Agent, pose: tuple) -> None:
+    """Move an agent to a pose."""
+    agent.x, agent.y, agent.direction = pose
+
+
+def phase_functions(
+    walls: list,
+    bounds: tuple[float, float, float, float],
+    beams: int,
+    screen: pygame.Surface,
+) -> dict:
+    """
+    Build the function timed for every phase.
+
+    Args:
+        walls (list): List of Wall objects.
+        bounds (tuple): (left, top, right, bottom) of the arena.
+        beams (int): Number of LiDAR beams.
+        screen (pygame.Surface): Display surface for the frame phase.
+
+    Returns:
+        dict: Phase name -> callable taking a pose.
+    """
+    phases = {}
+    for backend in ("python", "numpy", "grid"):
+        agent = Agent(
+            0, 0, 0, walls, num_lidar_beams=beams, lidar_backend=backend, bounds=bounds
+        )
+
+        def scan(pose, agent=agent):
+            place(agent, pose)
+            agent.scan()
+
+        phases[f"scan_{backend}"] = scan
+
+    agent = Agent(
+        0, 0, 0, walls, num_lidar_beams=beams, lidar_backend="grid", bounds=bounds
+    )
+    max_range = agent.lidar_max_range
+
+    def line_intersection(pose):
+        x, y, direction = pose
+        end_x = int(x + max_range * math.cos(math.radians(direction)))
+        end_y = int(y - max_range * math.sin(math.radians(direction)))
+        for wall in walls:
+            wall.line_intersection(int(x), int(y), end_x, end_y)
+
+    def detect_collision(pose):
+        place(agent, pose)
+        agent.detect_collision()
+
+    def try_move(pose):
+        place(agent, pose)
+        agent.try_move()
+
+    controller = RandomController(model=None, agent=agent)
+    controller.running = True
+
+    def control(pose):
+        # RandomController only steers between multiples of 45 degrees
+        x, y, direction = pose
+        place(agent, (x, y, direction // 45 * 45))
+        agent.bump_sensor = direction % 10 == 0
+        controller.handle_input()
+        controller.move_agent()
+
+    sim = Simulation(lidar_backend="grid", num_lidar_beams=beams)
+    sim.set_walls(walls)
+    sim.agent.bounds = bounds
+
+    def step(pose):
+        sim.step()
+
+    # Frames show the default arena area of the screen, scrolled to the
+    # pose in worlds larger than that, as main.py does
+    left, top, right, bottom = arena_bounds()
+    arena_rect = pygame.Rect(left, top, right - left, bottom - top)
+    renderer = LayeredRenderer(screen, arena_rect, lambda surface: None)
+    viewport = Viewport(arena_rect, bounds)
+    viewer = Agent(
+        0, 0, 0, walls, num_lidar_beams=beams, lidar_backend="grid", bounds=bounds
+    )
+    viewer.lidar_visible = True
+
+    def frame(pose):
+        place(viewer, pose)
+        viewer.scan()
+        viewport.follow(viewer.x, viewer.y)
+        renderer.begin_frame(walls, viewer.world_version, viewport)
+        screen.set_clip(arena_rect)
+        viewer.draw(screen, viewport.offset)
+        screen.set_clip(None)
+        renderer.add_dirty(viewer.get_draw_rect(viewport.offset).clip(arena_rect))
+        renderer.end_frame()
+
+    phases.update(
+        line_intersection=line_intersection,
+        detect_collision=detect_collision,
+        try_move=try_move,
+        control=control,
+        step=step,
+        frame=frame,
+    )
+    return phases
+
+
+def run_benchmarks(
+    worlds: list, beam_counts: list, num_poses: int, min_time: float, seed: int
+) -> list:
+    """
+    Time every phase on every world.
+
+    Beam-dependent phases run once per beam count, the others once per
+    world.
+
+    Returns:
+        list: One result dict per (world, phase, beams) case.
+    """
+    pygame.init()
+    screen = pygame.display.set_mode((1600, 600))
+    results = []
+    for name, walls, bounds in worlds:
+        poses = free_poses(walls, bounds, num_poses, seed)
+        for beams in beam_counts:
+            random.seed(seed)
+            phases = phase_functions(walls, bounds, beams, screen)
+            for phase, fn in phases.items():
+                depends_on_beams = phase in BEAM_PHASES
+                if not depends_on_beams and beams != beam_counts[0]:
+                    continue
+                if phase == "scan_python" and len(walls) * beams > PYTHON_SCAN_BUDGET:
+                    continue
+                result = {
+                    "world": name,
+                    "walls": len(walls),
+                    "beams": beams if depends_on_beams else None,
+                    "phase": phase,
+                }
+                result.update(time_phase(fn, poses, min_time))
+                results.append(result)
+                beams_label = f"{beams} beams" if depends_on_beams else ""
+                print(
+                    f"{name:<24} {phase:<18} {beams_label:<11} "
+                    f"{result['median_us']:>12.1f} us"
+                )
+    pygame.quit()
+    return results
+
+
+def result_key(result: dict) -> str:
+    """Identify a case across runs."""
+    return f"{result['world']}:{result['phase']}:{result['beams']}"
+
+
+def compare(
+    results: list, baseline: list, tolerance: float, min_delta_us: float = 5.0
+) -> list:
+    """
+    Compare results against a baseline and print the changes.
+
+    Args:
+        results (list): Results of this run.
+        baseline (list): Results of the baseline run.
+        tolerance (float): Allowed fractional slowdown of the median before
+            a case counts as a regression.
+        min_delta_us (float, optional): Slowdowns smaller than this many
+            microseconds are treated as timer noise. Defaults to 5.
+
+    Returns:
+        list: Keys of the cases that regressed.
+    """
+    previous = {result_key(r): r for r in baseline}
+    regressions = []
+    print(f"\n{'case':<60} {'baseline us':>12} {'current us':>12} {'change':>8}")
+    for result in results:
+        key = result_key(result)
+        if key not in previous:
+            print(f"{key:<60} {'-':>12} {result['median_us']:>12.1f} {'new':>8}")
+            continue
+        before = previous[key]["median_us"]
+        ratio = result["median_us"] / before
+        flag = ""
+        if ratio > 1 + tolerance and result["median_us"] - before > min_delta_us:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(
+            f"{key:<60} {before:>12.1f} {result['median_us']:>12.1f} "
+            f"{(ratio - 1) * 100:>+7.1f}%{flag}"
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--worlds",
+        nargs="+",
+        default=sorted(glob.glob(os.path.join(ROOT, "worlds", "test*.json")))
+        + ["synthetic:10", "synthetic:100", "synthetic:1000"],
+        help='World files, or "synthetic:N" for a generated world of N walls.',
+    )
+    parser.add_argument("--beams", type=int, nargs="+", default=[90, 360, 1440])
+    parser.add_argument("--poses", type=int, default=20)
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="Seconds spent on each case."
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="Results to compare against.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Fractional slowdown reported as a regression.",
+    )
+    parser.add_argument(
+        "--min-delta-us",
+        type=float,
+        default=5.0,
+        help="Ignore slowdowns smaller than this many microseconds.",
+    )
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        load_worlds(args.worlds), args.beams, args.poses, args.min_time, args.seed
+    )
+    with open(args.out, "w") as f:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "numpy": np.__version__,
+                "machine": platform.platform(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"\n{len(results)} cases written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(
+                results, json.load(f)["results"], args.tolerance, args.min_delta_us
+            )
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Generate synthetic worlds for benchmarks and large-arena testing.
+
+Usage:
+    python benchmarks/synthetic.py 10000 worlds/large.json
+"""
+
+import os
+import sys
+import argparse
+import json
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from wall import Wall
+
+
+def synthetic_walls(
+    num_walls: int, seed: int = 0, spacing: float = 100.0
+) -> tuple[list, tuple[float, float, float, float]]:
+    """
+    Generate a random world with a constant wall density.
+
+    The arena grows with the wall count so that there is roughly one wall per
+    spacing x spacing square, which keeps local clutter fixed while the total
+    world size changes.
+
+    Args:
+        num_walls (int): Number of walls to generate.
+        seed (int, optional): Seed for the generator. Defaults to 0.
+        spacing (float, optional): Side of the square each wall occupies on
+            average. Defaults to 100.
+
+    Returns:
+        tuple: (walls, bounds) where bounds is (left, top, right, bottom).
+    """
+    rng = random.Random(seed)
+    side = max(int(spacing * num_walls**0.5), 200)
+    bounds = (0, 0, side * 4 // 3, side)
+    walls = []
+    for _ in range(num_walls):
+        width, height = rng.randint(5, 60), rng.randint(5, 60)
+        walls.append(
+            Wall(
+                rng.randint(0, bounds[2] - width),
+                rng.randint(0, bounds[3] - height),
+                width,
+                height,
+            )
+        )
+    return walls, bounds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("num_walls", type=int)
+    parser.add_argument("output", help="World JSON file to write.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spacing", type=float, default=100.0)
+    args = parser.parse_args()
+
+    walls, bounds = synthetic_walls(args.num_walls, args.seed, args.spacing)
+    with open(args.output, "w") as f:
+        json.dump(
+            {"bounds": list(bounds), "walls": [wall.to_dict() for wall in walls]}, f
+        )
+    print(f"{args.output}: {len(walls)} walls in {bounds[2]} x {bounds[3]}")
+
+
+if __name__ == "__main__":
+    main()
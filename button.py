@@ -3,18 +3,27 @@ from constants import BLACK, WHITE
 
 
 class Button:
+    # Shared by all buttons, created on first draw once pygame is initialized
+    font = None
+
     def __init__(self, x, y, width, height, text, action, color=BLACK):
         self.rect = pygame.Rect(x, y, width, height)
         self.text = text
         self.action = action
         self.color = color
+        self._text_surface = None
+        self._rendered_text = None
 
     def draw(self, screen):
         pygame.draw.rect(screen, self.color, self.rect)
-        font = pygame.font.Font(None, 24)
-        text_surface = font.render(self.text, True, WHITE)
-        text_rect = text_surface.get_rect(center=self.rect.center)
-        screen.blit(text_surface, text_rect)
+        # Render the label once and again only if the text changes
+        if self._rendered_text != self.text:
+            if Button.font is None:
+                Button.font = pygame.font.Font(None, 24)
+            self._text_surface = Button.font.render(self.text, True, WHITE)
+            self._rendered_text = self.text
+        text_rect = self._text_surface.get_rect(center=self.rect.center)
+        screen.blit(self._text_surface, text_rect)
 
     def is_clicked(self, pos):
         return self.rect.collidepoint(pos)
@@ -0,0 +1,305 @@
+import math
+import numpy as np
+
+# Gap left between a swept circle and whatever stopped it, and the shortest
+# move that counts as moving, so rounding never turns a contact into an
+# overlap or into endless sub-pixel creeping
+CONTACT_SKIN = 1e-6
+
+
+def wall_rects(walls: list) -> np.ndarray:
+    """
+    Pack the rectangles of every wall into a single array.
+
+    Args:
+        walls (list): List of Wall objects, or a CompiledWorld whose rect
+            array is returned as is.
+
+    Returns:
+        np.ndarray: (N, 4) float array of [left, top, right, bottom] rows.
+    """
+    if not isinstance(walls, list) and hasattr(walls, "rects"):
+        return walls.rects
+    if not walls:
+        return np.empty((0, 4), dtype=np.float64)
+    return np.array(
+        [
+            [wall.rect.left, wall.rect.top, wall.rect.right, wall.rect.bottom]
+            for wall in walls
+        ],
+        dtype=np.float64,
+    )
+
+
+def circle_collisions(
+    x: np.ndarray,
+    y: np.ndarray,
+    radius: float,
+    rects: np.ndarray,
+    bounds: tuple[float, float, float, float],
+    max_pairs: int = 1 << 20,
+) -> np.ndarray:
+    """
+    Test a batch of circles against the arena bounds and every wall.
+
+    Applies the same rules as Agent.detect_collision and Wall.is_colliding:
+    a circle may touch the boundaries and the walls, but not overlap them.
+
+    Args:
+        x (np.ndarray): (K,) circle center x-coordinates.
+        y (np.ndarray): (K,) circle center y-coordinates.
+        radius (float): Radius shared by every circle.
+        rects (np.ndarray): (N, 4) array of [left, top, right, bottom] walls.
+        bounds (tuple): (left, top, right, bottom) of the arena.
+        max_pairs (int, optional): Upper bound on circle-wall pairs evaluated
+            per pass, used to cap memory on very large batches.
+
+    Returns:
+        np.ndarray: (K,) boolean array, True where a circle collides.
+    """
+    left, top, right, bottom = bounds
+    colliding = ~(
+        (left + radius <= x)
+        & (x <= right - radius)
+        & (top + radius <= y)
+        & (y <= bottom - radius)
+    )
+    if not len(rects):
+        return colliding
+
+    step = max(max_pairs // len(rects), 1)
+    for i in range(0, len(x), step):
+        cx, cy = x[i : i + step, None], y[i : i + step, None]
+        dx = cx - np.clip(cx, rects[:, 0], rects[:, 2])
+        dy = cy - np.clip(cy, rects[:, 1], rects[:, 3])
+        colliding[i : i + step] |= (dx**2 + dy**2 < radius**2).any(axis=1)
+    return colliding
+
+
+def free_distance(
+    x: np.ndarray,
+    y: np.ndarray,
+    dir_x: np.ndarray,
+    dir_y: np.ndarray,
+    distance: float,
+    radius: float,
+    rects: np.ndarray,
+    bounds: tuple[float, float, float, float],
+    max_pairs: int = 1 << 20,
+) -> np.ndarray:
+    """
+    Largest collision-free distance a circle can travel along a direction.
+
+    Sweeps each circle against the arena bounds and against every wall,
+    treating a wall as its rectangle grown by the radius with rounded
+    corners, and returns the time of first contact. Circles that already
+    overlap a wall may only move away from it.
+
+    Args:
+        x (np.ndarray): (K,) circle center x-coordinates.
+        y (np.ndarray): (K,) circle center y-coordinates.
+        dir_x (np.ndarray): (K,) x-components of the unit travel direction.
+        dir_y (np.ndarray): (K,) y-components of the unit travel direction.
+        distance (float): Distance the circles want to travel.
+        radius (float): Radius shared by every circle.
+        rects (np.ndarray): (N, 4) array of [left, top, right, bottom] walls.
+        bounds (tuple): (left, top, right, bottom) of the arena.
+        max_pairs (int, optional): Upper bound on circle-wall pairs evaluated
+            per pass, used to cap memory on very large batches.
+
+    Returns:
+        np.ndarray: (K,) distances in [0, distance].
+    """
+    left, top, right, bottom = bounds
+    with np.errstate(divide="ignore", invalid="ignore"):
+        limit_x = np.where(
+            dir_x > 0,
+            (right - radius - x) / dir_x,
+            np.where(dir_x < 0, (left + radius - x) / dir_x, np.inf),
+        )
+        limit_y = np.where(
+            dir_y > 0,
+            (bottom - radius - y) / dir_y,
+            np.where(dir_y < 0, (top + radius - y) / dir_y, np.inf),
+        )
+    limit = np.minimum(limit_x, limit_y)
+    if len(rects):
+        step = max(max_pairs // len(rects), 1)
+        for i in range(0, len(x), step):
+            rows = slice(i, i + step)
+            contact = _rect_contact(
+                x[rows, None],
+                y[rows, None],
+                dir_x[rows, None],
+                dir_y[rows, None],
+                radius,
+                rects,
+            )
+            np.minimum(limit[rows], contact.min(axis=1), out=limit[rows])
+    free = np.clip(limit - CONTACT_SKIN, 0, distance)
+    free[free < CONTACT_SKIN] = 0
+    return free
+
+
+def _rect_contact(
+    x: np.ndarray,
+    y: np.ndarray,
+    dir_x: np.ndarray,
+    dir_y: np.ndarray,
+    radius: float,
+    rects: np.ndarray,
+) -> np.ndarray:
+    """
+    Distance to first contact between swept circles and rectangles.
+
+    Args:
+        x (np.ndarray): (K, 1) circle center x-coordinates.
+        y (np.ndarray): (K, 1) circle center y-coordinates.
+        dir_x (np.ndarray): (K, 1) x-components of the unit travel direction.
+        dir_y (np.ndarray): (K, 1) y-components of the unit travel direction.
+        radius (float): Radius shared by every circle.
+        rects (np.ndarray): (N, 4) array of [left, top, right, bottom] walls.
+
+    Returns:
+        np.ndarray: (K, N) contact distances, inf where the sweep misses.
+    """
+    left, top, right, bottom = rects.T
+
+    # Slab test against the rectangle grown by the radius on every side
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tx1 = (left - radius - x) / dir_x
+        tx2 = (right + radius - x) / dir_x
+        ty1 = (top - radius - y) / dir_y
+        ty2 = (bottom + radius - y) / dir_y
+    inside_x = (left - radius <= x) & (x <= right + radius)
+    inside_y = (top - radius <= y) & (y <= bottom + radius)
+    near_x = np.where(dir_x == 0, np.where(inside_x, -np.inf, np.inf), np.minimum(tx1, tx2))
+    far_x = np.where(dir_x == 0, np.where(inside_x, np.inf, -np.inf), np.maximum(tx1, tx2))
+    near_y = np.where(dir_y == 0, np.where(inside_y, -np.inf, np.inf), np.minimum(ty1, ty2))
+    far_y = np.where(dir_y == 0, np.where(inside_y, np.inf, -np.inf), np.maximum(ty1, ty2))
+    t_near = np.maximum(near_x, near_y)
+    t_far = np.minimum(far_x, far_y)
+    crosses = (t_near <= t_far) & (t_far >= 0)
+
+    # Entering through a flat side of the grown box is a contact; entering
+    # through one of its corner squares only counts if the corner circle is hit
+    t_enter = np.where(crosses, np.maximum(t_near, 0), 0.0)
+    enter_x = x + t_enter * dir_x
+    enter_y = y + t_enter * dir_y
+    on_face = ((left <= enter_x) & (enter_x <= right)) | (
+        (top <= enter_y) & (enter_y <= bottom)
+    )
+    off_x = x - np.clip(enter_x, left, right)
+    off_y = y - np.clip(enter_y, top, bottom)
+    b = off_x * dir_x + off_y * dir_y
+    c = off_x**2 + off_y**2 - radius**2
+    disc = b**2 - c
+    t_corner = np.where(disc >= 0, -b - np.sqrt(np.maximum(disc, 0)), np.inf)
+    t_corner = np.where(t_corner >= 0, t_corner, np.inf)
+    contact = np.where(crosses, np.where(on_face, t_near, t_corner), np.inf)
+
+    # Circles already touching or overlapping a wall may slide along or away
+    # from it, but not further into it
+    gap_x = x - np.clip(x, left, right)
+    gap_y = y - np.clip(y, top, bottom)
+    overlapping = gap_x**2 + gap_y**2 <= radius**2
+    inward = gap_x * dir_x + gap_y * dir_y < 0
+    return np.where(overlapping, np.where(inward, 0.0, np.inf), contact)
+
+
+def free_distance_scalar(
+    x: float,
+    y: float,
+    dir_x: float,
+    dir_y: float,
+    distance: float,
+    radius: float,
+    rects: list,
+    bounds: tuple[float, float, float, float],
+) -> float:
+    """
+    Single-circle version of free_distance in plain Python.
+
+    For one agent among a few dozen walls this avoids NumPy's per-call
+    overhead, which would otherwise dominate the sweep itself.
+
+    Args:
+        x (float): Circle center x-coordinate.
+        y (float): Circle center y-coordinate.
+        dir_x (float): x-component of the unit travel direction.
+        dir_y (float): y-component of the unit travel direction.
+        distance (float): Distance the circle wants to travel.
+        radius (float): Radius of the circle.
+        rects (list): (left, top, right, bottom) tuples, one per wall.
+        bounds (tuple): (left, top, right, bottom) of the arena.
+
+    Returns:
+        float: Distance in [0, distance].
+    """
+    left, top, right, bottom = bounds
+    limit = math.inf
+    if dir_x > 0:
+        limit = (right - radius - x) / dir_x
+    elif dir_x < 0:
+        limit = (left + radius - x) / dir_x
+    if dir_y > 0:
+        limit = min(limit, (bottom - radius - y) / dir_y)
+    elif dir_y < 0:
+        limit = min(limit, (top + radius - y) / dir_y)
+
+    for rect in rects:
+        contact = _rect_contact_scalar(x, y, dir_x, dir_y, radius, *rect)
+        if contact < limit:
+            limit = contact
+    free = min(limit - CONTACT_SKIN, distance)
+    return free if free >= CONTACT_SKIN else 0.0
+
+
+def _rect_contact_scalar(
+    x: float,
+    y: float,
+    dir_x: float,
+    dir_y: float,
+    radius: float,
+    left: float,
+    top: float,
+    right: float,
+    bottom: float,
+) -> float:
+    """Scalar counterpart of _rect_contact for a single circle and wall."""
+    gap_x = x - min(max(x, left), right)
+    gap_y = y - min(max(y, top), bottom)
+    if gap_x * gap_x + gap_y * gap_y <= radius * radius:
+        return 0.0 if gap_x * dir_x + gap_y * dir_y < 0 else math.inf
+
+    t_near, t_far = -math.inf, math.inf
+    for start, step, low, high in (
+        (x, dir_x, left - radius, right + radius),
+        (y, dir_y, top - radius, bottom + radius),
+    ):
+        if step == 0:
+            if start < low or start > high:
+                return math.inf
+            continue
+        t1, t2 = (low - start) / step, (high - start) / step
+        if t1 > t2:
+            t1, t2 = t2, t1
+        t_near, t_far = max(t_near, t1), min(t_far, t2)
+    if t_near > t_far or t_far < 0:
+        return math.inf
+
+    t_enter = max(t_near, 0.0)
+    enter_x, enter_y = x + t_enter * dir_x, y + t_enter * dir_y
+    if left <= enter_x <= right or top <= enter_y <= bottom:
+        contact = t_near
+    else:
+        off_x = x - (left if enter_x < left else right)
+        off_y = y - (top if enter_y < top else bottom)
+        b = off_x * dir_x + off_y * dir_y
+        disc = b * b - (off_x * off_x + off_y * off_y - radius * radius)
+        if disc < 0:
+            return math.inf
+        contact = -b - math.sqrt(disc)
+        if contact < 0:
+            return math.inf
+    return contact
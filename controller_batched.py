@@ -0,0 +1,116 @@
+from abc import ABC, abstractmethod
+import numpy as np
+from vector_env import FORWARD, ROTATE_LEFT, ROTATE_RIGHT, NOOP
+
+
+class BatchedController(ABC):
+    """
+    Controller deciding for K agents at once from arrays of their state.
+
+    Where a Controller reads one Agent and moves it, a batched controller
+    takes the bump flags and headings of all agents and returns one
+    VectorEnv action per agent. Random draws come from the controller's own
+    numpy Generator, so a seeded controller is reproducible and independent
+    of the global random module and of other controllers.
+    """
+
+    def __init__(self, num_agents: int, seed: int | None = None) -> None:
+        """
+        Initialize the BatchedController.
+
+        Args:
+            num_agents (int): Number of agents K.
+            seed (int, optional): Seed for the controller's generator.
+        """
+        self.num_agents = num_agents
+        self.rng = np.random.default_rng(seed)
+
+    @abstractmethod
+    def act(self, bump_sensor: np.ndarray, direction: np.ndarray) -> np.ndarray:
+        """
+        Decide the next action of every agent.
+
+        Args:
+            bump_sensor (np.ndarray): (K,) bump flags.
+            direction (np.ndarray): (K,) headings in degrees.
+
+        Returns:
+            np.ndarray: (K,) array of FORWARD, BACKWARD, ROTATE_LEFT,
+                ROTATE_RIGHT or NOOP.
+        """
+
+    def reset(self) -> None:
+        """Forget any per-agent state, e.g. after the agents are placed again."""
+
+    def __call__(self, env) -> np.ndarray:
+        """Act on a VectorEnv's state, so a controller can be a VectorEnv.run policy."""
+        return self.act(env.bump_sensor, env.direction)
+
+
+class BatchedBasicController(BatchedController):
+    """BasicController for K agents: turn left while bumped, else go forward."""
+
+    def act(self, bump_sensor: np.ndarray, direction: np.ndarray) -> np.ndarray:
+        return np.where(np.asarray(bump_sensor, dtype=bool), ROTATE_LEFT, FORWARD)
+
+
+class BatchedRandomController(BatchedController):
+    """
+    RandomController for K agents.
+
+    Follows the scalar controller's handle_input followed by move_agent,
+    per agent: a bumped agent picks one of the eight compass headings as
+    its goal at random, an agent with a goal turns toward it by the
+    shortest way until it faces it, and every other agent moves forward,
+    then with probability epsilon picks the heading 45 degrees to its left
+    or right as its next goal.
+    """
+
+    def __init__(
+        self, num_agents: int, seed: int | None = None, epsilon: float = 0.05
+    ) -> None:
+        """
+        Initialize the BatchedRandomController.
+
+        Args:
+            num_agents (int): Number of agents K.
+            seed (int, optional): Seed for the controller's generator.
+            epsilon (float, optional): Chance per forward step of changing
+                course. Defaults to 0.05.
+        """
+        super().__init__(num_agents, seed)
+        self.epsilon = epsilon
+        self.choices = np.arange(0, 360, 45, dtype=np.float64)
+        # Goal heading of every agent, NaN for agents without one
+        self.goal_direction = np.full(num_agents, np.nan)
+
+    def reset(self) -> None:
+        self.goal_direction[:] = np.nan
+
+    def act(self, bump_sensor: np.ndarray, direction: np.ndarray) -> np.ndarray:
+        bump_sensor = np.asarray(bump_sensor, dtype=bool)
+        direction = np.asarray(direction, dtype=np.float64)
+        goal = self.goal_direction
+
+        # Bumped agents head somewhere new
+        bumped = np.flatnonzero(bump_sensor)
+        goal[bumped] = self.rng.choice(self.choices, bumped.size)
+
+        # Agents with a goal they do not face yet turn the shorter way round
+        has_goal = ~np.isnan(goal)
+        turning = bump_sensor | (has_goal & (direction != goal))
+        angle_diff = np.where(has_goal, (goal - direction) % 360, 0)
+        angle_diff[angle_diff > 180] -= 360
+        actions = np.full(self.num_agents, FORWARD)
+        actions[turning] = np.select(
+            [angle_diff[turning] > 0, angle_diff[turning] < 0],
+            [ROTATE_LEFT, ROTATE_RIGHT],
+            NOOP,
+        )
+        goal[turning & (direction == goal)] = np.nan
+
+        # The rest move forward with a chance of changing course afterwards
+        deviate = ~turning & (self.rng.random(self.num_agents) <= self.epsilon)
+        offset = np.where(self.rng.random(self.num_agents) > 0.5, -45, 45)
+        goal[deviate] = (direction[deviate] + offset[deviate]) % 360
+        return actions
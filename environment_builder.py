@@ -5,15 +5,47 @@ from tkinter import Tk, filedialog
 from wall import Wall
 from button import Button
 from constants import *
+from world_compiler import parse_world
+from lidar import arena_bounds
+from viewport import Viewport
+from renderer import WallLayer
 
 pygame.init()
 
 # Screen setup
 screen = pygame.display.set_mode((1000, 600))
 pygame.display.set_caption("Wall Editor")
+walls = []
 selected_wall = None
 copied_wall = None
 is_dragging = False
+# Where in the selected wall it was grabbed, None unless a wall is dragged
+drag_offset = None
+# Arena bounds of the loaded world file, None for the default arena
+world_bounds = None
+
+RESIZE_DIRECTIONS = [
+    "top-left",
+    "top-right",
+    "bottom-left",
+    "bottom-right",
+    "top-center",
+    "bottom-center",
+    "left-center",
+    "right-center",
+]
+ZOOM_STEP = 1.25
+
+# The walls are drawn into a cached layer through a view that can be panned
+# with the right or middle mouse button and zoomed with the mouse wheel
+arena_rect = pygame.Rect(
+    LEFT_BOUNDARY,
+    TOP_BOUNDARY,
+    RIGHT_BOUNDARY - LEFT_BOUNDARY,
+    BOTTOM_BOUNDARY - TOP_BOUNDARY,
+)
+view = Viewport(arena_rect, arena_bounds())
+wall_layer = WallLayer(view, walls)
 
 
 def save_walls():
@@ -23,13 +55,17 @@ def save_walls():
         defaultextension=".json", filetypes=[("JSON files", "*.json")]
     )
     if filename:
+        wall_data = [wall.to_dict() for wall in walls]
         with open(filename, "w") as f:
-            json.dump([wall.to_dict() for wall in walls], f)
+            if world_bounds is None:
+                json.dump(wall_data, f)
+            else:
+                json.dump({"bounds": list(world_bounds), "walls": wall_data}, f)
     root.destroy()
 
 
 def load_walls():
-    global walls
+    global walls, world_bounds
     root = Tk()
     root.withdraw()
     filename = filedialog.askopenfilename(
@@ -37,69 +73,105 @@ def load_walls():
     )
     if filename:
         with open(filename, "r") as f:
-            walls = [Wall.from_dict(data) for data in json.load(f)]
+            wall_data, world_bounds = parse_world(json.load(f))
+        set_walls([Wall.from_dict(data) for data in wall_data])
     root.destroy()
 
 
 def reset_world():
-    global walls
-    walls = []
+    global world_bounds
+    world_bounds = None
+    set_walls([])
+
+
+def set_walls(new_walls):
+    """Replaces the walls and shows the new world from its top-left corner."""
+    global walls, selected_wall, drag_offset
+    walls = new_walls
+    selected_wall = None
+    drag_offset = None
+    view.set_bounds(world_bounds if world_bounds is not None else arena_bounds())
+    wall_layer.set_walls(walls)
 
 
 def delete_selected_wall():
-    global walls, selected_wall
+    global selected_wall
     if selected_wall:
-        walls.remove(selected_wall)
+        wall_layer.remove(selected_wall)
         selected_wall = None
 
 
+def select_wall(wall):
+    """Selects a wall, or none, deselecting the previous one."""
+    global selected_wall
+    if selected_wall and selected_wall is not wall:
+        selected_wall.selected = False
+        selected_wall.resizing = False
+        selected_wall.resize_dir = None
+        wall_layer.update(selected_wall)
+    selected_wall = wall
+    if wall:
+        wall.selected = True
+        wall_layer.update(wall)
+
+
+def mouse_world_pos(pos):
+    """Converts a screen position to the nearest whole world position."""
+    x, y = view.to_world(pos)
+    return round(x), round(y)
+
+
 def handle_mouse_events(event):
-    global selected_wall, copied_wall, is_dragging
-    if event.type == pygame.MOUSEBUTTONDOWN:
+    global selected_wall, copied_wall, is_dragging, drag_offset
+    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
         is_dragging = False
+        drag_offset = None
         for button in buttons:
             if button.is_clicked(event.pos):
                 button.action()
                 return
-        for wall in walls:
-            if wall.rect.collidepoint(event.pos):
-                wall.selected = True
-                selected_wall = wall
-                for handle, direction in zip(
-                    wall.get_handles(),
-                    [
-                        "top-left",
-                        "top-right",
-                        "bottom-left",
-                        "bottom-right",
-                        "top-center",
-                        "bottom-center",
-                        "left-center",
-                        "right-center",
-                    ],
-                ):
-                    if handle.collidepoint(event.pos):
-                        wall.resizing = True
-                        wall.resize_dir = direction
-                        return
-            else:
-                wall.selected = False
-                wall.resizing = False
-                wall.resize_dir = None
+        if not arena_rect.collidepoint(event.pos):
+            return
+        world_pos = view.to_world(event.pos)
+        select_wall(wall_layer.wall_at(world_pos))
+        if selected_wall:
+            # Handles are hit-tested where they are drawn, whatever the zoom
+            screen_rect = view.to_screen_rect(*wall_layer.index.rect_of(selected_wall))
+            for handle, direction in zip(
+                selected_wall.get_handles(screen_rect), RESIZE_DIRECTIONS
+            ):
+                if handle.collidepoint(event.pos):
+                    selected_wall.resizing = True
+                    selected_wall.resize_dir = direction
+                    return
+            drag_offset = (
+                world_pos[0] - selected_wall.rect.x,
+                world_pos[1] - selected_wall.rect.y,
+            )
     elif event.type == pygame.MOUSEBUTTONUP:
         if selected_wall:
             selected_wall.resizing = False
             selected_wall.resize_dir = None
         is_dragging = False
+        drag_offset = None
+    elif event.type == pygame.MOUSEWHEEL:
+        mouse_pos = pygame.mouse.get_pos()
+        if arena_rect.collidepoint(mouse_pos):
+            view.zoom_at(ZOOM_STEP**event.y, mouse_pos)
     elif event.type == pygame.MOUSEMOTION:
-        if selected_wall and selected_wall.resizing:
-            selected_wall.handle_resize(event.pos)
+        if event.buttons[1] or event.buttons[2]:
+            view.pan(*event.rel)
+        elif selected_wall and selected_wall.resizing:
+            selected_wall.handle_resize(mouse_world_pos(event.pos))
+            wall_layer.update(selected_wall)
         elif (
-            selected_wall and event.buttons[0]
+            selected_wall and drag_offset and event.buttons[0]
         ):  # Check if the left mouse button is held down
             is_dragging = True
-            selected_wall.rect.x += event.rel[0]
-            selected_wall.rect.y += event.rel[1]
+            x, y = view.to_world(event.pos)
+            selected_wall.rect.x = round(x - drag_offset[0])
+            selected_wall.rect.y = round(y - drag_offset[1])
+            wall_layer.update(selected_wall)
 
 
 def handle_keyboard_events(event):
@@ -113,8 +185,7 @@ def handle_keyboard_events(event):
                 selected_wall.rect.height,
             )
         elif event.key == pygame.K_v and copied_wall:
-            new_wall = Wall(0, 0, copied_wall.rect.width, copied_wall.rect.height)
-            walls.append(new_wall)
+            paste_wall()
         elif event.key == pygame.K_s:
             save_walls()
         elif event.key == pygame.K_l:
@@ -122,14 +193,15 @@ def handle_keyboard_events(event):
 
 
 def spawn_wall():
-    new_wall = Wall(100, 100, 50, 50)
-    walls.append(new_wall)
+    # Placed relative to the view, so it shows up wherever the view is
+    x, y = mouse_world_pos((arena_rect.x + 100, arena_rect.y + 100))
+    wall_layer.add(Wall(x, y, 50, 50))
 
 
 def paste_wall():
     if copied_wall:
-        new_wall = Wall(0, 0, copied_wall.rect.width, copied_wall.rect.height)
-        walls.append(new_wall)
+        x, y = mouse_world_pos(arena_rect.topleft)
+        wall_layer.add(Wall(x, y, copied_wall.rect.width, copied_wall.rect.height))
 
 
 def copy_wall():
@@ -141,8 +213,7 @@ def copy_wall():
             selected_wall.rect.width,
             selected_wall.rect.height,
         )
-        selected_wall.selected = False  # Deselect the wall after copying
-        selected_wall = None
+        select_wall(None)  # Deselect the wall after copying
 
 
 # Create buttons
@@ -165,6 +236,7 @@ buttons = [
 ]
 
 # Main game loop
+clock = pygame.time.Clock()
 running = True
 while running:
     for event in pygame.event.get():
@@ -176,21 +248,8 @@ while running:
     # Fill the screen with a white color
     screen.fill(WHITE)
 
-    # Draw the left half as the navigation area
-    pygame.draw.rect(
-        screen,
-        GRAY,
-        (
-            LEFT_BOUNDARY,
-            TOP_BOUNDARY,
-            RIGHT_BOUNDARY - LEFT_BOUNDARY,
-            BOTTOM_BOUNDARY - TOP_BOUNDARY,
-        ),
-    )
-
-    # Draw the walls
-    for wall in walls:
-        wall.draw(screen)
+    # Draw the navigation area with the walls in view, redrawing only what changed
+    wall_layer.draw(screen)
 
     # Draw the buttons
     for button in buttons:
@@ -201,6 +260,7 @@ while running:
 
     # Update the display
     pygame.display.flip()
+    clock.tick(60)
 
 # Quit pygame
 pygame.quit()
@@ -0,0 +1,192 @@
+import numpy as np
+from agent import Agent
+from world_compiler import load_world
+from collision import circle_collisions, wall_rects
+from vector_env import FORWARD, BACKWARD, ROTATE_LEFT, ROTATE_RIGHT
+
+try:
+    import gymnasium as gym
+    from gymnasium import spaces
+except ImportError:
+    # The environment works the same without gymnasium, minus the spaces
+    gym = None
+    spaces = None
+
+
+class SimulatorEnv(gym.Env if gym is not None else object):
+    """
+    Single-agent environment with the Gymnasium reset()/step() interface.
+
+    Wraps an Agent and its walls. Observations are a dict of read-only
+    views into buffers allocated once:
+
+        "lidar"   (num_beams,) ranges
+        "pose"    (3,) x, y and heading in degrees
+        "bump"    (1,) bump sensor flag, 0 or 1
+
+    Every step overwrites the buffers in place, so the dict and its arrays
+    are the same objects on every call. Copy them to keep an observation
+    past the next step. Gymnasium's env checker requires fresh observations
+    on every call, which copy_observations=True provides. Actions are FORWARD, BACKWARD, ROTATE_LEFT and
+    ROTATE_RIGHT, as in VectorEnv. The reward is always 0; subclasses
+    override reward() for a task.
+
+    gymnasium is optional. When it is installed the class is a gym.Env with
+    action_space and observation_space set.
+    """
+
+    metadata = {"render_modes": []}
+
+    def __init__(
+        self,
+        world="worlds/test3.json",
+        num_lidar_beams: int = 360,
+        lidar_backend: str = "grid",
+        max_steps: int | None = None,
+        seed: int | None = None,
+        copy_observations: bool = False,
+        reuse_rotated_scans: bool = False,
+    ) -> None:
+        """
+        Initialize the SimulatorEnv.
+
+        Args:
+            world (optional): Path of a world JSON file, a list of Wall
+                objects or a CompiledWorld. Defaults to "worlds/test3.json".
+            num_lidar_beams (int, optional): Number of LiDAR beams. Defaults to 360.
+            lidar_backend (str, optional): Backend of the agent's scans.
+                Engine backends write straight into the observation buffer.
+                Defaults to "grid".
+            max_steps (int, optional): Steps after which an episode is
+                truncated. Defaults to no limit.
+            seed (int, optional): Seed for the placement generator.
+            copy_observations (bool, optional): Return a copy of the
+                observation buffers instead of views into them. Defaults
+                to False.
+            reuse_rotated_scans (bool, optional): Let the agent answer a scan
+                after turning in place with a rotated copy of its last scan.
+                Observations then depend on the episode's history, not just
+                the pose, so seeded episodes no longer replay exactly.
+                Defaults to False.
+        """
+        walls = load_world(world) if isinstance(world, str) else world
+        self.agent = Agent(
+            0,
+            0,
+            0,
+            walls,
+            num_lidar_beams=num_lidar_beams,
+            lidar_backend=lidar_backend,
+            reuse_rotated_scans=reuse_rotated_scans,
+        )
+        self._rects = wall_rects(walls)
+        self.max_steps = max_steps
+        self.copy_observations = copy_observations
+        self.steps = 0
+        self.np_random = np.random.default_rng(seed)
+
+        self._ranges = np.zeros(num_lidar_beams)
+        self._pose = np.zeros(3)
+        self._bump = np.zeros(1, dtype=np.int8)
+        self._observation = {
+            "lidar": self._read_only(self._ranges),
+            "pose": self._read_only(self._pose),
+            "bump": self._read_only(self._bump),
+        }
+        self._moves = {
+            FORWARD: self.agent.move_forward,
+            BACKWARD: self.agent.move_backward,
+            ROTATE_LEFT: self.agent.rotate_left,
+            ROTATE_RIGHT: self.agent.rotate_right,
+        }
+
+        if spaces is not None:
+            left, top, right, bottom = self.agent.bounds
+            self.action_space = spaces.Discrete(4)
+            self.observation_space = spaces.Dict(
+                {
+                    "lidar": spaces.Box(
+                        0, self.agent.lidar_max_range, (num_lidar_beams,), np.float64
+                    ),
+                    "pose": spaces.Box(
+                        np.array([left, top, 0.0]),
+                        np.array([right, bottom, 360.0]),
+                        dtype=np.float64,
+                    ),
+                    "bump": spaces.MultiBinary(1),
+                }
+            )
+
+    @staticmethod
+    def _read_only(buffer: np.ndarray) -> np.ndarray:
+        """Get a view of a buffer that callers cannot write through."""
+        view = buffer.view()
+        view.flags.writeable = False
+        return view
+
+    def _observe(self) -> dict:
+        """Scan and write the agent's state into the observation buffers."""
+        agent = self.agent
+        agent.scan(out=self._ranges)
+        self._pose[0] = agent.x
+        self._pose[1] = agent.y
+        self._pose[2] = agent.direction
+        self._bump[0] = agent.bump_sensor
+        if self.copy_observations:
+            return {name: view.copy() for name, view in self._observation.items()}
+        return self._observation
+
+    def reset(self, *, seed: int | None = None, options: dict | None = None):
+        """
+        Place the agent at a random collision-free pose.
+
+        Args:
+            seed (int, optional): Reseeds the placement generator.
+            options (dict, optional): "pose" gives an (x, y, direction) to
+                start from instead of a random one.
+
+        Returns:
+            tuple: (observation, info)
+        """
+        if seed is not None:
+            self.np_random = np.random.default_rng(seed)
+        agent = self.agent
+        if options and "pose" in options:
+            agent.x, agent.y, agent.direction = options["pose"]
+        else:
+            left, top, right, bottom = agent.bounds
+            radius = agent.body_radius
+            for _ in range(1000):
+                x = self.np_random.uniform(left + radius, right - radius)
+                y = self.np_random.uniform(top + radius, bottom - radius)
+                if not circle_collisions(
+                    np.array([x]), np.array([y]), radius, self._rects, agent.bounds
+                )[0]:
+                    break
+            else:
+                raise RuntimeError("Could not find a free spot for the agent")
+            agent.x, agent.y = x, y
+            agent.direction = int(self.np_random.integers(0, 8)) * 45
+        agent.bump_sensor = False
+        self.steps = 0
+        return self._observe(), {}
+
+    def step(self, action: int):
+        """
+        Apply one action, then scan.
+
+        Args:
+            action (int): FORWARD, BACKWARD, ROTATE_LEFT or ROTATE_RIGHT.
+
+        Returns:
+            tuple: (observation, reward, terminated, truncated, info)
+        """
+        self._moves[action]()
+        self.steps += 1
+        observation = self._observe()
+        truncated = self.max_steps is not None and self.steps >= self.max_steps
+        return observation, self.reward(), False, truncated, {}
+
+    def reward(self) -> float:
+        """Reward of the current state. The plain simulator has no task."""
+        return 0.0
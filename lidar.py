@@ -0,0 +1,427 @@
+import numpy as np
+from constants import (
+    LEFT_BOUNDARY,
+    RIGHT_BOUNDARY,
+    TOP_BOUNDARY,
+    BOTTOM_BOUNDARY,
+)
+from spatial_index import EdgeGrid
+
+
+def arena_bounds() -> tuple[float, float, float, float]:
+    """
+    Get the default arena bounds from the constants module.
+
+    Returns:
+        tuple: (left, top, right, bottom) of the arena.
+    """
+    return (LEFT_BOUNDARY, TOP_BOUNDARY, RIGHT_BOUNDARY, BOTTOM_BOUNDARY)
+
+
+def wall_edges(walls: list) -> np.ndarray:
+    """
+    Pack the edges of every wall into a single array.
+
+    Args:
+        walls (list): List of Wall objects, or a CompiledWorld whose edge
+            array is returned as is.
+
+    Returns:
+        np.ndarray: (E, 4) float array of [x1, y1, x2, y2] rows.
+    """
+    if not isinstance(walls, list) and hasattr(walls, "edges"):
+        return walls.edges
+    if not walls:
+        return np.empty((0, 4), dtype=np.float64)
+    return np.array(
+        [[*start, *end] for wall in walls for start, end in wall.edges],
+        dtype=np.float64,
+    )
+
+
+def boundary_edges(bounds: tuple[float, float, float, float]) -> np.ndarray:
+    """
+    Build the four arena boundary segments.
+
+    Args:
+        bounds (tuple): (left, top, right, bottom) of the arena.
+
+    Returns:
+        np.ndarray: (4, 4) float array of [x1, y1, x2, y2] rows.
+    """
+    left, top, right, bottom = bounds
+    return np.array(
+        [
+            [left, top, right, top],  # Top
+            [right, top, right, bottom],  # Right
+            [right, bottom, left, bottom],  # Bottom
+            [left, bottom, left, top],  # Left
+        ],
+        dtype=np.float64,
+    )
+
+
+def beam_endpoints(
+    x: float | np.ndarray,
+    y: float | np.ndarray,
+    direction: float | np.ndarray,
+    angles: np.ndarray,
+    max_range: float,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Compute the start and end points of every LiDAR beam.
+
+    Mirrors the reference scan: the origin and the endpoints are truncated to
+    integers before any intersection test is made. Passing (K,) arrays for
+    the pose gives (K, B) outputs, one row per agent.
+
+    Args:
+        x (float | np.ndarray): x-coordinate of the agent(s).
+        y (float | np.ndarray): y-coordinate of the agent(s).
+        direction (float | np.ndarray): Heading of the agent(s) in degrees.
+        angles (np.ndarray): (B,) beam angles in degrees, relative to the heading.
+        max_range (float): Maximum range of the LiDAR.
+
+    Returns:
+        tuple: (start_x, start_y, end_x, end_y) arrays, one entry per beam.
+    """
+    agent_x = np.trunc(np.asarray(x, dtype=np.float64))[..., None]
+    agent_y = np.trunc(np.asarray(y, dtype=np.float64))[..., None]
+    laser_angles = np.radians(np.asarray(direction)[..., None] + angles)
+    end_x = np.trunc(agent_x + max_range * np.cos(laser_angles))
+    end_y = np.trunc(agent_y - max_range * np.sin(laser_angles))
+    start_x = np.broadcast_to(agent_x, end_x.shape)
+    start_y = np.broadcast_to(agent_y, end_y.shape)
+    return start_x, start_y, end_x, end_y
+
+
+def segment_hits(
+    x1: np.ndarray,
+    y1: np.ndarray,
+    beam_dx: np.ndarray,
+    beam_dy: np.ndarray,
+    x3: np.ndarray,
+    y3: np.ndarray,
+    edge_dx: np.ndarray,
+    edge_dy: np.ndarray,
+) -> np.ndarray:
+    """
+    Parametric segment-segment test shared by all engines.
+
+    Uses the same formula as Wall.line_intersection, so a beam only registers
+    a hit when both the beam and the edge parameters lie in [0, 1]. The inputs
+    broadcast against each other, so callers can pair beams with edges either
+    one-to-one or all-to-all.
+
+    Args:
+        x1 (np.ndarray): Beam start x-coordinates.
+        y1 (np.ndarray): Beam start y-coordinates.
+        beam_dx (np.ndarray): Beam start x minus beam end x.
+        beam_dy (np.ndarray): Beam start y minus beam end y.
+        x3 (np.ndarray): Edge start x-coordinates.
+        y3 (np.ndarray): Edge start y-coordinates.
+        edge_dx (np.ndarray): Edge start x minus edge end x.
+        edge_dy (np.ndarray): Edge start y minus edge end y.
+
+    Returns:
+        np.ndarray: Beam parameter of each hit, inf where there is none.
+    """
+    denom = beam_dx * edge_dy - beam_dy * edge_dx
+    parallel = np.abs(denom) < 1e-10
+    denom = np.where(parallel, 1.0, denom)
+    t = ((x1 - x3) * edge_dy - (y1 - y3) * edge_dx) / denom
+    u = -(beam_dx * (y1 - y3) - beam_dy * (x1 - x3)) / denom
+
+    hit = ~parallel & (t >= 0) & (t <= 1) & (u >= 0) & (u <= 1)
+    return np.where(hit, t, np.inf)
+
+
+def intersect_beams(
+    start_x: np.ndarray,
+    start_y: np.ndarray,
+    end_x: np.ndarray,
+    end_y: np.ndarray,
+    edges: np.ndarray,
+) -> np.ndarray:
+    """
+    Intersect every beam with every edge in one broadcasted pass.
+
+    Args:
+        start_x (np.ndarray): (B,) beam start x-coordinates.
+        start_y (np.ndarray): (B,) beam start y-coordinates.
+        end_x (np.ndarray): (B,) beam end x-coordinates.
+        end_y (np.ndarray): (B,) beam end y-coordinates.
+        edges (np.ndarray): (E, 4) array of [x1, y1, x2, y2] edges.
+
+    Returns:
+        np.ndarray: (B,) beam parameter of the nearest hit, inf if none.
+    """
+    hits = segment_hits(
+        start_x[:, None],
+        start_y[:, None],
+        (start_x - end_x)[:, None],
+        (start_y - end_y)[:, None],
+        edges[:, 0],
+        edges[:, 1],
+        edges[:, 0] - edges[:, 2],
+        edges[:, 1] - edges[:, 3],
+    )
+    return hits.min(axis=1, initial=np.inf)
+
+
+class LidarEngine:
+    """
+    Base class for LiDAR engines.
+
+    Subclasses implement cast(), which returns the beam parameter of the
+    nearest hit for a batch of beams. Beams may start from different origins,
+    so the same engine serves a single agent or a batch of agents.
+    """
+
+    name = ""
+
+    def cast(
+        self,
+        start_x: np.ndarray,
+        start_y: np.ndarray,
+        end_x: np.ndarray,
+        end_y: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Cast a set of beams and return the parameter of the nearest hit.
+
+        Args:
+            start_x (np.ndarray): (B,) beam start x-coordinates.
+            start_y (np.ndarray): (B,) beam start y-coordinates.
+            end_x (np.ndarray): (B,) beam end x-coordinates.
+            end_y (np.ndarray): (B,) beam end y-coordinates.
+
+        Returns:
+            np.ndarray: (B,) beam parameter of the nearest hit, inf if none.
+        """
+        raise NotImplementedError
+
+    def scan(
+        self,
+        x: float,
+        y: float,
+        direction: float,
+        angles: np.ndarray,
+        max_range: float,
+        out: np.ndarray | None = None,
+    ) -> np.ndarray:
+        """
+        Perform a LiDAR scan from the given pose.
+
+        Args:
+            x (float): x-coordinate of the agent.
+            y (float): y-coordinate of the agent.
+            direction (float): Heading of the agent in degrees.
+            angles (np.ndarray): Beam angles in degrees, relative to the heading.
+            max_range (float): Maximum range of the LiDAR.
+            out (np.ndarray, optional): Array to write the ranges into.
+
+        Returns:
+            np.ndarray: Distance to the nearest obstacle for every beam, out
+                if it was given.
+        """
+        start_x, start_y, end_x, end_y = beam_endpoints(
+            x, y, direction, angles, max_range
+        )
+        nearest = self.cast(start_x, start_y, end_x, end_y)
+        lengths = np.hypot(end_x - start_x, end_y - start_y)
+        return np.minimum(nearest * lengths, max_range, out=out)
+
+
+class NumpyLidar(LidarEngine):
+    """
+    Brute-force LiDAR engine that tests all beams against all edges at once.
+
+    The wall edges and the arena boundaries are packed into a single (E, 4)
+    array when the engine is built, so a scan is a handful of array operations
+    instead of 360 x 4 x N_walls Python-level intersection tests.
+    """
+
+    name = "numpy"
+
+    def __init__(
+        self,
+        walls: list,
+        bounds: tuple[float, float, float, float] | None = None,
+        max_pairs: int = 1 << 20,
+    ) -> None:
+        """
+        Initialize the NumpyLidar.
+
+        Args:
+            walls (list): List of Wall objects in the environment.
+            bounds (tuple, optional): (left, top, right, bottom) of the arena.
+                Defaults to the bounds in constants.py.
+            max_pairs (int, optional): Upper bound on beam-edge pairs evaluated
+                per pass, used to cap memory on very large worlds.
+        """
+        self.bounds = bounds if bounds is not None else arena_bounds()
+        self.edges = np.vstack([wall_edges(walls), boundary_edges(self.bounds)])
+        self.max_pairs = max_pairs
+
+    def cast(
+        self,
+        start_x: np.ndarray,
+        start_y: np.ndarray,
+        end_x: np.ndarray,
+        end_y: np.ndarray,
+    ) -> np.ndarray:
+        """Test every beam against every edge, in chunks of max_pairs."""
+        num_beams = max(len(start_x), 1)
+        step = max(self.max_pairs // num_beams, 1)
+        if step >= len(self.edges):
+            return intersect_beams(start_x, start_y, end_x, end_y, self.edges)
+
+        nearest = np.full(len(start_x), np.inf)
+        for i in range(0, len(self.edges), step):
+            np.minimum(
+                nearest,
+                intersect_beams(
+                    start_x, start_y, end_x, end_y, self.edges[i : i + step]
+                ),
+                out=nearest,
+            )
+        return nearest
+
+
+class GridLidar(LidarEngine):
+    """
+    LiDAR engine that walks each beam through a uniform grid of wall edges.
+
+    All beams advance together with a vectorized DDA traversal: each pass
+    tests the active beams against the edges in their current cell, and a
+    beam retires as soon as its nearest hit lies inside that cell or it
+    leaves the grid. Scan cost then depends on how much clutter the beams
+    pass through rather than on the total number of walls.
+    """
+
+    name = "grid"
+
+    def __init__(
+        self,
+        walls: list,
+        bounds: tuple[float, float, float, float] | None = None,
+        cell_size: float | None = None,
+    ) -> None:
+        """
+        Initialize the GridLidar.
+
+        Args:
+            walls (list): List of Wall objects in the environment.
+            bounds (tuple, optional): (left, top, right, bottom) of the arena.
+                Defaults to the bounds in constants.py.
+            cell_size (float, optional): Side length of a grid cell. Defaults
+                to EdgeGrid's automatic choice.
+        """
+        self.bounds = bounds if bounds is not None else arena_bounds()
+        self.boundaries = boundary_edges(self.bounds)
+        self.grid = EdgeGrid(wall_edges(walls), self.bounds, cell_size)
+
+    def cast(
+        self,
+        start_x: np.ndarray,
+        start_y: np.ndarray,
+        end_x: np.ndarray,
+        end_y: np.ndarray,
+    ) -> np.ndarray:
+        """Walk the beams through the grid, then clip them to the arena."""
+        grid = self.grid
+        edges = grid.edges
+        nearest = intersect_beams(start_x, start_y, end_x, end_y, self.boundaries)
+        if not len(edges):
+            return nearest
+
+        beam_dx, beam_dy = end_x - start_x, end_y - start_y
+        size = grid.cell_size
+        cell_x = np.floor((start_x - grid.origin_x) / size).astype(np.intp)
+        cell_y = np.floor((start_y - grid.origin_y) / size).astype(np.intp)
+        step_x = np.sign(beam_dx).astype(np.intp)
+        step_y = np.sign(beam_dy).astype(np.intp)
+
+        # Beam parameter at the next vertical/horizontal cell border, and the
+        # parameter needed to cross one whole cell in each axis.
+        with np.errstate(divide="ignore", invalid="ignore"):
+            border_x = grid.origin_x + (cell_x + (step_x > 0)) * size
+            border_y = grid.origin_y + (cell_y + (step_y > 0)) * size
+            t_max_x = np.where(step_x != 0, (border_x - start_x) / beam_dx, np.inf)
+            t_max_y = np.where(step_y != 0, (border_y - start_y) / beam_dy, np.inf)
+            t_delta_x = np.where(step_x != 0, size / np.abs(beam_dx), np.inf)
+            t_delta_y = np.where(step_y != 0, size / np.abs(beam_dy), np.inf)
+
+        active = np.flatnonzero(
+            (cell_x >= 0) & (cell_x < grid.nx) & (cell_y >= 0) & (cell_y < grid.ny)
+        )
+        while active.size:
+            owners, edge_ids = grid.gather(cell_y[active] * grid.nx + cell_x[active])
+            if edge_ids.size:
+                beams = active[owners]
+                candidate = edges[edge_ids]
+                hits = segment_hits(
+                    start_x[beams],
+                    start_y[beams],
+                    -beam_dx[beams],
+                    -beam_dy[beams],
+                    candidate[:, 0],
+                    candidate[:, 1],
+                    candidate[:, 0] - candidate[:, 2],
+                    candidate[:, 1] - candidate[:, 3],
+                )
+                np.minimum.at(nearest, beams, hits)
+
+            t_exit = np.minimum(t_max_x[active], t_max_y[active])
+            active = active[(nearest[active] > t_exit) & (t_exit <= 1)]
+
+            along_x = t_max_x[active] < t_max_y[active]
+            moved_x, moved_y = active[along_x], active[~along_x]
+            cell_x[moved_x] += step_x[moved_x]
+            t_max_x[moved_x] += t_delta_x[moved_x]
+            cell_y[moved_y] += step_y[moved_y]
+            t_max_y[moved_y] += t_delta_y[moved_y]
+
+            active = active[
+                (cell_x[active] >= 0)
+                & (cell_x[active] < grid.nx)
+                & (cell_y[active] >= 0)
+                & (cell_y[active] < grid.ny)
+            ]
+        return nearest
+
+
+LIDAR_BACKENDS = {
+    NumpyLidar.name: NumpyLidar,
+    GridLidar.name: GridLidar,
+}
+
+
+def make_lidar(
+    backend: str,
+    walls: list,
+    bounds: tuple[float, float, float, float] | None = None,
+):
+    """
+    Build a LiDAR engine by backend name.
+
+    Args:
+        backend (str): Name of a registered backend, e.g. "numpy" or "grid".
+        walls (list): List of Wall objects in the environment.
+        bounds (tuple, optional): (left, top, right, bottom) of the arena.
+
+    Returns:
+        An engine exposing scan() and cast().
+
+    Raises:
+        ValueError: If the backend name is not registered.
+    """
+    try:
+        engine_cls = LIDAR_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown LiDAR backend {backend!r}, "
+            f"expected one of {sorted(LIDAR_BACKENDS)}"
+        ) from None
+    return engine_cls(walls, bounds)
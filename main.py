@@ -2,13 +2,18 @@ import io
 import pygame
 import sys
 import os
-import json
+import time
 import numpy as np
+import matplotlib
+
+# Plots are rendered to images on the plot worker thread. GUI backends such
+# as TkAgg (picked because tkinter is installed) must only be used from the
+# main thread, so stick to the non-interactive Agg backend
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 from PIL import Image
 from tkinter import Tk, filedialog
-from agent import Agent
-from wall import Wall
+from simulation import Simulation
 from button import Button
 from constants import (
     LEFT_BOUNDARY,
@@ -18,9 +23,16 @@ from constants import (
     GREEN,
     RED,
     BLACK,
+    WHITE,
 )
-from controller_random import RandomController
 from text_input import TextInput
+from activation_renderer import ActivationPanel
+from renderer import LayeredRenderer
+from viewport import Viewport
+from recorder import TrajectoryRecorder
+from replay import ReplayPlayer
+from profiler import PhaseProfiler
+from plot_worker import PlotWorker
 
 from AlabiHippocampalModel.layers.head_direction_layer import HeadDirectionLayer
 from AlabiHippocampalModel.layers.boundary_vector_cell_layer import (
@@ -40,6 +52,32 @@ def plot_to_surface(fig):
     return pygame.image.fromstring(img.tobytes(), img.size, img.mode)
 
 
+def render_bvc_plot(lidar_ranges):
+    """Renders the matplotlib BVC activation plot, on the plot worker thread."""
+    fig = plot_bvc_layer.plot_activation(
+        lidar_ranges, lidar_angles_rad, return_plot=True
+    )
+    return plot_to_surface(fig)
+
+
+def render_bvc_heatmap_plot(lidar_ranges):
+    """Renders the matplotlib BVC activation heatmap, on the plot worker thread."""
+    activations = plot_bvc_layer.get_bvc_activation(lidar_ranges, lidar_angles_rad)
+    fig, ax = plt.subplots()
+    ax.imshow(np.asarray(activations).reshape(bvc_n_hd, -1), aspect="auto")
+    ax.set_xlabel("Distance ring")
+    ax.set_ylabel("Direction")
+    ax.set_title("BVC Heatmap")
+    return plot_to_surface(fig)
+
+
+def render_hd_plot(direction):
+    """Renders the matplotlib HD activation plot, on the plot worker thread."""
+    plot_hd_layer.get_head_direction_activation(theta_i=direction)
+    fig = plot_hd_layer.plot_activation(plot_type="radial", return_plot=True)
+    return plot_to_surface(fig)
+
+
 def load_walls_file_dialogue():
     """
     Uses the tkinter file dialogue to select the file to open.
@@ -58,15 +96,16 @@ def load_walls_file_dialogue():
 def load_walls(filename):
     """
     Takes the file name and loads in the file.
-    Puts all wall objects into the wall object and updates agent's internal memory.
+    Hands the walls to the simulation and keeps a reference for drawing.
     """
-    global agent
-    global walls
+    global walls, world_file
     if filename:
-        with open(filename, "r") as f:
-            walls = [Wall.from_dict(data) for data in json.load(f)]
-        walls = walls
-        agent.walls = walls
+        sim.load_walls(filename)
+        walls = sim.walls
+        world_file = filename
+        if viewport is not None:
+            viewport.set_bounds(agent.bounds)
+            viewport.center_on(agent.x, agent.y)
 
 
 def toggle_laser():
@@ -96,6 +135,123 @@ def set_clock_rate():
         pass
 
 
+def toggle_plot_renderer():
+    """Switches activation panels between the native renderer and matplotlib."""
+    global plot_renderer, text_surfaces
+    plot_renderer = "matplotlib" if plot_renderer == "native" else "native"
+    text_surfaces[8] = font.render(f"Plot Renderer: {plot_renderer}", True, BLACK)
+
+
+def toggle_recording():
+    """Starts recording the agent's trajectory to a new file, or stops it."""
+    global text_surfaces
+    if sim.recorder is None:
+        os.makedirs("recordings", exist_ok=True)
+        filename = os.path.join(
+            "recordings", time.strftime("%Y%m%d-%H%M%S") + ".traj"
+        )
+        sim.recorder = TrajectoryRecorder(
+            filename,
+            len(agent.lidar_angles),
+            agent.lidar_max_range,
+            metadata={
+                "controller": type(controller).__name__,
+                "world": world_file,
+                "bounds": list(agent.bounds),
+            },
+        )
+        # Recorded scans are always fresh, not rotated copies of earlier ones
+        agent.reuse_rotated_scans = False
+        text_surfaces[9] = font.render(
+            f"Recording: {os.path.basename(filename)}", True, RED
+        )
+    else:
+        sim.recorder.close()
+        sim.recorder = None
+        agent.reuse_rotated_scans = True
+        text_surfaces[9] = font.render("Recording: OFF (r)", True, BLACK)
+
+
+def toggle_replay():
+    """
+    Uses the tkinter file dialogue to pick a recording and replays it.
+    Leaves replay mode instead if a recording is already playing.
+    """
+    global root, replay
+    if replay is not None:
+        replay = None
+        return
+    root = Tk()
+    root.withdraw()
+    filename = filedialog.askopenfilename(
+        defaultextension=".traj", filetypes=[("Trajectory files", "*.traj")]
+    )
+    if filename:
+        start_replay(filename)
+
+
+def start_replay(filename):
+    """Replays a recording, loading the world it was recorded in if known."""
+    global replay
+    replay = ReplayPlayer.from_file(filename, agent)
+    world = replay.reader.metadata.get("world")
+    if world and os.path.exists(world):
+        load_walls(world)
+
+
+def handle_replay_key(key):
+    """Playback controls: pause, step, speed and seeking to 0-90%."""
+    if key == pygame.K_SPACE:
+        replay.toggle_pause()
+    elif key == pygame.K_PERIOD:
+        replay.seek(replay.step + 1)
+    elif key == pygame.K_COMMA:
+        replay.seek(replay.step - 1)
+    elif key == pygame.K_RIGHTBRACKET:
+        replay.change_speed(1)
+    elif key == pygame.K_LEFTBRACKET:
+        replay.change_speed(-1)
+    elif pygame.K_0 <= key <= pygame.K_9:
+        replay.seek_fraction((key - pygame.K_0) / 10)
+
+
+def toggle_profiler():
+    """Starts timing main loop phases and shows the overlay, or stops."""
+    profiler.enabled = not profiler.enabled
+    profiler.reset()
+
+
+def export_profile():
+    """
+    Writes the current phase timings to profiles/ as JSON and CSV.
+    Refuses while the profiler is off or has no samples, since the files
+    would be empty. The outcome is shown under the profiler overlay.
+    """
+    global profile_status, profile_status_until
+    if not profiler.enabled:
+        message = "Profiler off, press f before exporting"
+    elif not profiler.stats():
+        message = "No timings yet, nothing exported"
+    else:
+        os.makedirs("profiles", exist_ok=True)
+        filename = os.path.join("profiles", time.strftime("%Y%m%d-%H%M%S"))
+        profiler.export(filename + ".json")
+        profiler.export(filename + ".csv")
+        message = f"Exported {filename}.json and .csv"
+    profile_status = profiler_font.render(message, True, WHITE, BLACK)
+    profile_status_until = time.perf_counter() + 3
+
+
+def cycle_steps_per_frame():
+    """Cycles the number of simulation steps run for each displayed frame."""
+    global steps_per_frame, text_surfaces
+    index = STEPS_PER_FRAME_OPTIONS.index(steps_per_frame)
+    steps_per_frame = STEPS_PER_FRAME_OPTIONS[
+        (index + 1) % len(STEPS_PER_FRAME_OPTIONS)
+    ]
+    text_surfaces[1] = font.render(f"Steps/Frame: {steps_per_frame} (k)", True, BLACK)
+
+
 def set_max_speed():
     """Sets the clock rate to 0 (max speed) or back to the previous clock rate."""
     global clock_rate, clock, max_speed, text_surfaces, previous_clock_rate
@@ -121,26 +277,67 @@ screen = pygame.display.set_mode((1600, 600))
 pygame.display.set_caption("Simulation Window")
 
 # Define core components of sim
-walls = []
-agent = Agent(x=400, y=300, direction=0, walls=walls)
-controller = RandomController(model=None, agent=agent)
-
-# Load in walls
+sim = Simulation(controller_running=False)
+walls = sim.walls
+agent = sim.agent
+controller = sim.controller
+
+# Times each phase of the main loop, shared with the simulation
+profiler = PhaseProfiler(window=300)
+sim.profiler = profiler
+
+# Outcome of the last profile export and until when it is shown
+profile_status = None
+profile_status_until = 0.0
+
+# Load in walls. The viewport onto them is created with the screen layout
+world_file = None
+viewport = None
 load_walls("worlds/test3.json")
 
+# Replay of a recorded run, None while simulating live
+replay = None
+replay_status_pos = (850, 480)
+
 # Define clock rate variable
 clock_rate = 60
 previous_clock_rate = clock_rate
 max_speed = False
 
+# Simulation steps per displayed frame. "auto" steps for whatever part of
+# the frame period drawing leaves over, at AUTO_FRAME_RATE when at max speed
+STEPS_PER_FRAME_OPTIONS = [1, 4, 16, 64, "auto"]
+AUTO_FRAME_RATE = 30
+steps_per_frame = 1
+
+bvc_n_hd = 8
+
+
+def make_bvc_layer():
+    """Builds the BVC layer used for the activation plots."""
+    return BoundaryVectorCellLayer(
+        max_dist=300,
+        input_dim=360,
+        n_hd=bvc_n_hd,
+        sigma_ang=90,
+        sigma_d=20,
+    )
+
+
 hd_layer = HeadDirectionLayer(num_cells=8, theta_0=0.0, unit="degree")
-bvc_layer = BoundaryVectorCellLayer(
-    max_dist=300,
-    input_dim=360,
-    n_hd=8,
-    sigma_ang=90,
-    sigma_d=20,
-)
+bvc_layer = make_bvc_layer()
+lidar_angles_rad = np.deg2rad(np.array(agent.lidar_angles))
+
+# Activation plots are drawn natively unless matplotlib is selected
+plot_renderer = "native"
+activation_panel = ActivationPanel((400, 300))
+
+# Matplotlib plots are rendered off the main loop from the newest snapshot.
+# The layers keep state between calls, so the worker has its own layers and
+# never touches the ones the main thread uses for the native panels
+plot_worker = PlotWorker()
+plot_hd_layer = HeadDirectionLayer(num_cells=8, theta_0=0.0, unit="degree")
+plot_bvc_layer = make_bvc_layer()
 
 # Define buttons
 buttons = [
@@ -157,18 +354,20 @@ clock_rate_input = TextInput(x=960, y=230, width=50, height=50)
 # Define on-screen text that renders in a block
 font = pygame.font.Font(None, 24)
 text_surfaces = [
-    font.render("Load Wall Shortcut: u", True, BLACK),
-    font.render("See LiDAR Shortcut: i", True, BLACK),
-    font.render("Quit sim shortcut: q", True, BLACK),
+    font.render("Load Walls: u, See LiDAR: i", True, BLACK),
+    font.render(f"Steps/Frame: {steps_per_frame} (k)", True, BLACK),
+    font.render("Quit: q, Profiler: f (export: e)", True, BLACK),
     font.render("Toggle Controller: c", True, BLACK),
     font.render(
         "Controller ENABLED" if controller.running else "Controller DISABLED",
         True,
         GREEN if controller.running else RED,
     ),
-    font.render("Move agent manually: Arrow Keys", True, BLACK),
+    font.render("Move: Arrow Keys, Replay: p", True, BLACK),
     font.render(f"Clock Rate: {clock_rate}", True, BLACK),
-    font.render("Actual Speed: Calculating...", True, BLACK),
+    font.render("Speed: Calculating...", True, BLACK),
+    font.render(f"Plot Renderer: {plot_renderer}", True, BLACK),
+    font.render("Recording: OFF (r)", True, BLACK),
 ]
 
 
@@ -216,6 +415,11 @@ def bvc_activation_action():
     selected_plot = "bvc_activation"
 
 
+def bvc_heatmap_action():
+    global selected_plot
+    selected_plot = "bvc_heatmap"
+
+
 def hdc_activation_action():
     global selected_plot
     selected_plot = "hdc_activation"
@@ -226,6 +430,7 @@ radio_buttons = [
     RadioButton(870, 360, 10, "No Plot", no_plot_action),
     RadioButton(870, 390, 10, "BVC Activation", bvc_activation_action),
     RadioButton(870, 420, 10, "HDC Activation", hdc_activation_action),
+    RadioButton(870, 450, 10, "BVC Heatmap", bvc_heatmap_action),
 ]
 
 # Initial selected plot
@@ -233,12 +438,73 @@ selected_plot = "no_plot"
 radio_buttons[0].selected = True  # Default to "No Plot"
 
 
+def draw_chrome(surface):
+    """Draws the UI that only changes in response to input."""
+    # Draw a light grey square with "No plot rendered" text
+    if selected_plot == "no_plot":
+        pygame.draw.rect(surface, (200, 200, 200), plot_rect)
+        no_plot_surface = font.render("No plot rendered", True, BLACK)
+        surface.blit(
+            no_plot_surface, (1400 - no_plot_surface.get_width() // 2, 250)
+        )  # Center text
+
+    # Draw the buttons
+    for button in buttons:
+        button.draw(surface)
+
+    # Draw radio buttons
+    for radio_button in radio_buttons:
+        radio_button.draw(surface)
+
+    # Draw text input
+    clock_rate_input.update()
+    clock_rate_input.draw(surface)
+
+    # Draw text
+    x, y = text_rect.topleft
+    for text_surface in text_surfaces:
+        surface.blit(text_surface, (x, y))
+        y += 20
+
+
+# Static content is cached and only changed areas are pushed to the display
+arena_rect = pygame.Rect(
+    LEFT_BOUNDARY,
+    TOP_BOUNDARY,
+    RIGHT_BOUNDARY - LEFT_BOUNDARY,
+    BOTTOM_BOUNDARY - TOP_BOUNDARY,
+)
+chrome_rect = pygame.Rect(RIGHT_BOUNDARY, 0, 1600 - RIGHT_BOUNDARY, 600)
+plot_rect = pygame.Rect(1200, 100, 400, 300)
+plot_rate_pos = (plot_rect.x + 5, plot_rect.y + 5)
+text_rect = pygame.Rect(1300, 400, 300, 200)
+renderer = LayeredRenderer(screen, arena_rect, draw_chrome)
+viewport = Viewport(arena_rect, agent.bounds)
+viewport.center_on(agent.x, agent.y)
+profiler_font = pygame.font.SysFont("monospace", 14)
+
+# Render rate and simulation rate are measured separately and shown twice
+# a second
+speed_interval = 0.5
+speed_time = time.perf_counter()
+speed_steps = sim.steps
+# Time spent on everything but stepping in the last frame, for "auto"
+render_time = 0.0
+
+
 # Main game loop
 running = True
 while running:
+    profiler.start_frame()
+    frame_start = time.perf_counter()
+
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
+        elif event.type == pygame.KEYDOWN and clock_rate_input.active:
+            # A focused text field takes the keyboard, so typing into it
+            # neither triggers shortcuts nor seeks a replay
+            clock_rate_input.handle_event(event)
         elif event.type == pygame.KEYDOWN:
             if event.key == pygame.K_q:
                 running = False
@@ -250,6 +516,20 @@ while running:
                 buttons[2].action()
             if event.key == pygame.K_m:
                 buttons[4].action()
+            if event.key == pygame.K_k:
+                cycle_steps_per_frame()
+            if event.key == pygame.K_g:
+                toggle_plot_renderer()
+            if event.key == pygame.K_r:
+                toggle_recording()
+            if event.key == pygame.K_p:
+                toggle_replay()
+            elif replay is not None:
+                handle_replay_key(event.key)
+            if event.key == pygame.K_f:
+                toggle_profiler()
+            if event.key == pygame.K_e:
+                export_profile()
         elif event.type == pygame.MOUSEBUTTONDOWN:
             # Check for button clicks
             for button in buttons:
@@ -263,94 +543,135 @@ while running:
                     radio_button.selected = True
                     radio_button.action()
 
-        clock_rate_input.handle_event(event)
+            clock_rate_input.handle_event(event)
 
-    # Get the state of all keyboard buttons
-    keys = pygame.key.get_pressed()
+        # Any input may change buttons, text or the selected plot
+        if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+            renderer.invalidate(chrome_rect)
 
-    # Handle agent's movement
-    agent.handle_move_keys(keys)
-
-    # Fill the screen with a white color
-    screen.fill((255, 255, 255))
-
-    # Draw the left half as the navigation area
-    pygame.draw.rect(
-        screen,
-        (200, 200, 200),
-        (
-            LEFT_BOUNDARY,
-            TOP_BOUNDARY,
-            RIGHT_BOUNDARY - LEFT_BOUNDARY,
-            BOTTOM_BOUNDARY - TOP_BOUNDARY,
-        ),
-    )
+    profiler.lap("events")
 
-    # Agent scans environment
-    agent.scan()
+    # Get the state of all keyboard buttons
+    keys = pygame.key.get_pressed()
 
-    # Controller does its work
-    controller.handle_input()
-    controller.move_agent()
+    # Handle agent's movement, a replay controls the agent by itself
+    if replay is None:
+        agent.handle_move_keys(keys)
+
+    # Agent scans environment and the controller does its work for this
+    # frame's steps, or the recorded pose and scan of the next step are shown
+    step_start = time.perf_counter()
+    if replay is not None:
+        replay.advance()
+    elif steps_per_frame == "auto":
+        frame_period = 1 / (clock_rate or AUTO_FRAME_RATE)
+        sim.step_for(frame_period - render_time)
+    else:
+        sim.step(steps_per_frame)
+    step_end = time.perf_counter()
+    profiler.lap("step")
 
-    # Draw the walls
-    for wall in walls:
-        wall.draw(screen)
+    # Keep the agent in view, then restore the cached arena, walls and UI
+    # under last frame's drawing, redrawing the arena if the view scrolled
+    viewport.follow(agent.x, agent.y)
+    renderer.begin_frame(walls, agent.world_version, viewport)
 
     # Draw the agent
-    agent.draw(screen)
+    screen.set_clip(arena_rect)
+    agent.draw(screen, viewport.offset)
+    screen.set_clip(None)
+    renderer.add_dirty(agent.get_draw_rect(viewport.offset).clip(arena_rect))
+    profiler.lap("draw")
 
     # Display plot based on the selected radio button
     if selected_plot == "bvc_activation":
-        fig = bvc_layer.plot_activation(
-            np.array(agent.lidar_ranges),
-            np.deg2rad(np.array(agent.lidar_angles)),
-            return_plot=True,
-        )
-        plot_surface = plot_to_surface(fig)
-        screen.blit(plot_surface, (1200, 100))
+        lidar_ranges = np.asarray(agent.lidar_ranges)
+        if plot_renderer == "native":
+            activations = bvc_layer.get_bvc_activation(lidar_ranges, lidar_angles_rad)
+            plot_surface = activation_panel.draw_polar(
+                np.asarray(activations), (bvc_n_hd, -1), "BVC Activation"
+            )
+        else:
+            plot_worker.submit(selected_plot, render_bvc_plot, lidar_ranges.copy())
+            plot_surface = plot_worker.latest(selected_plot)
+    elif selected_plot == "bvc_heatmap":
+        lidar_ranges = np.asarray(agent.lidar_ranges)
+        if plot_renderer == "native":
+            activations = bvc_layer.get_bvc_activation(lidar_ranges, lidar_angles_rad)
+            plot_surface = activation_panel.draw_heatmap(
+                np.asarray(activations), (bvc_n_hd, -1), "BVC Heatmap"
+            )
+        else:
+            plot_worker.submit(
+                selected_plot, render_bvc_heatmap_plot, lidar_ranges.copy()
+            )
+            plot_surface = plot_worker.latest(selected_plot)
     elif selected_plot == "hdc_activation":
-        activations = hd_layer.get_head_direction_activation(theta_i=agent.direction)
-        fig = hd_layer.plot_activation(plot_type="radial", return_plot=True)
-        plot_surface = plot_to_surface(fig)
-        screen.blit(plot_surface, (1200, 100))
-    else:
-        # Draw a light grey square with "No plot rendered" text
-        pygame.draw.rect(screen, (200, 200, 200), (1200, 100, 400, 300))  # Grey square
-        no_plot_surface = font.render("No plot rendered", True, BLACK)
-        screen.blit(
-            no_plot_surface, (1400 - no_plot_surface.get_width() // 2, 250)
-        )  # Center text
-
-    # Draw the buttons
-    for button in buttons:
-        button.draw(screen)
-
-    # Draw radio buttons
-    for radio_button in radio_buttons:
-        radio_button.draw(screen)
-
-    # Draw text input
-    clock_rate_input.update()
-    clock_rate_input.draw(screen)
+        if plot_renderer == "native":
+            activations = hd_layer.get_head_direction_activation(
+                theta_i=agent.direction
+            )
+            plot_surface = activation_panel.draw_radial(
+                np.asarray(activations), "HDC Activation"
+            )
+        else:
+            plot_worker.submit(selected_plot, render_hd_plot, agent.direction)
+            plot_surface = plot_worker.latest(selected_plot)
+
+    # Show the plot, matplotlib plots with how often they are refreshed
+    if selected_plot != "no_plot" and plot_surface is not None:
+        screen.blit(plot_surface, plot_rect)
+        if plot_renderer == "matplotlib":
+            rate_surface = font.render(
+                f"Panel: {plot_worker.refresh_rate():.1f} Hz", True, BLACK
+            )
+            screen.blit(rate_surface, plot_rate_pos)
+        renderer.add_dirty(plot_rect)
+
+    profiler.lap("plot")
+
+    # Show the replay position
+    if replay is not None:
+        status_surface = font.render(replay.status(), True, BLACK)
+        screen.blit(status_surface, replay_status_pos)
+        renderer.add_dirty(status_surface.get_rect(topleft=replay_status_pos))
+
+    # Show the phase timings and the outcome of the last export
+    status_pos = (10, 10)
+    if profiler.enabled:
+        overlay_rect = profiler.draw_overlay(screen, status_pos, profiler_font)
+        renderer.add_dirty(overlay_rect)
+        status_pos = (10, overlay_rect.bottom + 4)
+    if profile_status is not None and time.perf_counter() < profile_status_until:
+        renderer.add_dirty(screen.blit(profile_status, status_pos))
+
+    # Update the changed parts of the display
+    renderer.end_frame()
+    profiler.lap("display")
+    render_time = time.perf_counter() - step_end + step_start - frame_start
+
+    # Report the frame rate and the simulation rate
+    now = time.perf_counter()
+    if now - speed_time >= speed_interval:
+        steps_per_second = (sim.steps - speed_steps) / (now - speed_time)
+        text_surfaces[7] = font.render(
+            f"Speed: {clock.get_fps():.0f} FPS, {steps_per_second:.0f} steps/s",
+            True,
+            BLACK,
+        )
+        renderer.invalidate(text_rect)
+        speed_time, speed_steps = now, sim.steps
 
-    # Draw text
-    x, y = 1300, 400
-    for surface in text_surfaces:
-        screen.blit(surface, (x, y))
-        y += 20
+    # Control the frame rate, a clock rate of 0 runs uncapped
+    clock.tick(clock_rate)
+    profiler.lap("idle")
 
-    # Update the display
-    pygame.display.flip()
+# Let a plot in progress finish before matplotlib is torn down
+plot_worker.stop()
 
-    # Control the frame rate and measure actual frame rate if at max speed
-    if clock_rate > 0:
-        clock.tick(clock_rate)
-        actual_speed = clock_rate
-    else:
-        actual_speed = int(clock.get_fps())
-        text_surfaces[7] = font.render(f"Actual Speed: {actual_speed} FPS", True, BLACK)
-        clock.tick()
+# Finish any recording in progress
+if sim.recorder is not None:
+    sim.recorder.close()
 
 # Quit pygame
 pygame.quit()
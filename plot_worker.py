@@ -0,0 +1,111 @@
+import threading
+import time
+import traceback
+from collections import deque
+
+
+class PlotWorker:
+    """
+    Renders plots on a background thread, keeping only the newest request.
+
+    The main loop submits a render function with a snapshot of its inputs
+    and never waits. The worker holds a single pending slot: a submission
+    replaces whatever request is still waiting, so stale requests are
+    dropped instead of queued and the worker always renders the newest
+    state. Finished results are picked up with latest(), which returns the
+    most recent result for a plot until a newer one is done.
+    """
+
+    def __init__(self, rate_window: float = 2.0) -> None:
+        """
+        Initialize the PlotWorker and start its thread.
+
+        Args:
+            rate_window (float, optional): Seconds of finished renders the
+                refresh rate is averaged over. Defaults to 2.0.
+        """
+        self.rate_window = rate_window
+        self.dropped = 0
+        self._condition = threading.Condition()
+        self._pending = None
+        self._results = {}
+        self._finished = deque()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="PlotWorker", daemon=True)
+        self._thread.start()
+
+    def submit(self, key: str, render, *args) -> None:
+        """
+        Request a plot without waiting for it.
+
+        Args:
+            key (str): Name of the plot, e.g. "bvc_activation".
+            render (callable): Called as render(*args) on the worker thread;
+                its return value becomes the result for key.
+            *args: Snapshot of the inputs. Arrays that the caller keeps
+                changing should be copied.
+        """
+        with self._condition:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (key, render, args)
+            self._condition.notify()
+
+    def latest(self, key: str):
+        """
+        Get the most recently finished result for a plot.
+
+        Args:
+            key (str): Name of the plot.
+
+        Returns:
+            The result of the newest finished render for key, or None if
+            none has finished yet.
+        """
+        with self._condition:
+            return self._results.get(key)
+
+    def refresh_rate(self) -> float:
+        """
+        Get the number of renders finished per second recently.
+
+        Returns:
+            float: Renders per second over the last rate_window seconds.
+        """
+        with self._condition:
+            self._expire(time.perf_counter())
+            return len(self._finished) / self.rate_window
+
+    def stop(self) -> None:
+        """Stop the thread once the render in progress, if any, finishes."""
+        with self._condition:
+            self._running = False
+            self._pending = None
+            self._condition.notify()
+        self._thread.join()
+
+    def _expire(self, now: float) -> None:
+        """Forget finish times older than the rate window."""
+        while self._finished and now - self._finished[0] > self.rate_window:
+            self._finished.popleft()
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while self._running and self._pending is None:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                key, render, args = self._pending
+                self._pending = None
+            try:
+                result = render(*args)
+            except Exception:
+                # Keep the worker alive, the next request may well succeed
+                traceback.print_exc()
+                continue
+            with self._condition:
+                self._results[key] = result
+                now = time.perf_counter()
+                self._finished.append(now)
+                self._expire(now)
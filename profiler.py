@@ -0,0 +1,221 @@
+import csv
+import json
+import time
+from contextlib import nullcontext
+import numpy as np
+import pygame
+from constants import BLACK, WHITE
+
+# Shared by every phase of a disabled profiler
+_NULL_PHASE = nullcontext()
+
+
+class _Phase:
+    """Context manager timing one named phase into its profiler."""
+
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "PhaseProfiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.profiler.add_sample(self.name, time.perf_counter() - self.start)
+
+
+class PhaseProfiler:
+    """
+    Times named phases of a loop and keeps rolling statistics for each.
+
+    Code is instrumented either with `with profiler.phase("scan"): ...` or,
+    for a flat loop body, with start_frame() followed by lap("events"),
+    lap("draw"), ... after each section. Every time a phase finishes, its
+    duration goes into a fixed-size ring buffer, from which p50, p95 and
+    max are computed on demand. While the profiler is disabled, phase()
+    returns a shared no-op context manager, laps return immediately and
+    nothing is timed or stored.
+    """
+
+    def __init__(self, window: int = 300, enabled: bool = False) -> None:
+        """
+        Initialize the PhaseProfiler.
+
+        Args:
+            window (int, optional): Number of recent samples kept per phase.
+                Defaults to 300.
+            enabled (bool, optional): Whether phases are timed. Defaults to False.
+        """
+        self.window = window
+        self._enabled = enabled
+        self._frame_start: float | None = None
+        self._last_lap: float | None = None
+        self._phases: dict[str, _Phase] = {}
+        self._samples: dict[str, np.ndarray] = {}
+        self._counts: dict[str, int] = {}
+        self._overlay: pygame.Surface | None = None
+        self._overlay_age = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether phases are timed."""
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, enabled: bool) -> None:
+        self._enabled = enabled
+        # Laps started before a pause would span it
+        self._frame_start = self._last_lap = None
+
+    def phase(self, name: str):
+        """
+        Get a context manager that times a phase.
+
+        Args:
+            name (str): Name of the phase.
+
+        Returns:
+            A context manager; a no-op one while the profiler is disabled.
+        """
+        if not self._enabled:
+            return _NULL_PHASE
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self, name)
+        return phase
+
+    def start_frame(self) -> None:
+        """
+        Mark the start of a loop iteration for lap().
+
+        The time since the previous start_frame() is recorded as "frame".
+        """
+        if not self._enabled:
+            return
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self.add_sample("frame", now - self._frame_start)
+        self._frame_start = self._last_lap = now
+
+    def lap(self, name: str) -> None:
+        """
+        Record the time since the previous lap() or start_frame() as a phase.
+
+        Args:
+            name (str): Name of the phase that just finished.
+        """
+        if not self._enabled:
+            return
+        now = time.perf_counter()
+        if self._last_lap is not None:
+            self.add_sample(name, now - self._last_lap)
+        self._last_lap = now
+
+    def add_sample(self, name: str, seconds: float) -> None:
+        """
+        Record one duration of a phase.
+
+        Can be called directly for durations not measured through phase(),
+        such as the time between frames.
+
+        Args:
+            name (str): Name of the phase.
+            seconds (float): Duration in seconds.
+        """
+        count = self._counts.get(name)
+        if count is None:
+            self._samples[name] = np.zeros(self.window)
+            count = 0
+        self._samples[name][count % self.window] = seconds
+        self._counts[name] = count + 1
+
+    def reset(self) -> None:
+        """Forget every sample."""
+        for name in self._counts:
+            self._counts[name] = 0
+
+    def stats(self) -> dict:
+        """
+        Summarize the samples in the window of every phase.
+
+        Returns:
+            dict: Phase name -> dict with count, mean, p50, p95 and max in
+                milliseconds. count is the total number of samples seen.
+        """
+        stats = {}
+        for name, count in self._counts.items():
+            if not count:
+                continue
+            samples = self._samples[name][: min(count, self.window)] * 1e3
+            p50, p95 = np.percentile(samples, [50, 95])
+            stats[name] = {
+                "count": count,
+                "mean": float(samples.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "max": float(samples.max()),
+            }
+        return stats
+
+    def export(self, filename: str) -> None:
+        """
+        Write the current statistics to a .csv or .json file.
+
+        Args:
+            filename (str): Path of the file; the extension picks the format.
+        """
+        stats = self.stats()
+        if filename.endswith(".csv"):
+            with open(filename, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(["phase", "count", "mean_ms", "p50_ms", "p95_ms", "max_ms"])
+                for name, row in stats.items():
+                    writer.writerow(
+                        [name, row["count"], row["mean"], row["p50"], row["p95"], row["max"]]
+                    )
+        else:
+            with open(filename, "w") as f:
+                json.dump({"window": self.window, "phases_ms": stats}, f, indent=2)
+
+    def draw_overlay(
+        self,
+        surface: pygame.Surface,
+        pos: tuple[int, int],
+        font: pygame.font.Font,
+        refresh: int = 15,
+    ) -> pygame.Rect:
+        """
+        Draw a table of phase statistics onto a surface.
+
+        The table is re-rendered only every refresh calls to keep the
+        overlay itself cheap.
+
+        Args:
+            surface (pygame.Surface): The surface to draw on.
+            pos (tuple): Top-left corner of the table.
+            font (pygame.font.Font): Font for the table.
+            refresh (int, optional): Calls between re-renders. Defaults to 15.
+
+        Returns:
+            pygame.Rect: The area drawn into.
+        """
+        if self._overlay is None or self._overlay_age >= refresh:
+            lines = [f"{'phase':<10}{'p50':>7}{'p95':>7}{'max':>7} ms"]
+            for name, row in self.stats().items():
+                lines.append(
+                    f"{name:<10}{row['p50']:>7.2f}{row['p95']:>7.2f}{row['max']:>7.2f}"
+                )
+            rendered = [font.render(line, True, WHITE) for line in lines]
+            line_height = font.get_linesize()
+            width = max(text.get_width() for text in rendered) + 12
+            self._overlay = pygame.Surface((width, line_height * len(lines) + 8))
+            self._overlay.fill(BLACK)
+            self._overlay.set_alpha(200)
+            for i, text in enumerate(rendered):
+                self._overlay.blit(text, (6, 4 + i * line_height))
+            self._overlay_age = 0
+        self._overlay_age += 1
+        return surface.blit(self._overlay, pos)
@@ -0,0 +1,143 @@
+import math
+import numpy as np
+from lidar import arena_bounds
+
+
+class RateMapAccumulator:
+    """
+    Running occupancy and per-cell activation sums over a grid of the arena.
+
+    Each step adds one to the occupancy of the bin the agent is in and its
+    cell activations to that bin's sums, so memory is O(bins x cells) however
+    long the run. Rate maps are sums divided by occupancy; they are cached
+    and only bins that received steps since the last request are divided
+    again.
+    """
+
+    def __init__(
+        self,
+        num_cells: int,
+        bin_size: float = 20,
+        bounds: tuple[float, float, float, float] | None = None,
+    ) -> None:
+        """
+        Initialize the RateMapAccumulator.
+
+        Args:
+            num_cells (int): Number of cells whose activations are mapped.
+            bin_size (float, optional): Side length of a bin in pixels.
+                Defaults to 20.
+            bounds (tuple, optional): (left, top, right, bottom) of the mapped
+                area. Defaults to the bounds in constants.py.
+        """
+        self.num_cells = num_cells
+        self.bin_size = float(bin_size)
+        self.bounds = bounds if bounds is not None else arena_bounds()
+        left, top, right, bottom = self.bounds
+        self.nx = max(1, math.ceil((right - left) / self.bin_size))
+        self.ny = max(1, math.ceil((bottom - top) / self.bin_size))
+        self.steps = 0
+        self.occupancy = np.zeros(self.nx * self.ny)
+        self.sums = np.zeros((self.nx * self.ny, num_cells))
+        self._rates = np.full((self.nx * self.ny, num_cells), np.nan)
+        self._dirty = np.zeros(self.nx * self.ny, dtype=bool)
+
+    def bin_index(self, x, y) -> np.ndarray:
+        """
+        Get the flat bin index of positions, clipped to the grid.
+
+        Args:
+            x: x-coordinate or array of x-coordinates.
+            y: y-coordinate or array of y-coordinates.
+
+        Returns:
+            np.ndarray: Bin indices, row-major with rows along y.
+        """
+        left, top, _, _ = self.bounds
+        column = np.clip(
+            ((np.asarray(x) - left) // self.bin_size).astype(np.intp), 0, self.nx - 1
+        )
+        row = np.clip(
+            ((np.asarray(y) - top) // self.bin_size).astype(np.intp), 0, self.ny - 1
+        )
+        return row * self.nx + column
+
+    def add(self, x, y, activations) -> None:
+        """
+        Accumulate one step or a batch of steps.
+
+        Works for a single live-loop step, the K agents of a VectorEnv or a
+        chunk of a recording alike.
+
+        Args:
+            x: x-coordinate, or (C,) array of x-coordinates.
+            y: y-coordinate, or (C,) array of y-coordinates.
+            activations: (num_cells,) activations of one step, or
+                (C, num_cells) activations of C steps.
+        """
+        bins = np.atleast_1d(self.bin_index(x, y))
+        activations = np.asarray(activations, dtype=np.float64).reshape(
+            len(bins), self.num_cells
+        )
+        if len(bins) == 1:
+            self.occupancy[bins[0]] += 1
+            self.sums[bins[0]] += activations[0]
+        else:
+            self.occupancy += np.bincount(bins, minlength=len(self.occupancy))
+            np.add.at(self.sums, bins, activations)
+        self._dirty[bins] = True
+        self.steps += len(bins)
+
+    def rate_maps(self) -> np.ndarray:
+        """
+        Get the mean activation of every cell in every bin.
+
+        Returns:
+            np.ndarray: Read-only (ny, nx, num_cells) view. Bins that were
+                never visited are NaN.
+        """
+        dirty = np.flatnonzero(self._dirty)
+        if len(dirty):
+            self._rates[dirty] = self.sums[dirty] / self.occupancy[dirty, None]
+            self._dirty[dirty] = False
+        rates = self._rates.reshape(self.ny, self.nx, self.num_cells).view()
+        rates.flags.writeable = False
+        return rates
+
+    def rate_map(self, cell: int) -> np.ndarray:
+        """
+        Get the rate map of one cell.
+
+        Args:
+            cell (int): Index of the cell.
+
+        Returns:
+            np.ndarray: (ny, nx) mean activation per bin, NaN where unvisited.
+        """
+        return self.rate_maps()[:, :, cell]
+
+    def occupancy_map(self) -> np.ndarray:
+        """
+        Get the number of steps spent in each bin.
+
+        Returns:
+            np.ndarray: (ny, nx) step counts.
+        """
+        return self.occupancy.reshape(self.ny, self.nx)
+
+    def save(self, filename: str) -> None:
+        """
+        Save occupancy, sums and rate maps to an .npz file.
+
+        Args:
+            filename (str): Path of the file to write.
+        """
+        np.savez(
+            filename,
+            bounds=np.asarray(self.bounds, dtype=np.float64),
+            bin_size=self.bin_size,
+            steps=self.steps,
+            occupancy=self.occupancy_map(),
+            sums=self.sums.reshape(self.ny, self.nx, self.num_cells),
+            rate_maps=self.rate_maps(),
+        )
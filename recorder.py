@@ -0,0 +1,233 @@
+import os
+import json
+import struct
+import numpy as np
+
+# File layout: fixed prefix, JSON header padded to DATA_ALIGN, then records
+MAGIC = b"RSIMTRAJ"
+VERSION = 1
+PREFIX = struct.Struct("<8sIIQ")  # magic, version, data offset, record count
+DATA_ALIGN = 64
+
+# uint16 ranges cover [0, max_range] in this many steps
+QUANTIZE_LEVELS = np.iinfo(np.uint16).max
+
+
+def record_dtype(num_beams: int, quantize: bool = False) -> np.dtype:
+    """
+    Get the structured dtype of one recorded step.
+
+    Args:
+        num_beams (int): Number of LiDAR beams.
+        quantize (bool, optional): Store ranges as uint16 instead of float64.
+
+    Returns:
+        np.dtype: Packed little-endian dtype with fields x, y, direction,
+            bump and ranges.
+    """
+    return np.dtype(
+        [
+            ("x", "<f8"),
+            ("y", "<f8"),
+            ("direction", "<f8"),
+            ("bump", "?"),
+            ("ranges", "<u2" if quantize else "<f8", (num_beams,)),
+        ]
+    )
+
+
+class TrajectoryRecorder:
+    """
+    Streams per-step agent state to a binary trajectory file.
+
+    Steps are written into a preallocated structured buffer and appended to
+    the file one chunk at a time, so memory use does not grow with the
+    length of the run. The file is a small header followed by raw records
+    and can be opened without parsing by TrajectoryReader.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        num_beams: int,
+        max_range: float = 2000,
+        quantize: bool = False,
+        chunk_size: int = 4096,
+        metadata: dict | None = None,
+    ) -> None:
+        """
+        Initialize the TrajectoryRecorder and write the file header.
+
+        Args:
+            path (str): File to create. An existing file is overwritten.
+            num_beams (int): Number of LiDAR beams per step.
+            max_range (float, optional): LiDAR max range, used as the top of
+                the uint16 scale when quantizing. Defaults to 2000.
+            quantize (bool, optional): Store ranges as uint16 with a
+                resolution of max_range / 65535. Defaults to False.
+            chunk_size (int, optional): Steps buffered between writes.
+                Defaults to 4096.
+            metadata (dict, optional): Extra JSON-serializable information
+                (world, seed, controller, ...) stored in the header.
+        """
+        self.path = path
+        self.dtype = record_dtype(num_beams, quantize)
+        self.quantize = quantize
+        self.range_scale = max_range / QUANTIZE_LEVELS if quantize else 1.0
+        self.count = 0
+        self._buffer = np.zeros(chunk_size, dtype=self.dtype)
+        self._buffered = 0
+
+        header = json.dumps(
+            {
+                "num_beams": num_beams,
+                "max_range": max_range,
+                "quantize": quantize,
+                "range_scale": self.range_scale,
+                "metadata": metadata or {},
+            }
+        ).encode()
+        offset = -(-(PREFIX.size + len(header)) // DATA_ALIGN) * DATA_ALIGN
+        self.data_offset = offset
+        self._file = open(path, "wb")
+        self._file.write(PREFIX.pack(MAGIC, VERSION, offset, 0))
+        self._file.write(header.ljust(offset - PREFIX.size, b" "))
+
+    def __enter__(self) -> "TrajectoryRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        """Whether the file has been closed."""
+        return self._file.closed
+
+    def record(
+        self, x: float, y: float, direction: float, bump: bool, ranges
+    ) -> None:
+        """
+        Append one step.
+
+        Args:
+            x (float): Agent x-coordinate.
+            y (float): Agent y-coordinate.
+            direction (float): Agent direction in degrees.
+            bump (bool): Bump sensor state.
+            ranges: Sequence of num_beams LiDAR ranges.
+        """
+        row = self._buffer[self._buffered]
+        row["x"] = x
+        row["y"] = y
+        row["direction"] = direction
+        row["bump"] = bump
+        if self.quantize:
+            levels = np.rint(np.asarray(ranges, dtype=np.float64) / self.range_scale)
+            row["ranges"] = np.clip(levels, 0, QUANTIZE_LEVELS)
+        else:
+            row["ranges"] = ranges
+        self._buffered += 1
+        self.count += 1
+        if self._buffered == len(self._buffer):
+            self.flush()
+
+    def record_agent(self, agent) -> None:
+        """
+        Append the current state of an Agent.
+
+        Args:
+            agent (Agent): The agent to record.
+        """
+        self.record(
+            agent.x, agent.y, agent.direction, agent.bump_sensor, agent.lidar_ranges
+        )
+
+    def flush(self) -> None:
+        """Write buffered steps to the file."""
+        if self._buffered:
+            self._file.write(self._buffer[: self._buffered].tobytes())
+            self._buffered = 0
+        self._file.flush()
+
+    def close(self) -> None:
+        """Flush, store the final step count in the header and close the file."""
+        if self.closed:
+            return
+        self.flush()
+        self._file.seek(0)
+        self._file.write(PREFIX.pack(MAGIC, VERSION, self.data_offset, self.count))
+        self._file.close()
+
+
+class TrajectoryReader:
+    """
+    Read-only view of a trajectory file, memory-mapped rather than loaded.
+
+    Indexing returns records straight from the map, so opening a file and
+    seeking to any step costs the same regardless of its length.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Open a trajectory file.
+
+        Args:
+            path (str): File written by TrajectoryRecorder.
+        """
+        with open(path, "rb") as f:
+            magic, version, offset, count = PREFIX.unpack(f.read(PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a trajectory file")
+            if version != VERSION:
+                raise ValueError(f"Unsupported trajectory version {version}")
+            header = json.loads(f.read(offset - PREFIX.size))
+
+        self.path = path
+        self.header = header
+        self.metadata = header["metadata"]
+        self.range_scale = header["range_scale"]
+        self.dtype = record_dtype(header["num_beams"], header["quantize"])
+        # A recording that was never closed still holds every flushed chunk
+        if not count:
+            count = (os.path.getsize(path) - offset) // self.dtype.itemsize
+        if count:
+            self.records = np.memmap(
+                path, dtype=self.dtype, mode="r", offset=offset, shape=(count,)
+            )
+        else:
+            self.records = np.zeros(0, dtype=self.dtype)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    def ranges(self, index=slice(None)) -> np.ndarray:
+        """
+        Get LiDAR ranges as float64, undoing any quantization.
+
+        Args:
+            index (optional): Step index or slice. Defaults to every step.
+
+        Returns:
+            np.ndarray: Ranges of the selected steps.
+        """
+        ranges = self.records["ranges"][index]
+        if self.header["quantize"]:
+            return ranges * self.range_scale
+        return np.asarray(ranges, dtype=np.float64)
+
+    def poses(self, index=slice(None)) -> np.ndarray:
+        """
+        Get (x, y, direction) of the selected steps.
+
+        Args:
+            index (optional): Step index or slice. Defaults to every step.
+
+        Returns:
+            np.ndarray: (..., 3) array of poses.
+        """
+        records = self.records[index]
+        return np.stack([records["x"], records["y"], records["direction"]], axis=-1)
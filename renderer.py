@@ -0,0 +1,373 @@
+import numpy as np
+import pygame
+from constants import BLACK, BROWN, GRAY, WHITE
+from collision import wall_rects
+from spatial_index import EdgeGrid, SpatialHash
+
+
+class LayeredRenderer:
+    """
+    Draws the simulation window in layers and only pushes changed pixels.
+
+    The arena and walls are pre-rendered into a world layer that is rebuilt
+    only when the world changes, or redrawn within the arena when a
+    Viewport onto a larger world scrolls. Only walls in view are drawn,
+    looked up in a grid of the wall rectangles. UI chrome is drawn over it
+    into a static layer that is redrawn only where it has been invalidated.
+    Each frame,
+    the areas covered by dynamic content (the agent, activation plots) last
+    frame are restored from the static layer, the new dynamic content is
+    drawn, and only those rectangles are sent to pygame.display.update.
+    """
+
+    def __init__(
+        self,
+        screen: pygame.Surface,
+        arena_rect: pygame.Rect,
+        draw_chrome,
+        arena_color: tuple[int, int, int] = (200, 200, 200),
+        background: tuple[int, int, int] = (255, 255, 255),
+    ) -> None:
+        """
+        Initialize the LayeredRenderer.
+
+        Args:
+            screen (pygame.Surface): The display surface.
+            arena_rect (pygame.Rect): Area of the navigation arena.
+            draw_chrome (callable): Called with a surface to draw the UI
+                chrome (buttons, text, ...) onto it.
+            arena_color (tuple, optional): RGB fill of the arena.
+            background (tuple, optional): RGB fill outside the arena.
+        """
+        self.screen = screen
+        self.arena_rect = pygame.Rect(arena_rect)
+        self.draw_chrome = draw_chrome
+        self.arena_color = arena_color
+        self.background = background
+        self.world_layer = pygame.Surface(screen.get_size()).convert()
+        self.static_layer = pygame.Surface(screen.get_size()).convert()
+        self._world_key = None
+        self._view_offset = None
+        self._rects = np.empty((0, 4))
+        self._wall_grid: EdgeGrid | None = None
+        self._invalid: list[pygame.Rect] = []
+        self._previous: list[pygame.Rect] = []
+        self._current: list[pygame.Rect] = []
+
+    def invalidate(self, rect: pygame.Rect | None = None) -> None:
+        """
+        Mark part of the UI chrome as changed so it is redrawn next frame.
+
+        Args:
+            rect (pygame.Rect, optional): Area to redraw. Defaults to the
+                whole window.
+        """
+        self._invalid.append(
+            self.screen.get_rect() if rect is None else pygame.Rect(rect)
+        )
+
+    def _index_walls(self, walls: list) -> None:
+        """Bucket the wall rectangles so the walls in view can be looked up."""
+        self._rects = wall_rects(walls)
+        self._wall_grid = None
+        if len(self._rects):
+            bounds = (
+                self._rects[:, 0].min(),
+                self._rects[:, 1].min(),
+                self._rects[:, 2].max(),
+                self._rects[:, 3].max(),
+            )
+            self._wall_grid = EdgeGrid(self._rects, bounds)
+
+    def _visible_rects(self, view: tuple[float, float, float, float]) -> np.ndarray:
+        """Get the wall rectangles overlapping a (left, top, right, bottom) area."""
+        if self._wall_grid is None:
+            return self._rects
+        left, top, right, bottom = view
+        rects = self._rects[self._wall_grid.query_rect(left, top, right, bottom)]
+        return rects[
+            (rects[:, 0] <= right)
+            & (rects[:, 2] >= left)
+            & (rects[:, 1] <= bottom)
+            & (rects[:, 3] >= top)
+        ]
+
+    def _draw_world(self, viewport, full: bool) -> None:
+        """
+        Render the background, arena and walls in view into the world layer.
+
+        Args:
+            viewport (Viewport): The view of the world, or None to draw the
+                arena at arena_rect with all walls at their world positions.
+            full (bool): Redraw the whole layer rather than only the arena.
+        """
+        layer = self.world_layer
+        if full:
+            layer.fill(self.background)
+        if viewport is None:
+            pygame.draw.rect(layer, self.arena_color, self.arena_rect)
+            rects, (offset_x, offset_y) = self._rects, (0, 0)
+        else:
+            offset_x, offset_y = viewport.offset
+            layer.set_clip(self.arena_rect)
+            layer.fill(self.background, self.arena_rect)
+            left, top, right, bottom = viewport.bounds
+            pygame.draw.rect(
+                layer,
+                self.arena_color,
+                (left - offset_x, top - offset_y, right - left, bottom - top),
+            )
+            rects = self._visible_rects(viewport.rect())
+
+        # Same look as Wall.draw, including drawing the edges as a fill so
+        # that walls cut off by the arena edge are not outlined there
+        for left, top, right, bottom in rects.astype(int).tolist():
+            rect = pygame.Rect(left - offset_x, top - offset_y, right - left, bottom - top)
+            pygame.draw.rect(layer, BLACK, rect)
+            pygame.draw.rect(layer, BROWN, rect.inflate(-4, -4))
+        layer.set_clip(None)
+
+    def begin_frame(self, walls: list, world_key, viewport=None) -> None:
+        """
+        Bring the static layer up to date and erase last frame's dynamic content.
+
+        Args:
+            walls (list): List of Wall objects in the world, or a CompiledWorld.
+            world_key: Any value that changes whenever the walls do, such as
+                Agent.world_version. The world layer is rebuilt when it differs
+                from the previous frame's key.
+            viewport (Viewport, optional): View of a world larger than the
+                arena. When it scrolls, the arena is redrawn with the walls
+                now in view. Defaults to drawing the world unscrolled.
+        """
+        offset = viewport.offset if viewport is not None else None
+        if world_key != self._world_key:
+            self._world_key = world_key
+            self._view_offset = offset
+            self._index_walls(walls)
+            self._draw_world(viewport, full=True)
+            self._invalid = [self.screen.get_rect()]
+        elif offset != self._view_offset:
+            self._view_offset = offset
+            self._draw_world(viewport, full=False)
+            self._invalid.append(self.arena_rect)
+
+        for rect in self._invalid:
+            self.static_layer.set_clip(rect)
+            self.static_layer.blit(self.world_layer, rect, rect)
+            self.draw_chrome(self.static_layer)
+        self.static_layer.set_clip(None)
+
+        # Restore everything that has changed since the last update
+        self._current = self._previous + self._invalid
+        for rect in self._current:
+            self.screen.blit(self.static_layer, rect, rect)
+        self._invalid = []
+        self._previous = []
+
+    def add_dirty(self, rect: pygame.Rect) -> None:
+        """
+        Register an area the caller drew dynamic content into this frame.
+
+        It is pushed to the display at the end of this frame and erased at
+        the start of the next one.
+
+        Args:
+            rect (pygame.Rect): The area drawn into.
+        """
+        rect = pygame.Rect(rect).clip(self.screen.get_rect())
+        self._previous.append(rect)
+        self._current.append(rect)
+
+    def end_frame(self) -> None:
+        """Push the changed areas of the screen to the display."""
+        pygame.display.update(self._current)
+        self._current = []
+
+
+class WallLayer:
+    """
+    Cached drawing of editable walls seen through a Viewport.
+
+    The walls in view are drawn once into a layer surface. When a wall is
+    added, removed, moved or selected, only the area it covered and now
+    covers is redrawn, with the walls there found through a SpatialHash.
+    Panning scrolls the layer and draws just the strips scrolled into view.
+    Zooming redraws the whole view.
+    """
+
+    def __init__(
+        self,
+        viewport,
+        walls: list | None = None,
+        arena_color: tuple[int, int, int] = GRAY,
+        background: tuple[int, int, int] = WHITE,
+        cell_size: float = 64.0,
+    ) -> None:
+        """
+        Initialize the WallLayer.
+
+        Args:
+            viewport (Viewport): View of the world. The layer covers its
+                screen_rect.
+            walls (list, optional): List of Wall objects. Defaults to none.
+            arena_color (tuple, optional): RGB fill of the world bounds.
+            background (tuple, optional): RGB fill outside the world bounds.
+            cell_size (float, optional): Cell size of the spatial hash in
+                world units. Defaults to 64.
+        """
+        self.viewport = viewport
+        self.rect = pygame.Rect(viewport.screen_rect)
+        self.surface = pygame.Surface(self.rect.size)
+        self.arena_color = arena_color
+        self.background = background
+        self.index = SpatialHash(cell_size)
+        self.walls = []
+        # (left, top, zoom) of the view the layer was last drawn at
+        self._drawn_view = None
+        # World rectangles to redraw at the next draw
+        self._dirty: list[tuple[float, float, float, float]] = []
+        self.set_walls(walls if walls is not None else [])
+
+    @staticmethod
+    def _bounds_of(wall) -> tuple[int, int, int, int]:
+        """Get (left, top, right, bottom) of a wall, even while resized inside out."""
+        rect = wall.rect.copy()
+        rect.normalize()
+        return rect.left, rect.top, rect.right, rect.bottom
+
+    def set_walls(self, walls: list) -> None:
+        """
+        Replace all walls and redraw the whole view.
+
+        Args:
+            walls (list): List of Wall objects. The layer adds to and removes
+                from this list in place.
+        """
+        self.walls = walls
+        self.index.clear()
+        for wall in walls:
+            self.index.insert(wall, self._bounds_of(wall))
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Redraw the whole view at the next draw, e.g. after new world bounds."""
+        self._drawn_view = None
+        self._dirty = []
+
+    def add(self, wall) -> None:
+        """Add a wall on top of the others."""
+        self.walls.append(wall)
+        self.index.insert(wall, self._bounds_of(wall))
+        self._dirty.append(self._bounds_of(wall))
+
+    def remove(self, wall) -> None:
+        """Remove a wall."""
+        self.walls.remove(wall)
+        self._dirty.append(self.index.rect_of(wall))
+        self.index.remove(wall)
+
+    def update(self, wall) -> None:
+        """Redraw a wall after it was moved, resized, selected or deselected."""
+        old = self.index.rect_of(wall)
+        new = self._bounds_of(wall)
+        self._dirty.append(old)
+        if new != old:
+            self.index.insert(wall, new)
+            self._dirty.append(new)
+
+    def wall_at(self, pos: tuple[float, float]):
+        """
+        Find the topmost wall at a world position.
+
+        Args:
+            pos (tuple): World position, e.g. Viewport.to_world(event.pos).
+
+        Returns:
+            Wall: The last added wall containing pos, or None.
+        """
+        x, y = pos
+        for wall in reversed(self.index.query_point(x, y)):
+            if wall.rect.collidepoint(x, y):
+                return wall
+        return None
+
+    def _to_layer(
+        self, left: float, top: float, right: float, bottom: float
+    ) -> pygame.Rect:
+        """Convert a world rectangle to layer coordinates."""
+        return self.viewport.to_screen_rect(left, top, right, bottom).move(
+            -self.rect.x, -self.rect.y
+        )
+
+    def _redraw(self, area: pygame.Rect) -> None:
+        """Redraw the background, world bounds and walls within a layer area."""
+        area = area.clip(self.surface.get_rect())
+        if not area:
+            return
+        surface = self.surface
+        surface.set_clip(area)
+        surface.fill(self.background)
+        pygame.draw.rect(surface, self.arena_color, self._to_layer(*self.viewport.bounds))
+        left, top = self.viewport.to_world((area.left + self.rect.x, area.top + self.rect.y))
+        right, bottom = self.viewport.to_world(
+            (area.right + self.rect.x, area.bottom + self.rect.y)
+        )
+        for wall in self.index.query_rect(left, top, right, bottom):
+            wall.draw(surface, self._to_layer(*self._bounds_of(wall)))
+        surface.set_clip(None)
+
+    def _scrolled_areas(self) -> list[pygame.Rect] | None:
+        """
+        Scroll the layer along with the view.
+
+        Returns:
+            list: Layer areas scrolled into view, or None if the view cannot
+                be scrolled to, e.g. after zooming or moving a fraction of
+                a pixel.
+        """
+        view = self.viewport
+        left, top, zoom = self._drawn_view
+        if zoom != view.zoom:
+            return None
+        dx = (left - view.left) * zoom
+        dy = (top - view.top) * zoom
+        if abs(dx - round(dx)) > 1e-6 or abs(dy - round(dy)) > 1e-6:
+            return None
+        dx, dy = round(dx), round(dy)
+        width, height = self.rect.size
+        if abs(dx) >= width or abs(dy) >= height:
+            return None
+        self.surface.scroll(dx, dy)
+        areas = []
+        if dx:
+            areas.append(pygame.Rect(0 if dx > 0 else width + dx, 0, abs(dx), height))
+        if dy:
+            areas.append(pygame.Rect(0, 0 if dy > 0 else height + dy, width, abs(dy)))
+        return areas
+
+    def draw(self, screen: pygame.Surface) -> None:
+        """
+        Bring the layer up to date and blit it to the screen.
+
+        Args:
+            screen (pygame.Surface): The surface to draw on.
+        """
+        view = self.viewport
+        state = (view.left, view.top, view.zoom)
+        if self._drawn_view is None:
+            areas = None
+        elif state != self._drawn_view:
+            areas = self._scrolled_areas()
+        else:
+            areas = []
+        if areas is None:
+            areas = [self.surface.get_rect()]
+        else:
+            # Walls changed since the last draw, now at the current view
+            areas += [self._to_layer(*rect).inflate(2, 2) for rect in self._dirty]
+        self._drawn_view = state
+        self._dirty = []
+        for area in areas:
+            self._redraw(area)
+        screen.blit(self.surface, self.rect)
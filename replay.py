@@ -0,0 +1,118 @@
+import numpy as np
+from agent import Agent
+from recorder import TrajectoryReader
+
+
+class ReplayPlayer:
+    """
+    Plays a recorded trajectory back through an Agent.
+
+    Instead of scanning and running a controller, every frame copies the
+    recorded pose, bump sensor and LiDAR ranges of the current step onto
+    the agent, so Agent.draw and the activation panels work unchanged.
+    Steps are read from a memory-mapped file, so seeking to any step costs
+    the same as advancing by one.
+    """
+
+    # Playback speeds in steps per frame, negative plays backwards
+    SPEEDS = [-64, -16, -4, -1, -0.25, 0.25, 1, 4, 16, 64]
+
+    def __init__(self, reader: TrajectoryReader, agent: Agent) -> None:
+        """
+        Initialize the ReplayPlayer and show the first step.
+
+        Args:
+            reader (TrajectoryReader): The recording to play.
+            agent (Agent): The agent to drive.
+        """
+        if not len(reader):
+            raise ValueError(f"{reader.path} contains no steps")
+        self.reader = reader
+        self.agent = agent
+        self.position = 0.0
+        self.speed_index = self.SPEEDS.index(1)
+        self.paused = False
+        self.seek(0)
+
+    @classmethod
+    def from_file(cls, filename: str, agent: Agent) -> "ReplayPlayer":
+        """
+        Open a trajectory file for playback.
+
+        Args:
+            filename (str): Path of a file written by TrajectoryRecorder.
+            agent (Agent): The agent to drive.
+
+        Returns:
+            ReplayPlayer: The new player.
+        """
+        return cls(TrajectoryReader(filename), agent)
+
+    @property
+    def step(self) -> int:
+        """Index of the step currently shown."""
+        return int(self.position)
+
+    @property
+    def speed(self) -> float:
+        """Playback speed in steps per frame."""
+        return self.SPEEDS[self.speed_index]
+
+    def __len__(self) -> int:
+        return len(self.reader)
+
+    def seek(self, step: float) -> None:
+        """
+        Jump to a step and show it on the agent.
+
+        Args:
+            step (float): Step index, clamped to the recording.
+        """
+        self.position = float(np.clip(step, 0, len(self.reader) - 1))
+        record = self.reader[self.step]
+        agent = self.agent
+        agent.x = float(record["x"])
+        agent.y = float(record["y"])
+        agent.direction = float(record["direction"])
+        agent.bump_sensor = bool(record["bump"])
+        agent.lidar_ranges = self.reader.ranges(self.step)
+
+    def seek_fraction(self, fraction: float) -> None:
+        """
+        Jump to a point in the recording.
+
+        Args:
+            fraction (float): 0 for the first step, 1 for the last.
+        """
+        self.seek(fraction * (len(self.reader) - 1))
+
+    def advance(self) -> None:
+        """Move playback on by one frame at the current speed unless paused."""
+        if not self.paused:
+            self.seek(self.position + self.speed)
+
+    def change_speed(self, steps: int) -> None:
+        """
+        Move along the list of playback speeds.
+
+        Args:
+            steps (int): Positive to play faster forwards, negative to slow
+                down and then play backwards.
+        """
+        self.speed_index = int(
+            np.clip(self.speed_index + steps, 0, len(self.SPEEDS) - 1)
+        )
+
+    def toggle_pause(self) -> None:
+        """Pause or resume playback."""
+        self.paused = not self.paused
+
+    def status(self) -> str:
+        """
+        Describe the playback state for display.
+
+        Returns:
+            str: Current step, length, speed and whether playback is paused.
+        """
+        state = "paused" if self.paused else f"{self.speed:g}x"
+        return f"Replay: step {self.step + 1}/{len(self.reader)} ({state})"
@@ -0,0 +1,292 @@
+"""
+Run sweeps of headless simulations across worlds, seeds and controllers.
+
+Usage:
+    python runner.py --worlds worlds/*.json --seeds 0 1 2 \
+        --controllers RandomController BasicController --steps 5000 \
+        --out results.json
+"""
+
+import os
+import argparse
+import glob
+import json
+import multiprocessing
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from simulation import Simulation
+from controller_basic import BasicController
+from controller_random import RandomController
+
+CONTROLLERS = {
+    "RandomController": RandomController,
+    "BasicController": BasicController,
+}
+
+
+class JobTimeout(Exception):
+    """Raised inside a worker when a job runs past its time limit."""
+
+
+def _raise_timeout(signum, frame):
+    raise JobTimeout()
+
+
+# Seconds the parent waits past a job's time limit before killing its worker,
+# leaving the in-worker alarm time to end the job cleanly first
+KILL_GRACE = 5.0
+
+# How often the parent checks running jobs against their deadlines
+POLL_INTERVAL = 0.5
+
+# Per-job state shared with the workers: 0 not started, 1 running, 2 done,
+# plus the wall-clock time each job started at
+_job_state = None
+_job_started = None
+
+
+def _init_worker(job_state, job_started) -> None:
+    global _job_state, _job_started
+    _job_state = job_state
+    _job_started = job_started
+
+
+def _run_tracked(index: int, job: dict) -> dict:
+    """Run a job, marking it as running for as long as it runs."""
+    _job_started[index] = time.time()
+    _job_state[index] = 1
+    result = run_job(job)
+    _job_state[index] = 2
+    return result
+
+
+def run_job(job: dict) -> dict:
+    """
+    Run one headless simulation and collect its outputs.
+
+    Executed inside a worker process. Each job builds its own Simulation, so
+    workers share nothing but the world file on disk. The time limit is
+    enforced with SIGALRM, whose handler only runs between Python bytecodes,
+    so it cannot interrupt a job stuck inside C code such as a long numpy
+    call.
+
+    Args:
+        job (dict): World path, seed, controller name, step count, time limit
+            and whether to keep the trajectory.
+
+    Returns:
+        dict: The job description plus status, timing, bump count and
+            optionally the (x, y, direction) trajectory.
+    """
+    result = dict(job)
+    timeout = job.get("timeout")
+    if timeout:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        start = time.perf_counter()
+        sim = Simulation(
+            world=job["world"],
+            controller_cls=CONTROLLERS[job["controller"]],
+            lidar_backend=job.get("backend", "grid"),
+            seed=job["seed"],
+        )
+        agent = sim.agent
+        trajectory = []
+        bumps = 0
+        for _ in range(job["steps"]):
+            sim.step()
+            bumps += agent.bump_sensor
+            if job.get("trajectory", True):
+                trajectory.append((agent.x, agent.y, agent.direction))
+        elapsed = time.perf_counter() - start
+        result.update(
+            status="ok",
+            seconds=elapsed,
+            steps_per_sec=job["steps"] / elapsed,
+            bump_count=int(bumps),
+            final_pose=(agent.x, agent.y, agent.direction),
+        )
+        if job.get("trajectory", True):
+            result["trajectory"] = trajectory
+    except JobTimeout:
+        result.update(status="timeout", error=f"exceeded {timeout} s")
+    except Exception as e:
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    return result
+
+
+def _kill_pool(pool: ProcessPoolExecutor) -> None:
+    """
+    Kill a pool's workers, abandoning whatever they are running.
+
+    SIGKILL rather than SIGTERM, which SDL turns into a quit event when
+    pygame has been initialised.
+    """
+    for process in list((pool._processes or {}).values()):
+        process.kill()
+    pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_sweep(jobs: list, workers: int | None = None) -> list:
+    """
+    Spread jobs over a process pool and gather their results.
+
+    Exceptions and timeouts are caught inside the workers and reported per
+    job. Since the in-worker alarm cannot interrupt C code, the parent also
+    holds a deadline of the job's time limit plus KILL_GRACE: a job running
+    past it has its pool killed and is reported as timed out, and the jobs
+    the pool had not finished are submitted again. Jobs without a time limit
+    have no deadline. If a worker dies outright (e.g. a segfault) the whole
+    pool breaks. Only the jobs that were running at that moment are
+    suspects: each is run again on its own in a fresh single-worker pool,
+    and reported as crashed if it dies a second time. Jobs that had not
+    started are submitted again without counting against them.
+
+    Args:
+        jobs (list): Job dicts as accepted by run_job.
+        workers (int, optional): Number of worker processes. Defaults to the
+            number of CPUs.
+
+    Returns:
+        list: One result dict per job, in job order.
+    """
+    results = [None] * len(jobs)
+    job_state = multiprocessing.Array("b", len(jobs))
+    job_started = multiprocessing.Array("d", len(jobs))
+
+    def report(i):
+        print(
+            f"[{sum(r is not None for r in results)}/{len(jobs)}] "
+            f"{os.path.basename(jobs[i]['world'])} seed={jobs[i]['seed']} "
+            f"{jobs[i]['controller']}: {results[i]['status']}"
+        )
+
+    def overdue(i):
+        timeout = jobs[i].get("timeout")
+        return (
+            bool(timeout)
+            and job_state[i] == 1
+            and time.time() - job_started[i] > timeout + KILL_GRACE
+        )
+
+    def run_batch(indices, max_workers):
+        """Run jobs in one pool, returning those lost to a broken pool."""
+        pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(job_state, job_started),
+        )
+        broken = []
+        try:
+            futures = {pool.submit(_run_tracked, i, jobs[i]): i for i in indices}
+            not_done = set(futures)
+            while not_done:
+                done, not_done = wait(
+                    not_done, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    i = futures[future]
+                    try:
+                        results[i] = future.result()
+                    except BrokenProcessPool:
+                        broken.append(i)
+                    else:
+                        report(i)
+                overrun = [futures[f] for f in not_done if overdue(futures[f])]
+                if overrun:
+                    _kill_pool(pool)
+                    for i in overrun:
+                        results[i] = dict(
+                            jobs[i],
+                            status="timeout",
+                            error=f"killed after {jobs[i]['timeout']} s",
+                        )
+                        report(i)
+                    # Everything else the pool held is resubmitted uncharged
+                    for future in not_done:
+                        i = futures[future]
+                        if results[i] is None:
+                            job_state[i] = 0
+                    return broken
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        return broken
+
+    pending = list(range(len(jobs)))
+    while pending:
+        broken = run_batch(pending, workers)
+
+        # Jobs still marked running were in a worker when the pool broke
+        suspects = [i for i in broken if job_state[i] == 1]
+        if broken and not suspects:
+            # The crash came before any job started, suspect all of them
+            suspects = broken
+        for i in sorted(suspects):
+            job_state[i] = 0
+            if run_batch([i], 1):
+                results[i] = dict(jobs[i], status="crashed", error="worker process died")
+                report(i)
+        pending = [i for i in range(len(jobs)) if results[i] is None]
+        for i in pending:
+            job_state[i] = 0
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--worlds", nargs="+", default=sorted(glob.glob("worlds/*.json")))
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument(
+        "--controllers", nargs="+", choices=sorted(CONTROLLERS), default=sorted(CONTROLLERS)
+    )
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--backend", default="grid")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=600.0,
+        help="Per-job time limit in seconds, 0 for none.",
+    )
+    parser.add_argument(
+        "--no-trajectory", action="store_true", help="Only keep summary statistics."
+    )
+    parser.add_argument("--out", default="results.json")
+    args = parser.parse_args()
+
+    jobs = [
+        {
+            "world": world,
+            "seed": seed,
+            "controller": controller,
+            "steps": args.steps,
+            "backend": args.backend,
+            "timeout": args.timeout,
+            "trajectory": not args.no_trajectory,
+        }
+        for world in args.worlds
+        for seed in args.seeds
+        for controller in args.controllers
+    ]
+
+    start = time.perf_counter()
+    results = run_sweep(jobs, args.workers)
+    elapsed = time.perf_counter() - start
+    with open(args.out, "w") as f:
+        json.dump({"seconds": elapsed, "runs": results}, f)
+
+    failed = sum(r["status"] != "ok" for r in results)
+    print(
+        f"{len(jobs)} runs in {elapsed:.2f} s ({failed} failed), "
+        f"results written to {args.out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
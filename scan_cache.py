@@ -0,0 +1,102 @@
+from collections import OrderedDict
+import numpy as np
+
+
+class ScanCache:
+    """
+    Memory-bounded LRU cache of LiDAR scans keyed on the agent pose.
+
+    Agent.scan truncates its origin to integers and headings move in whole
+    angular_speed steps, so (int x, int y, direction, world version) fully
+    determines a scan. Stored ranges are read-only arrays.
+    """
+
+    # Rough per-entry cost of the key tuple and the OrderedDict slot
+    ENTRY_OVERHEAD = 200
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024) -> None:
+        """
+        Initialize the ScanCache.
+
+        Args:
+            max_bytes (int, optional): Memory budget for cached ranges.
+                Defaults to 64 MiB.
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple) -> np.ndarray | None:
+        """
+        Look up a scan and mark it as most recently used.
+
+        Args:
+            key (tuple): (int x, int y, direction, world version).
+
+        Returns:
+            np.ndarray | None: The cached ranges, or None on a miss.
+        """
+        ranges = self._entries.get(key)
+        if ranges is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return ranges
+
+    def put(self, key: tuple, ranges) -> None:
+        """
+        Store a scan, evicting the least recently used ones to stay in budget.
+
+        Args:
+            key (tuple): (int x, int y, direction, world version).
+            ranges: Sequence of LiDAR ranges. A read-only copy is stored.
+        """
+        ranges = np.array(ranges, dtype=np.float64)
+        ranges.flags.writeable = False
+        size = ranges.nbytes + self.ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old.nbytes + self.ENTRY_OVERHEAD
+        self._entries[key] = ranges
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes + self.ENTRY_OVERHEAD
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every cached scan, keeping the hit/miss counters."""
+        self._entries.clear()
+        self.nbytes = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of lookups served from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        """
+        Get the cache counters.
+
+        Returns:
+            dict: Hits, misses, evictions, hit rate, entries and bytes used.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+            "entries": len(self._entries),
+            "nbytes": self.nbytes,
+        }
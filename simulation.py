@@ -0,0 +1,225 @@
+import argparse
+import random
+import time
+from agent import Agent
+from world_compiler import load_world
+from scan_cache import ScanCache
+from recorder import TrajectoryRecorder
+from profiler import PhaseProfiler
+from controller_random import RandomController
+
+
+class Simulation:
+    """
+    Headless simulation core that owns the world, the agent and the controller.
+
+    Nothing here touches the pygame display or event queue, so a Simulation
+    can be stepped from a script or a batch job at pure compute speed. The
+    viewer in main.py draws on top of one.
+    """
+
+    def __init__(
+        self,
+        world: str | None = None,
+        controller_cls: type = RandomController,
+        x: float = 400,
+        y: float = 300,
+        direction: float = 0,
+        num_lidar_beams: int = 360,
+        lidar_backend: str = "grid",
+        controller_running: bool = True,
+        seed: int | None = None,
+        scan_cache: ScanCache | None = None,
+        recorder: TrajectoryRecorder | None = None,
+        profiler: PhaseProfiler | None = None,
+        reuse_rotated_scans: bool = True,
+    ) -> None:
+        """
+        Initialize the Simulation.
+
+        Args:
+            world (str, optional): Path of a world JSON file to load.
+            controller_cls (type, optional): Controller class to drive the
+                agent. Defaults to RandomController.
+            x (float, optional): Initial x-coordinate of the agent.
+            y (float, optional): Initial y-coordinate of the agent.
+            direction (float, optional): Initial direction of the agent in degrees.
+            num_lidar_beams (int, optional): Number of LiDAR beams. Defaults to 360.
+            lidar_backend (str, optional): LiDAR backend passed to the Agent.
+                Defaults to "grid".
+            controller_running (bool, optional): Whether the controller starts
+                enabled. Defaults to True.
+            seed (int, optional): Seed for the random module, used by
+                RandomController. Defaults to None (unseeded).
+            scan_cache (ScanCache, optional): Pose-keyed scan cache for the
+                agent. Defaults to None.
+            recorder (TrajectoryRecorder, optional): Receives the agent's
+                state after every scan. Can also be attached later by
+                setting the recorder attribute. Defaults to None.
+            profiler (PhaseProfiler, optional): Times the scan and control
+                phases of every step. Defaults to a disabled profiler.
+            reuse_rotated_scans (bool, optional): Passed to the Agent.
+                Defaults to True.
+        """
+        if seed is not None:
+            random.seed(seed)
+        self.agent = Agent(
+            x=x,
+            y=y,
+            direction=direction,
+            walls=[],
+            num_lidar_beams=num_lidar_beams,
+            lidar_backend=lidar_backend,
+            scan_cache=scan_cache,
+            reuse_rotated_scans=reuse_rotated_scans,
+        )
+        self.controller = controller_cls(model=None, agent=self.agent)
+        self.controller.running = controller_running
+        self.recorder = recorder
+        self.profiler = profiler if profiler is not None else PhaseProfiler()
+        self.steps = 0
+        if world:
+            self.load_walls(world)
+
+    @property
+    def walls(self) -> list:
+        """Walls of the world, a list of Wall objects or a CompiledWorld."""
+        return self.agent.walls
+
+    def load_walls(self, filename: str) -> None:
+        """
+        Load a world JSON file and hand its walls to the agent.
+
+        The file is read through its compiled sidecar, so the agent gets
+        packed geometry arrays instead of per-wall objects.
+
+        Args:
+            filename (str): Path of the world file.
+        """
+        self.set_walls(load_world(filename))
+
+    def set_walls(self, walls: list) -> None:
+        """
+        Replace the walls of the world.
+
+        Args:
+            walls (list): List of Wall objects, or a CompiledWorld.
+        """
+        self.agent.walls = walls
+
+    def step(self, n: int = 1) -> None:
+        """
+        Advance the simulation by n steps.
+
+        Each step the agent scans its environment, then the controller reads
+        its sensors and moves it. If a recorder is attached, the pose, bump
+        sensor and ranges the controller is about to act on are recorded.
+
+        Args:
+            n (int, optional): Number of steps to run. Defaults to 1.
+        """
+        agent = self.agent
+        controller = self.controller
+        recorder = self.recorder
+        phase = self.profiler.phase
+        for _ in range(n):
+            with phase("scan"):
+                agent.scan()
+            if recorder is not None:
+                with phase("record"):
+                    recorder.record_agent(agent)
+            with phase("control"):
+                controller.handle_input()
+                controller.move_agent()
+        self.steps += n
+
+    def step_for(self, seconds: float, max_steps: int | None = None) -> int:
+        """
+        Step the simulation until a wall-clock budget is used up.
+
+        At least one step is always taken, so the simulation keeps moving
+        when the budget is zero.
+
+        Args:
+            seconds (float): Time budget in seconds.
+            max_steps (int, optional): Upper bound on the number of steps.
+
+        Returns:
+            int: Number of steps taken.
+        """
+        deadline = time.perf_counter() + seconds
+        taken = 0
+        while True:
+            self.step()
+            taken += 1
+            if time.perf_counter() >= deadline or taken == max_steps:
+                return taken
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the simulation headless.")
+    parser.add_argument("--world", default="worlds/test3.json")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--backend", default="grid")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--scan-cache-mb", type=float, default=0, help="Enable a scan cache of this size."
+    )
+    parser.add_argument("--record", default=None, help="Record a trajectory file.")
+    parser.add_argument(
+        "--profile", default=None, help="Write phase timings to a .json or .csv file."
+    )
+    parser.add_argument(
+        "--quantize", action="store_true", help="Record ranges as uint16."
+    )
+    args = parser.parse_args()
+
+    cache = None
+    if args.scan_cache_mb > 0:
+        cache = ScanCache(int(args.scan_cache_mb * 1024 * 1024))
+    # Recorded scans are always fresh, not rotated copies of earlier ones
+    sim = Simulation(
+        world=args.world,
+        lidar_backend=args.backend,
+        seed=args.seed,
+        scan_cache=cache,
+        reuse_rotated_scans=not args.record,
+    )
+    if args.profile:
+        sim.profiler.enabled = True
+    if args.record:
+        sim.recorder = TrajectoryRecorder(
+            args.record,
+            len(sim.agent.lidar_angles),
+            sim.agent.lidar_max_range,
+            quantize=args.quantize,
+            metadata={
+                "world": args.world,
+                "seed": args.seed,
+                "bounds": list(sim.agent.bounds),
+            },
+        )
+    start = time.perf_counter()
+    sim.step(args.steps)
+    elapsed = time.perf_counter() - start
+    if sim.recorder is not None:
+        sim.recorder.close()
+        print(f"recorded {sim.recorder.count} steps to {args.record}")
+    print(
+        f"{args.steps} steps in {elapsed:.3f} s "
+        f"({args.steps / elapsed:.0f} steps/s), "
+        f"final pose ({sim.agent.x:.1f}, {sim.agent.y:.1f}, {sim.agent.direction})"
+    )
+    if cache is not None:
+        print(f"scan cache: {cache.stats()}")
+    if args.profile:
+        sim.profiler.export(args.profile)
+        for name, row in sim.profiler.stats().items():
+            print(
+                f"{name}: p50 {row['p50']:.3f} ms, p95 {row['p95']:.3f} ms, "
+                f"max {row['max']:.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,263 @@
+import math
+import numpy as np
+
+
+class EdgeGrid:
+    """
+    Uniform grid over line segments, stored in compressed (CSR) form.
+
+    Every edge is registered in each cell its bounding box overlaps. The
+    edge ids of cell c are cell_edges[cell_start[c]:cell_start[c + 1]], so a
+    lookup is two array reads and the whole index lives in three arrays.
+    """
+
+    def __init__(
+        self,
+        edges: np.ndarray,
+        bounds: tuple[float, float, float, float],
+        cell_size: float | None = None,
+    ) -> None:
+        """
+        Initialize the EdgeGrid.
+
+        Args:
+            edges (np.ndarray): (E, 4) array of [x1, y1, x2, y2] edges.
+            bounds (tuple): (left, top, right, bottom) region to cover. It is
+                grown to include every edge.
+            cell_size (float, optional): Side length of a cell. Defaults to a
+                size that puts a couple of edges in each cell on average.
+        """
+        self.edges = np.asarray(edges, dtype=np.float64).reshape(-1, 4)
+        left, top, right, bottom = bounds
+        if len(self.edges):
+            left = min(left, self.edges[:, [0, 2]].min())
+            top = min(top, self.edges[:, [1, 3]].min())
+            right = max(right, self.edges[:, [0, 2]].max())
+            bottom = max(bottom, self.edges[:, [1, 3]].max())
+
+        if cell_size is None:
+            area = max((right - left) * (bottom - top), 1.0)
+            cell_size = 2.0 * math.sqrt(area / max(len(self.edges), 1))
+        self.cell_size = float(max(cell_size, 1.0))
+        self.origin_x = float(left)
+        self.origin_y = float(top)
+        self.nx = max(1, math.ceil((right - left) / self.cell_size))
+        self.ny = max(1, math.ceil((bottom - top) / self.cell_size))
+        self._build()
+
+    def _build(self) -> None:
+        """Bucket every edge into the cells its bounding box overlaps."""
+        num_cells = self.nx * self.ny
+        if not len(self.edges):
+            self.cell_start = np.zeros(num_cells + 1, dtype=np.intp)
+            self.cell_edges = np.empty(0, dtype=np.intp)
+            return
+
+        x0, y0, x1, y1 = self.edge_cell_ranges(self.edges)
+        widths = x1 - x0 + 1
+        counts = widths * (y1 - y0 + 1)
+
+        edge_ids = np.repeat(np.arange(len(self.edges)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        widths = np.repeat(widths, counts)
+        cells = (np.repeat(y0, counts) + local // widths) * self.nx + (
+            np.repeat(x0, counts) + local % widths
+        )
+
+        order = np.argsort(cells, kind="stable")
+        self.cell_edges = edge_ids[order]
+        self.cell_start = np.zeros(num_cells + 1, dtype=np.intp)
+        np.cumsum(np.bincount(cells, minlength=num_cells), out=self.cell_start[1:])
+
+    def edge_cell_ranges(
+        self, edges: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Get the inclusive cell ranges covered by each edge's bounding box.
+
+        The boxes are padded by a small epsilon so an edge lying exactly on a
+        cell border is registered on both sides of it.
+
+        Args:
+            edges (np.ndarray): (E, 4) array of [x1, y1, x2, y2] edges.
+
+        Returns:
+            tuple: (x0, y0, x1, y1) integer cell index arrays.
+        """
+        eps = 1e-6
+        return (
+            self.cell_x(np.minimum(edges[:, 0], edges[:, 2]) - eps),
+            self.cell_y(np.minimum(edges[:, 1], edges[:, 3]) - eps),
+            self.cell_x(np.maximum(edges[:, 0], edges[:, 2]) + eps),
+            self.cell_y(np.maximum(edges[:, 1], edges[:, 3]) + eps),
+        )
+
+    def cell_x(self, x: np.ndarray) -> np.ndarray:
+        """Column index of x, clipped to the grid."""
+        column = np.floor((x - self.origin_x) / self.cell_size).astype(np.intp)
+        return np.clip(column, 0, self.nx - 1)
+
+    def cell_y(self, y: np.ndarray) -> np.ndarray:
+        """Row index of y, clipped to the grid."""
+        row = np.floor((y - self.origin_y) / self.cell_size).astype(np.intp)
+        return np.clip(row, 0, self.ny - 1)
+
+    def gather(self, cells: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Expand a batch of cell ids into (owner, edge id) pairs.
+
+        Args:
+            cells (np.ndarray): Flat cell ids, one per query.
+
+        Returns:
+            tuple: (owners, edge_ids) where owners[i] is the position in cells
+                that produced edge_ids[i].
+        """
+        starts = self.cell_start[cells]
+        counts = self.cell_start[cells + 1] - starts
+        total = counts.sum()
+        owners = np.repeat(np.arange(len(cells)), counts)
+        offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        return owners, self.cell_edges[offsets + np.repeat(starts, counts)]
+
+    def query_rect(
+        self, left: float, top: float, right: float, bottom: float
+    ) -> np.ndarray:
+        """
+        Find the edges registered in any cell overlapping a rectangle.
+
+        Args:
+            left (float): Left side of the query rectangle.
+            top (float): Top side of the query rectangle.
+            right (float): Right side of the query rectangle.
+            bottom (float): Bottom side of the query rectangle.
+
+        Returns:
+            np.ndarray: Sorted unique edge ids. This is a superset of the
+                edges that actually intersect the rectangle.
+        """
+        x0, x1 = self.cell_x(np.array([left, right]))
+        y0, y1 = self.cell_y(np.array([top, bottom]))
+        columns = np.arange(x0, x1 + 1)
+        cells = (np.arange(y0, y1 + 1)[:, None] * self.nx + columns).ravel()
+        return np.unique(self.gather(cells)[1])
+
+
+class SpatialHash:
+    """
+    Hash of grid cells to the items whose rectangles overlap them.
+
+    Unlike EdgeGrid it is built for geometry that changes, such as walls
+    being edited: items are inserted, moved and removed one at a time.
+    Queries return items in insertion order, so the last one is the one
+    drawn on top.
+    """
+
+    def __init__(self, cell_size: float = 64.0) -> None:
+        """
+        Initialize the SpatialHash.
+
+        Args:
+            cell_size (float, optional): Side length of a cell. Defaults to 64.
+        """
+        self.cell_size = float(cell_size)
+        self._cells: dict[tuple[int, int], set] = {}
+        # Item -> (insertion order, rectangle, cells it is registered in)
+        self._items: dict = {}
+        self._counter = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item) -> bool:
+        return item in self._items
+
+    def _cell_range(
+        self, left: float, top: float, right: float, bottom: float
+    ) -> tuple[range, range]:
+        """Get the cell columns and rows a rectangle overlaps."""
+        size = self.cell_size
+        return (
+            range(math.floor(left / size), math.floor(right / size) + 1),
+            range(math.floor(top / size), math.floor(bottom / size) + 1),
+        )
+
+    def insert(self, item, rect: tuple[float, float, float, float]) -> None:
+        """
+        Add an item, or move it if it is already in the hash.
+
+        Args:
+            item: Any hashable object, e.g. a Wall.
+            rect (tuple): (left, top, right, bottom) of the item.
+        """
+        order = self._counter
+        if item in self._items:
+            order = self._items[item][0]
+            self.remove(item)
+        else:
+            self._counter += 1
+        columns, rows = self._cell_range(*rect)
+        cells = [(cx, cy) for cx in columns for cy in rows]
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(item)
+        self._items[item] = (order, tuple(rect), cells)
+
+    def remove(self, item) -> None:
+        """Remove an item. Items not in the hash are ignored."""
+        entry = self._items.pop(item, None)
+        if entry is None:
+            return
+        for cell in entry[2]:
+            bucket = self._cells[cell]
+            bucket.discard(item)
+            if not bucket:
+                del self._cells[cell]
+
+    def clear(self) -> None:
+        """Remove every item."""
+        self._cells.clear()
+        self._items.clear()
+        self._counter = 0
+
+    def rect_of(self, item) -> tuple[float, float, float, float] | None:
+        """Get the rectangle an item was last inserted with, None if absent."""
+        entry = self._items.get(item)
+        return entry[1] if entry is not None else None
+
+    def query_rect(
+        self, left: float, top: float, right: float, bottom: float
+    ) -> list:
+        """
+        Find the items whose rectangles overlap a rectangle.
+
+        Args:
+            left (float): Left side of the query rectangle.
+            top (float): Top side of the query rectangle.
+            right (float): Right side of the query rectangle.
+            bottom (float): Bottom side of the query rectangle.
+
+        Returns:
+            list: Items in insertion order, edges touching counting as overlap.
+        """
+        columns, rows = self._cell_range(left, top, right, bottom)
+        if len(columns) * len(rows) > len(self._items):
+            # Cheaper to look at every item than at every cell
+            candidates = self._items.keys()
+        else:
+            candidates = set()
+            for cx in columns:
+                for cy in rows:
+                    bucket = self._cells.get((cx, cy))
+                    if bucket:
+                        candidates.update(bucket)
+        found = []
+        for item in candidates:
+            order, (l, t, r, b), _ = self._items[item]
+            if l <= right and r >= left and t <= bottom and b >= top:
+                found.append((order, item))
+        found.sort(key=lambda entry: entry[0])
+        return [item for _, item in found]
+
+    def query_point(self, x: float, y: float) -> list:
+        """Find the items whose rectangles contain a point, in insertion order."""
+        return self.query_rect(x, y, x, y)
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Modules live at the repository root; pygame must not open a window
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
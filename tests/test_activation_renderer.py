@@ -0,0 +1,33 @@
+import numpy as np
+import pygame
+import pytest
+from activation_renderer import ActivationPanel
+
+
+@pytest.fixture(scope="module")
+def panel():
+    pygame.init()
+    return ActivationPanel((400, 300))
+
+
+def test_heatmap_colors_each_cell_by_its_value(panel):
+    values = np.array([[0.0, 1.0, 2.0], [3.0, 4.0, 5.0]])
+    surface = panel.draw_heatmap(values.ravel(), (2, -1), "BVC Heatmap")
+
+    width, height = panel.size[0] - 16, panel.size[1] - panel.title_height - 8
+    levels = panel._levels(values.ravel()).reshape(values.shape)
+    for row in range(2):
+        for col in range(3):
+            x = 8 + int((col + 0.5) * width / 3)
+            y = panel.title_height + int((row + 0.5) * height / 2)
+            expected = tuple(panel.colormap[levels[row, col]])
+            assert tuple(surface.get_at((x, y)))[:3] == expected
+
+
+def test_heatmap_reuses_its_layout(panel):
+    panel.draw_heatmap(np.arange(16.0), (8, -1))
+    layout = panel._layouts[("heatmap", 8, 2)]
+    panel.draw_heatmap(np.arange(16.0)[::-1], (8, -1))
+    assert panel._layouts[("heatmap", 8, 2)] is layout
+    with pytest.raises(ValueError):
+        panel.draw_heatmap(np.arange(15.0), (8, -1))
@@ -0,0 +1,82 @@
+import glob
+import json
+import math
+import numpy as np
+import pytest
+from agent import Agent
+from collision import circle_collisions, free_distance, wall_rects
+from lidar import arena_bounds
+from wall import Wall
+from world_compiler import parse_world
+
+WORLD_FILES = sorted(glob.glob("worlds/*.json"))
+
+
+def load_walls(filename):
+    with open(filename) as f:
+        wall_data, _ = parse_world(json.load(f))
+    return [Wall.from_dict(data) for data in wall_data]
+
+
+def backoff_distance(agent, move_forward):
+    """Distance the old try_move covered by lowering the speed 0.1 at a time."""
+    original_speed = agent.linear_speed
+    try:
+        while agent.linear_speed > 0:
+            if not agent.detect_collision(move_forward):
+                return agent.linear_speed
+            agent.linear_speed -= 0.1
+        return 0.0
+    finally:
+        agent.linear_speed = original_speed
+
+
+def clips_through_wall(agent, distance, dir_x, dir_y, rects):
+    """Whether a straight move overlaps a wall somewhere short of its end."""
+    t = np.linspace(0, distance, 200)
+    return circle_collisions(
+        agent.x + t * dir_x, agent.y + t * dir_y, agent.body_radius, rects, arena_bounds()
+    ).any()
+
+
+@pytest.mark.parametrize("filename", WORLD_FILES)
+def test_free_distance_matches_backoff(filename):
+    walls = load_walls(filename)
+    rects = wall_rects(walls)
+    agent = Agent(0, 0, 0, walls)
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 800, 4000)
+    y = rng.uniform(0, 600, 4000)
+    free = ~circle_collisions(x, y, agent.body_radius, rects, arena_bounds())
+    x, y = x[free][:1000], y[free][:1000]
+    directions = rng.integers(0, 360, len(x))
+    forward = rng.random(len(x)) < 0.5
+
+    sign = np.where(forward, 1, -1)
+    dir_x = sign * np.cos(np.radians(directions))
+    dir_y = -sign * np.sin(np.radians(directions))
+    swept = free_distance(
+        x, y, dir_x, dir_y, agent.linear_speed, agent.body_radius, rects, arena_bounds()
+    )
+
+    compared = 0
+    for i in range(len(x)):
+        agent.x, agent.y, agent.direction = x[i], y[i], int(directions[i])
+        old = backoff_distance(agent, bool(forward[i]))
+        # The old loop only tested endpoints, so it could cut through the
+        # rounded corner of a wall that the sweep stops at
+        if clips_through_wall(agent, old, dir_x[i], dir_y[i], rects):
+            continue
+        assert swept[i] == pytest.approx(old, abs=0.1 + 1e-6)
+        compared += 1
+    assert compared >= 0.95 * len(x)
+
+
+def test_try_move_stops_at_wall():
+    agent = Agent(100, 300, 0, [Wall(125, 250, 50, 100)])
+    agent.try_move()
+    assert agent.x == pytest.approx(105, abs=1e-5)
+    assert not agent.bump_sensor
+    agent.try_move()
+    assert agent.x == pytest.approx(105, abs=1e-5)
+    assert agent.bump_sensor
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from agent import Agent
+from gym_env import SimulatorEnv
+from vector_env import FORWARD, ROTATE_LEFT, ROTATE_RIGHT
+
+
+@pytest.mark.parametrize("backend", ["numpy", "grid"])
+def test_observations_depend_only_on_pose(backend):
+    env = SimulatorEnv(num_lidar_beams=72, lidar_backend=backend, seed=0)
+    rng = np.random.default_rng(0)
+    actions = rng.choice(
+        [FORWARD, ROTATE_LEFT, ROTATE_RIGHT], size=200, p=[0.4, 0.3, 0.3]
+    )
+
+    env.reset(seed=3)
+    first = [env.step(action)[0]["lidar"].copy() for action in actions]
+    env.reset(seed=3)
+    for action, expected in zip(actions, first):
+        observation = env.step(action)[0]
+        np.testing.assert_array_equal(observation["lidar"], expected)
+        x, y, direction = observation["pose"]
+        fresh = Agent(
+            x, y, direction, env.agent.walls, num_lidar_beams=72, lidar_backend=backend
+        )
+        fresh.scan()
+        np.testing.assert_array_equal(observation["lidar"], fresh.lidar_ranges)
@@ -0,0 +1,43 @@
+import glob
+import json
+import numpy as np
+import pytest
+from agent import Agent
+from collision import circle_collisions, wall_rects
+from lidar import arena_bounds
+from wall import Wall
+from world_compiler import parse_world
+
+WORLD_FILES = sorted(glob.glob("worlds/*.json"))
+
+
+def load_walls(filename):
+    with open(filename) as f:
+        wall_data, _ = parse_world(json.load(f))
+    return [Wall.from_dict(data) for data in wall_data]
+
+
+def free_poses(walls, count, seed=0):
+    """Random poses whose body circle touches no wall or boundary."""
+    rng = np.random.default_rng(seed)
+    x = rng.uniform(0, 800, 20 * count)
+    y = rng.uniform(0, 600, 20 * count)
+    free = ~circle_collisions(x, y, 20, wall_rects(walls), arena_bounds())
+    directions = rng.integers(0, 72, free.sum()) * 5
+    return list(zip(x[free], y[free], directions.tolist()))[:count]
+
+
+@pytest.mark.parametrize("num_beams", [90, 360])
+@pytest.mark.parametrize("backend", ["numpy", "grid"])
+@pytest.mark.parametrize("filename", WORLD_FILES)
+def test_engine_matches_python_reference(filename, backend, num_beams):
+    walls = load_walls(filename)
+    reference = Agent(0, 0, 0, walls, num_lidar_beams=num_beams)
+    engine = Agent(0, 0, 0, walls, num_lidar_beams=num_beams, lidar_backend=backend)
+    for pose in free_poses(walls, 10):
+        for agent in (reference, engine):
+            agent.x, agent.y, agent.direction = pose
+            agent.scan()
+        np.testing.assert_allclose(
+            engine.lidar_ranges, reference.lidar_ranges, rtol=0, atol=1e-9
+        )
@@ -0,0 +1,44 @@
+import os
+import time
+
+import pytest
+
+import runner
+
+
+def fake_run_job(job):
+    """Stand-in for run_job: seed 1 hangs without yielding, seed 2 crashes."""
+    if job["seed"] == 1:
+        # A sleep with no alarm armed behaves like a job stuck in C code
+        time.sleep(60)
+    if job["seed"] == 2:
+        os._exit(1)
+    return dict(job, status="ok")
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    # Workers are forked, so they inherit the patched module
+    monkeypatch.setattr(runner, "run_job", fake_run_job)
+    monkeypatch.setattr(runner, "KILL_GRACE", 0.0)
+    monkeypatch.setattr(runner, "POLL_INTERVAL", 0.05)
+    return [
+        {"world": "w.json", "seed": seed, "controller": "c", "timeout": 1.0}
+        for seed in range(6)
+    ]
+
+
+def test_hung_job_is_killed_and_others_finish(jobs):
+    jobs = [job for job in jobs if job["seed"] != 2]
+    start = time.perf_counter()
+    results = runner.run_sweep(jobs, workers=2)
+    assert time.perf_counter() - start < 30
+    statuses = {r["seed"]: r["status"] for r in results}
+    assert statuses == {0: "ok", 1: "timeout", 3: "ok", 4: "ok", 5: "ok"}
+
+
+def test_crash_is_charged_to_the_crashing_job(jobs):
+    jobs = [job for job in jobs if job["seed"] != 1]
+    results = runner.run_sweep(jobs, workers=2)
+    statuses = {r["seed"]: r["status"] for r in results}
+    assert statuses == {0: "ok", 2: "crashed", 3: "ok", 4: "ok", 5: "ok"}
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from agent import Agent
+from vector_env import VectorEnv, FORWARD, BACKWARD, ROTATE_LEFT, ROTATE_RIGHT
+from world_compiler import load_world
+
+
+def lone_agents(env, reuse_rotated_scans):
+    agents = []
+    for i in range(env.num_agents):
+        agent = Agent(
+            env.x[i],
+            env.y[i],
+            env.direction[i],
+            env.walls,
+            num_lidar_beams=len(env.lidar_angles),
+            lidar_backend=env.lidar_backend,
+            reuse_rotated_scans=reuse_rotated_scans,
+        )
+        agent.scan()
+        agents.append(agent)
+    return agents
+
+
+def step_lone(agent, action):
+    moves = {
+        FORWARD: agent.move_forward,
+        BACKWARD: agent.move_backward,
+        ROTATE_LEFT: agent.rotate_left,
+        ROTATE_RIGHT: agent.rotate_right,
+    }
+    if action in moves:
+        moves[action]()
+    agent.scan()
+
+
+@pytest.mark.parametrize("backend", ["numpy", "grid"])
+def test_agents_match_lone_agents(backend):
+    env = VectorEnv(
+        8, load_world("worlds/test3.json"), num_lidar_beams=72, lidar_backend=backend, seed=0
+    )
+    env.reset()
+    agents = lone_agents(env, reuse_rotated_scans=False)
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        # Mostly turning, the case rotated scans would be reused in
+        actions = rng.choice(
+            [FORWARD, BACKWARD, ROTATE_LEFT, ROTATE_RIGHT], 8, p=[0.3, 0.1, 0.3, 0.3]
+        )
+        env.step(actions)
+        for i, agent in enumerate(agents):
+            step_lone(agent, actions[i])
+            assert (agent.x, agent.y, agent.direction) == pytest.approx(
+                (env.x[i], env.y[i], env.direction[i])
+            )
+            assert agent.bump_sensor == env.bump_sensor[i]
+            np.testing.assert_allclose(agent.lidar_ranges, env.lidar_ranges[i], atol=1e-9)
@@ -0,0 +1,112 @@
+import glob
+import json
+import os
+import numpy as np
+import pytest
+import world_compiler
+from agent import Agent
+from wall import Wall
+from world_compiler import CompiledWorld, pack_world, parse_world
+
+WORLD_FILES = sorted(glob.glob("worlds/*.json"))
+
+
+def free_poses(rects, bounds, count, seed=0):
+    """Random agent positions that are not inside or on any wall."""
+    rng = np.random.default_rng(seed)
+    left, top, right, bottom = bounds
+    poses = []
+    while len(poses) < count:
+        x, y = rng.uniform(left + 1, right - 1), rng.uniform(top + 1, bottom - 1)
+        inside = (
+            (rects[:, 0] - 1 <= x)
+            & (x <= rects[:, 2] + 1)
+            & (rects[:, 1] - 1 <= y)
+            & (y <= rects[:, 3] + 1)
+        )
+        if not inside.any():
+            poses.append((x, y, int(rng.integers(0, 8)) * 45))
+    return poses
+
+
+def reference_ranges(wall_data, x, y, direction, num_beams=90):
+    agent = Agent(
+        x, y, direction, [Wall.from_dict(d) for d in wall_data], num_lidar_beams=num_beams
+    )
+    agent.scan()
+    return np.array(agent.lidar_ranges)
+
+
+def compiled_ranges(world, backend, x, y, direction, num_beams=90):
+    agent = Agent(x, y, direction, world, num_lidar_beams=num_beams, lidar_backend=backend)
+    agent.scan()
+    return np.asarray(agent.lidar_ranges)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "grid"])
+@pytest.mark.parametrize("filename", WORLD_FILES)
+def test_compiled_world_matches_reference(filename, backend):
+    with open(filename) as f:
+        wall_data, bounds = parse_world(json.load(f))
+    world = CompiledWorld(pack_world(wall_data, bounds))
+    for x, y, direction in free_poses(world.rects, world.bounds, 10):
+        np.testing.assert_allclose(
+            compiled_ranges(world, backend, x, y, direction),
+            reference_ranges(wall_data, x, y, direction),
+            atol=1e-6,
+        )
+
+
+@pytest.mark.parametrize("backend", ["numpy", "grid"])
+def test_inside_out_wall_blocks_lidar(backend):
+    # Resizing a wall past its opposite side leaves a negative width
+    wall_data = [{"x": 300, "y": 200, "width": -100, "height": 50}]
+    world = CompiledWorld(pack_world(wall_data))
+    np.testing.assert_array_equal(world.rects, [[200, 200, 300, 250]])
+
+    ranges = compiled_ranges(world, backend, 250, 400, 90)
+    expected = reference_ranges(wall_data, 250, 400, 90)
+    assert expected[0] == pytest.approx(150.0)
+    np.testing.assert_allclose(ranges, expected, atol=1e-6)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "grid"])
+def test_overlapping_walls_match_reference(backend):
+    # Buried and merged sides are dropped from the outline
+    wall_data = [
+        {"x": 100, "y": 100, "width": 200, "height": 40},
+        {"x": 150, "y": 120, "width": 40, "height": 200},
+        {"x": 300, "y": 100, "width": 100, "height": 40},
+        {"x": 500, "y": 300, "width": -60, "height": -80},
+    ]
+    world = CompiledWorld(pack_world(wall_data))
+    assert world.removed_edges > 0
+    for x, y, direction in free_poses(world.rects, world.bounds, 20, seed=1):
+        np.testing.assert_allclose(
+            compiled_ranges(world, backend, x, y, direction),
+            reference_ranges(wall_data, x, y, direction),
+            atol=1e-6,
+        )
+
+
+def test_concurrent_loads_keep_the_current_sidecar(tmp_path, monkeypatch):
+    filename = tmp_path / "world.json"
+    filename.write_text(
+        json.dumps({"walls": [{"x": 100, "y": 100, "width": 50, "height": 50}]})
+    )
+    first = world_compiler.load_world(str(filename))
+    stale = str(tmp_path / f"world.{'0' * 16}.npy")
+    np.save(stale, np.asarray(first.packed))
+
+    # A second loader that checked before the first one wrote its sidecar
+    removed = []
+    remove = os.remove
+    monkeypatch.setattr(world_compiler.os.path, "exists", lambda path: False)
+    monkeypatch.setattr(
+        world_compiler.os, "remove", lambda path: (removed.append(path), remove(path))
+    )
+    second = world_compiler.load_world(str(filename))
+
+    assert removed == [stale]
+    assert second.path == first.path
+    np.testing.assert_array_equal(first.rects, second.rects)
@@ -0,0 +1,278 @@
+import argparse
+import time
+import numpy as np
+from world_compiler import load_world
+from lidar import arena_bounds, beam_endpoints, make_lidar
+from collision import circle_collisions, free_distance, wall_rects
+
+# Discrete actions, matching the moves available on Agent
+FORWARD = 0
+BACKWARD = 1
+ROTATE_LEFT = 2
+ROTATE_RIGHT = 3
+NOOP = -1
+
+
+class VectorEnv:
+    """
+    K independent agents sharing one world, stepped with batched array ops.
+
+    Poses, bump flags and LiDAR ranges are stored as arrays with one row per
+    agent. Every method applies Agent's per-agent rules to all agents at
+    once, so agent i of a VectorEnv behaves exactly like a lone Agent given
+    the same actions, provided that Agent is built with
+    reuse_rotated_scans=False. Otherwise its scans after turning in place
+    are rotated copies of earlier ones and can differ by a fraction of a
+    pixel.
+    """
+
+    def __init__(
+        self,
+        num_agents: int,
+        walls: list,
+        num_lidar_beams: int = 360,
+        lidar_backend: str = "grid",
+        bounds: tuple[float, float, float, float] | None = None,
+        seed: int | None = None,
+    ) -> None:
+        """
+        Initialize the VectorEnv.
+
+        Args:
+            num_agents (int): Number of agents K.
+            walls (list): List of Wall objects, or a CompiledWorld, shared
+                by every agent.
+            num_lidar_beams (int, optional): Number of LiDAR beams. Defaults to 360.
+            lidar_backend (str, optional): Name of an engine registered in
+                lidar.py. Defaults to "grid".
+            bounds (tuple, optional): (left, top, right, bottom) of the arena,
+                kept when the walls are replaced. Defaults to the bounds of
+                the current CompiledWorld, else the bounds in constants.py.
+            seed (int, optional): Seed for the placement generator.
+        """
+        self.num_agents = num_agents
+        self.linear_speed = 10
+        self.body_radius = 20
+        self.angular_speed = 5
+        self.lidar_max_range = 2000
+        self.lidar_angles = np.arange(num_lidar_beams) * (360 / num_lidar_beams)
+        self.lidar_backend = lidar_backend
+        # Bounds given here win over those of any world set later
+        self._given_bounds = tuple(bounds) if bounds is not None else None
+        self.rng = np.random.default_rng(seed)
+
+        self.x = np.zeros(num_agents)
+        self.y = np.zeros(num_agents)
+        self.direction = np.zeros(num_agents)
+        self.bump_sensor = np.zeros(num_agents, dtype=bool)
+        self.lidar_ranges = np.full(
+            (num_agents, num_lidar_beams), float(self.lidar_max_range)
+        )
+        self.max_rays = 1 << 16
+        self.walls = walls
+
+    @property
+    def walls(self) -> list:
+        """Walls shared by every agent, a list of Wall objects or a CompiledWorld."""
+        return self._walls
+
+    @walls.setter
+    def walls(self, walls: list) -> None:
+        self._walls = walls
+        if self._given_bounds is not None:
+            self.bounds = self._given_bounds
+        elif hasattr(walls, "bounds"):
+            self.bounds = tuple(walls.bounds)
+        else:
+            self.bounds = arena_bounds()
+        self._lidar = make_lidar(self.lidar_backend, walls, self.bounds)
+        self._rects = wall_rects(walls)
+
+    @classmethod
+    def from_file(cls, filename: str, num_agents: int, **kwargs) -> "VectorEnv":
+        """
+        Build a VectorEnv from a world JSON file.
+
+        Args:
+            filename (str): Path of the world file.
+            num_agents (int): Number of agents K.
+            **kwargs: Forwarded to the constructor.
+
+        Returns:
+            VectorEnv: The new environment.
+        """
+        return cls(num_agents, load_world(filename), **kwargs)
+
+    def reset(self) -> None:
+        """
+        Place every agent at a random collision-free pose and scan.
+
+        Headings are multiples of 45 degrees, the set RandomController steers
+        between.
+        """
+        left, top, right, bottom = self.bounds
+        radius = self.body_radius
+        pending = np.arange(self.num_agents)
+        for _ in range(1000):
+            self.x[pending] = self.rng.uniform(left + radius, right - radius, pending.size)
+            self.y[pending] = self.rng.uniform(top + radius, bottom - radius, pending.size)
+            pending = pending[self.detect_collision(self.x[pending], self.y[pending])]
+            if not pending.size:
+                break
+        else:
+            raise RuntimeError("Could not find a free spot for every agent")
+        self.direction[:] = self.rng.integers(0, 8, self.num_agents) * 45
+        self.bump_sensor[:] = False
+        self.scan()
+
+    def scan(self) -> None:
+        """
+        Perform a LiDAR scan for every agent.
+
+        Updates lidar_ranges with one row of distances per agent.
+        """
+        chunk = max(self.max_rays // len(self.lidar_angles), 1)
+        for i in range(0, self.num_agents, chunk):
+            rows = slice(i, i + chunk)
+            start_x, start_y, end_x, end_y = beam_endpoints(
+                self.x[rows],
+                self.y[rows],
+                self.direction[rows],
+                self.lidar_angles,
+                self.lidar_max_range,
+            )
+            nearest = self._lidar.cast(
+                start_x.ravel(), start_y.ravel(), end_x.ravel(), end_y.ravel()
+            ).reshape(end_x.shape)
+            lengths = np.hypot(end_x - start_x, end_y - start_y)
+            np.minimum(nearest * lengths, self.lidar_max_range, out=self.lidar_ranges[rows])
+
+    def detect_collision(self, next_x: np.ndarray, next_y: np.ndarray) -> np.ndarray:
+        """
+        Detect which agents would collide at the given positions.
+
+        Args:
+            next_x (np.ndarray): Candidate x-coordinates, one per agent.
+            next_y (np.ndarray): Candidate y-coordinates, one per agent.
+
+        Returns:
+            np.ndarray: Boolean array, True where a collision is detected.
+        """
+        return circle_collisions(
+            next_x, next_y, self.body_radius, self._rects, self.bounds
+        )
+
+    def try_move(self, agents: np.ndarray, move_forward: np.ndarray) -> None:
+        """
+        Attempt to move a set of agents, stopping at the first contact.
+
+        Follows Agent.try_move: each agent travels the largest collision-free
+        distance up to linear_speed, and agents that cannot move at all get
+        their bump sensor set.
+
+        Args:
+            agents (np.ndarray): Indices of the agents to move.
+            move_forward (np.ndarray): Per-agent flags, True to move forward
+                and False to move backward.
+        """
+        sign = np.where(move_forward, 1.0, -1.0)
+        heading = np.radians(self.direction[agents])
+        dir_x = sign * np.cos(heading)
+        dir_y = -sign * np.sin(heading)
+        distance = free_distance(
+            self.x[agents],
+            self.y[agents],
+            dir_x,
+            dir_y,
+            self.linear_speed,
+            self.body_radius,
+            self._rects,
+            self.bounds,
+        )
+        self.x[agents] += distance * dir_x
+        self.y[agents] += distance * dir_y
+        self.bump_sensor[agents] = distance <= 0
+
+    def rotate(self, agents: np.ndarray, sign: float) -> None:
+        """
+        Rotate a set of agents by angular_speed.
+
+        Args:
+            agents (np.ndarray): Indices of the agents to rotate.
+            sign (float): 1 to rotate left, -1 to rotate right.
+        """
+        self.direction[agents] = (
+            self.direction[agents] + sign * self.angular_speed
+        ) % 360
+        self.bump_sensor[agents] = False
+
+    def step(self, actions: np.ndarray) -> None:
+        """
+        Apply one action per agent, then scan.
+
+        Args:
+            actions (np.ndarray): (K,) array of FORWARD, BACKWARD, ROTATE_LEFT,
+                ROTATE_RIGHT or NOOP.
+        """
+        actions = np.asarray(actions)
+        moving = np.flatnonzero((actions == FORWARD) | (actions == BACKWARD))
+        if moving.size:
+            self.try_move(moving, actions[moving] == FORWARD)
+        self.rotate(np.flatnonzero(actions == ROTATE_LEFT), 1)
+        self.rotate(np.flatnonzero(actions == ROTATE_RIGHT), -1)
+        self.scan()
+
+    def run(self, steps: int, policy=None) -> dict:
+        """
+        Step every agent a number of times and measure throughput.
+
+        Args:
+            steps (int): Number of steps to run.
+            policy (callable, optional): Called with the env, returns a (K,)
+                action array. Defaults to uniformly random actions.
+
+        Returns:
+            dict: Elapsed seconds and agent-steps per second.
+        """
+        if policy is None:
+            policy = lambda env: env.rng.integers(0, 4, env.num_agents)
+
+        start = time.perf_counter()
+        for _ in range(steps):
+            self.step(policy(self))
+        elapsed = time.perf_counter() - start
+        return {
+            "agents": self.num_agents,
+            "steps": steps,
+            "seconds": elapsed,
+            "agent_steps_per_sec": self.num_agents * steps / elapsed,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the batched environment.")
+    parser.add_argument("--world", default="worlds/test3.json")
+    parser.add_argument("--agents", type=int, default=1000)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--beams", type=int, default=360)
+    parser.add_argument("--backend", default="grid")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    env = VectorEnv.from_file(
+        args.world,
+        args.agents,
+        num_lidar_beams=args.beams,
+        lidar_backend=args.backend,
+        seed=args.seed,
+    )
+    env.reset()
+    stats = env.run(args.steps)
+    print(
+        f"{stats['agents']} agents x {stats['steps']} steps in "
+        f"{stats['seconds']:.2f} s: {stats['agent_steps_per_sec']:.0f} agent-steps/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
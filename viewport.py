@@ -0,0 +1,168 @@
+import pygame
+
+
+class Viewport:
+    """
+    Camera showing part of a world that may be larger than the screen area.
+
+    The view follows a target with a dead zone: it only scrolls once the
+    target leaves the middle of the view, and never past the world bounds.
+    While the target moves inside the dead zone the view stays put, so
+    cached drawings of the world remain valid.
+
+    The view can also be panned and zoomed by hand, as in the environment
+    builder. At a zoom other than 1, use to_screen_rect and to_world to
+    convert positions instead of offset.
+    """
+
+    def __init__(
+        self,
+        screen_rect: pygame.Rect,
+        bounds: tuple[float, float, float, float],
+        dead_zone: float = 0.3,
+        min_zoom: float = 0.05,
+        max_zoom: float = 8.0,
+    ) -> None:
+        """
+        Initialize the Viewport.
+
+        Args:
+            screen_rect (pygame.Rect): Area of the screen the view is drawn in.
+            bounds (tuple): (left, top, right, bottom) of the world.
+            dead_zone (float, optional): Fraction of the view's width and
+                height on each side that triggers scrolling when the target
+                enters it. Defaults to 0.3.
+            min_zoom (float, optional): Smallest zoom zoom_at allows. Defaults to 0.05.
+            max_zoom (float, optional): Largest zoom zoom_at allows. Defaults to 8.
+        """
+        self.screen_rect = pygame.Rect(screen_rect)
+        self.dead_zone = dead_zone
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        # Screen pixels per world unit
+        self.zoom = 1
+        self.left = 0
+        self.top = 0
+        self.set_bounds(bounds)
+
+    def set_bounds(self, bounds: tuple[float, float, float, float]) -> None:
+        """
+        Switch to a world with other bounds, showing its top-left corner.
+
+        Args:
+            bounds (tuple): (left, top, right, bottom) of the world.
+        """
+        self.bounds = tuple(bounds)
+        self.left, self.top = int(bounds[0]), int(bounds[1])
+        self._clamp()
+
+    @property
+    def offset(self) -> tuple[int, int]:
+        """World position drawn at the screen origin: screen = world - offset."""
+        return self.left - self.screen_rect.x, self.top - self.screen_rect.y
+
+    def rect(self) -> tuple[int, int, int, int]:
+        """
+        Get the part of the world in view.
+
+        Returns:
+            tuple: (left, top, right, bottom) in world coordinates.
+        """
+        width, height = self.view_size()
+        return self.left, self.top, self.left + width, self.top + height
+
+    def view_size(self) -> tuple[float, float]:
+        """Get the width and height of the view in world units."""
+        if self.zoom == 1:
+            return self.screen_rect.width, self.screen_rect.height
+        return self.screen_rect.width / self.zoom, self.screen_rect.height / self.zoom
+
+    def to_world(self, pos: tuple[float, float]) -> tuple[float, float]:
+        """Convert a screen position to a world position."""
+        return (
+            self.left + (pos[0] - self.screen_rect.x) / self.zoom,
+            self.top + (pos[1] - self.screen_rect.y) / self.zoom,
+        )
+
+    def to_screen_rect(
+        self, left: float, top: float, right: float, bottom: float
+    ) -> pygame.Rect:
+        """
+        Convert a world rectangle to the screen rectangle it is drawn at.
+
+        Args:
+            left (float): Left side in world coordinates.
+            top (float): Top side in world coordinates.
+            right (float): Right side in world coordinates.
+            bottom (float): Bottom side in world coordinates.
+
+        Returns:
+            pygame.Rect: The rectangle on screen, with its sides rounded so
+                that rectangles sharing a side in the world share it on screen.
+        """
+        x0 = round((left - self.left) * self.zoom) + self.screen_rect.x
+        y0 = round((top - self.top) * self.zoom) + self.screen_rect.y
+        x1 = round((right - self.left) * self.zoom) + self.screen_rect.x
+        y1 = round((bottom - self.top) * self.zoom) + self.screen_rect.y
+        return pygame.Rect(x0, y0, x1 - x0, y1 - y0)
+
+    def center_on(self, x: float, y: float) -> None:
+        """Center the view on a world position, within the world bounds."""
+        width, height = self.view_size()
+        self.left = int(x - width / 2)
+        self.top = int(y - height / 2)
+        self._clamp()
+
+    def pan(self, dx: float, dy: float) -> None:
+        """Drag the world across the view by dx, dy screen pixels."""
+        self.left -= dx / self.zoom
+        self.top -= dy / self.zoom
+        self._clamp()
+
+    def zoom_at(self, factor: float, pos: tuple[float, float]) -> None:
+        """
+        Zoom in or out, keeping the world position under a screen position fixed.
+
+        Args:
+            factor (float): Multiplier of the zoom, above 1 to zoom in.
+            pos (tuple): Screen position to zoom around, e.g. the mouse.
+        """
+        x, y = self.to_world(pos)
+        self.zoom = min(max(self.zoom * factor, self.min_zoom), self.max_zoom)
+        self.left = x - (pos[0] - self.screen_rect.x) / self.zoom
+        self.top = y - (pos[1] - self.screen_rect.y) / self.zoom
+        self._clamp()
+
+    def follow(self, x: float, y: float) -> bool:
+        """
+        Scroll just enough to keep a world position out of the dead zone.
+
+        Args:
+            x (float): x-coordinate of the target.
+            y (float): y-coordinate of the target.
+
+        Returns:
+            bool: True if the view moved.
+        """
+        previous = (self.left, self.top)
+        width, height = self.view_size()
+        margin_x = int(width * self.dead_zone)
+        margin_y = int(height * self.dead_zone)
+        x, y = int(x), int(y)
+        if x < self.left + margin_x:
+            self.left = x - margin_x
+        elif x > self.left + width - margin_x:
+            self.left = int(x - width + margin_x)
+        if y < self.top + margin_y:
+            self.top = y - margin_y
+        elif y > self.top + height - margin_y:
+            self.top = int(y - height + margin_y)
+        self._clamp()
+        return (self.left, self.top) != previous
+
+    def _clamp(self) -> None:
+        """Keep the view inside the world, pinned to its top-left if smaller."""
+        left, top, right, bottom = (int(v) for v in self.bounds)
+        width, height = self.view_size()
+        self.left = max(left, min(self.left, right - width))
+        self.top = max(top, min(self.top, bottom - height))
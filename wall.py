@@ -65,20 +65,25 @@ class Wall:
 
         return min_distance if min_distance != float("inf") else None
 
-    def draw(self, screen):
-        pygame.draw.rect(screen, BROWN, self.rect)  # Fill the wall with brown
+    def draw(self, screen, rect=None):
+        # rect is where the wall appears on screen if the view is scrolled or zoomed
+        rect = self.rect if rect is None else rect
+        # Draw the edges as a filled rect with the brown fill inset by their
+        # width, which looks the same as a 2 pixel border but stays correct
+        # when the wall is only partly inside the clip area
         edge_color = BLUE if self.selected else BLACK
-        pygame.draw.rect(screen, edge_color, self.rect, 2)  # Draw edges
+        pygame.draw.rect(screen, edge_color, rect)
+        pygame.draw.rect(screen, BROWN, rect.inflate(-4, -4))
         if self.selected:
-            self.draw_handles(screen)
+            self.draw_handles(screen, rect)
 
-    def draw_handles(self, screen):
-        handles = self.get_handles()
+    def draw_handles(self, screen, rect=None):
+        handles = self.get_handles(rect)
         for handle in handles:
             pygame.draw.rect(screen, GREEN, handle)
 
-    def get_handles(self):
-        x, y, w, h = self.rect
+    def get_handles(self, rect=None):
+        x, y, w, h = self.rect if rect is None else rect
         hs = self.HANDLE_SIZE
         return [
             pygame.Rect(x, y, hs, hs),  # Top-left
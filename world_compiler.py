@@ -0,0 +1,387 @@
+"""
+Compile world JSON files into binary sidecars of packed geometry arrays.
+
+Usage:
+    python world_compiler.py worlds/*.json
+"""
+
+import os
+import argparse
+import contextlib
+import glob
+import hashlib
+import json
+import time
+import numpy as np
+from wall import Wall
+from spatial_index import EdgeGrid
+from constants import (
+    LEFT_BOUNDARY,
+    RIGHT_BOUNDARY,
+    TOP_BOUNDARY,
+    BOTTOM_BOUNDARY,
+)
+
+# Bump when the packed layout changes so old sidecars are recompiled
+SIDECAR_VERSION = 3
+
+
+class CompiledWorld:
+    """
+    Wall geometry of a world held as arrays instead of Wall objects.
+
+    Everything lives in one (2 + N + E, 4) float64 array, normally
+    memory-mapped from a sidecar file:
+
+        row 0          [number of walls N, SIDECAR_VERSION, number of edges E, 0]
+        row 1          bounds (left, top, right, bottom)
+        next N rows    wall rectangles [left, top, right, bottom]
+        next E rows    outline edges [x1, y1, x2, y2], see outline_edges
+
+    rects and edges are views into it, so loading costs no copies. They are
+    what wall_rects and wall_edges return for a CompiledWorld, so Agent,
+    VectorEnv and the LiDAR engines can use it in place of a wall list.
+    Iterating yields Wall objects, built on first use, for drawing and the
+    reference code paths.
+    """
+
+    def __init__(self, packed: np.ndarray, path: str | None = None) -> None:
+        """
+        Initialize the CompiledWorld.
+
+        Args:
+            packed (np.ndarray): Packed array in the layout above.
+            path (str, optional): Sidecar file the array was loaded from.
+        """
+        num_walls, version = int(packed[0, 0]), int(packed[0, 1])
+        if version != SIDECAR_VERSION:
+            raise ValueError(f"Unsupported compiled world version {version}")
+        num_edges = int(packed[0, 2])
+        self.packed = packed
+        self.path = path
+        self.bounds = tuple(float(v) for v in packed[1])
+        self.rects = packed[2 : 2 + num_walls]
+        self.edges = packed[2 + num_walls : 2 + num_walls + num_edges]
+        self._walls: list[Wall] | None = None
+
+    @property
+    def removed_edges(self) -> int:
+        """Number of the walls' 4N edges dropped or merged by outline_edges."""
+        return 4 * len(self.rects) - len(self.edges)
+
+    def __len__(self) -> int:
+        return len(self.rects)
+
+    def __iter__(self):
+        return iter(self.walls)
+
+    def __getitem__(self, index):
+        return self.walls[index]
+
+    @property
+    def walls(self) -> list[Wall]:
+        """Wall objects for the world, built on first access."""
+        if self._walls is None:
+            self._walls = [
+                Wall(left, top, right - left, bottom - top)
+                for left, top, right, bottom in self.rects.astype(int).tolist()
+            ]
+        return self._walls
+
+
+def _touching_pairs(rects: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Find every ordered pair of distinct rectangles that overlap or touch.
+
+    Rectangles are bucketed into an EdgeGrid by their boxes, with cells
+    about the size of a typical rectangle, and paired within each cell.
+
+    Args:
+        rects (np.ndarray): (N, 4) array of [left, top, right, bottom].
+
+    Returns:
+        tuple: (i, j) index arrays, with both (i, j) and (j, i) present.
+    """
+    sizes = np.maximum(rects[:, 2] - rects[:, 0], rects[:, 3] - rects[:, 1])
+    bounds = (
+        rects[:, 0].min(),
+        rects[:, 1].min(),
+        rects[:, 2].max(),
+        rects[:, 3].max(),
+    )
+    grid = EdgeGrid(rects, bounds, max(float(np.median(sizes)), 1.0))
+    entry_cells = np.repeat(np.arange(grid.nx * grid.ny), np.diff(grid.cell_start))
+    owners, j = grid.gather(entry_cells)
+    i = grid.cell_edges[owners]
+    touching = (
+        (i != j)
+        & (rects[i, 0] <= rects[j, 2])
+        & (rects[j, 0] <= rects[i, 2])
+        & (rects[i, 1] <= rects[j, 3])
+        & (rects[j, 1] <= rects[i, 3])
+    )
+    pairs = np.unique(i[touching] * len(rects) + j[touching])
+    return pairs // len(rects), pairs % len(rects)
+
+
+def _subtract_intervals(start: float, end: float, covers: list) -> list:
+    """
+    Remove covered stretches from the interval [start, end].
+
+    Args:
+        start (float): Start of the interval.
+        end (float): End of the interval.
+        covers (list): (start, end) stretches to remove.
+
+    Returns:
+        list: (start, end) pieces of the interval left uncovered.
+    """
+    pieces = []
+    for cover_start, cover_end in sorted(covers):
+        if cover_start > start:
+            pieces.append((start, cover_start))
+        start = max(start, cover_end)
+    if end > start:
+        pieces.append((start, end))
+    return pieces
+
+
+def outline_edges(rects: np.ndarray) -> np.ndarray:
+    """
+    Get the edges of the outline of the union of wall rectangles.
+
+    A stretch of a wall's side is dropped when another wall covers the area
+    just outside it: no beam starting outside the walls can reach it
+    without crossing the outline first. The remaining stretches on each
+    line are merged, so touching and overlapping walls share one outline
+    edge instead of several overlapping ones. Because the coordinates are
+    integers, the beam parameter of a hit on a merged edge is the same
+    float as on the piece it replaces, and LiDAR ranges do not change.
+
+    Args:
+        rects (np.ndarray): (N, 4) array of [left, top, right, bottom].
+
+    Returns:
+        np.ndarray: (E, 4) array of [x1, y1, x2, y2] edges, oriented like
+            Wall.edges.
+    """
+    if not len(rects):
+        return np.empty((0, 4), dtype=np.float64)
+    left, top, right, bottom = rects.T
+    i, j = _touching_pairs(rects)
+
+    # Whether wall j covers the area just outside each side of wall i
+    above = (top[j] < top[i]) & (top[i] <= bottom[j])
+    right_of = (left[j] <= right[i]) & (right[i] < right[j])
+    below = (top[j] <= bottom[i]) & (bottom[i] < bottom[j])
+    left_of = (left[j] < left[i]) & (left[i] <= right[j])
+
+    # Each side as its line, its stretch along the line, which walls cover
+    # it and the output order of line coordinate c and stretch ends a, b
+    sides = [
+        (top, left, right, above, "acbc"),
+        (right, top, bottom, right_of, "cacb"),
+        (bottom, left, right, below, "bcac"),
+        (left, top, bottom, left_of, "cbca"),
+    ]
+    edges = []
+    for line, start, end, outside, order in sides:
+        lo = np.maximum(start[i], start[j])
+        hi = np.minimum(end[i], end[j])
+        covering = outside & (hi > lo)
+        covers = {}
+        for wall, cover_lo, cover_hi in zip(
+            i[covering].tolist(), lo[covering].tolist(), hi[covering].tolist()
+        ):
+            covers.setdefault(wall, []).append((cover_lo, cover_hi))
+
+        # Sides with covered stretches are cut up, the rest are kept whole
+        whole = np.ones(len(rects), dtype=bool)
+        whole[list(covers)] = False
+        pieces = [
+            (line[wall], piece_start, piece_end)
+            for wall, stretches in covers.items()
+            for piece_start, piece_end in _subtract_intervals(
+                start[wall], end[wall], stretches
+            )
+        ]
+        cut = np.array(pieces, dtype=np.float64).reshape(-1, 3)
+        c, a, b = _merge_stretches(
+            np.concatenate([line[whole], cut[:, 0]]),
+            np.concatenate([start[whole], cut[:, 1]]),
+            np.concatenate([end[whole], cut[:, 2]]),
+        )
+        values = {"a": a, "b": b, "c": c}
+        edges.append(np.stack([values[key] for key in order], axis=1))
+
+    return np.concatenate(edges)
+
+
+def _merge_stretches(
+    line: np.ndarray, start: np.ndarray, end: np.ndarray
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Merge overlapping and touching stretches that lie on the same line.
+
+    Args:
+        line (np.ndarray): Coordinate of the line each stretch lies on.
+        start (np.ndarray): Start of each stretch along its line.
+        end (np.ndarray): End of each stretch along its line.
+
+    Returns:
+        tuple: (line, start, end) of the merged stretches, without empty ones.
+    """
+    if not len(line):
+        return line, start, end
+    order = np.lexsort((start, line))
+    line, start, end = line[order], start[order], end[order]
+    new_line = np.ones(len(line), dtype=bool)
+    new_line[1:] = line[1:] != line[:-1]
+
+    # Furthest end reached so far on each line. Lines are offset by more
+    # than the coordinate range so one cumulative max serves all of them
+    span = end.max() - start.min() + 1
+    offset = (np.cumsum(new_line) - 1) * span
+    reach = np.maximum.accumulate(end - start.min() + offset) - offset + start.min()
+
+    run_start = new_line.copy()
+    run_start[1:] |= start[1:] > reach[:-1]
+    runs = np.flatnonzero(run_start)
+    line, start, end = line[runs], start[runs], np.maximum.reduceat(end, runs)
+    keep = end > start
+    return line[keep], start[keep], end[keep]
+
+
+def pack_world(
+    wall_data: list, bounds: tuple[float, float, float, float] | None = None
+) -> np.ndarray:
+    """
+    Pack wall dicts into the CompiledWorld layout.
+
+    Coordinates are truncated to integers the way pygame.Rect does, so the
+    rectangles match what Wall objects would produce. Walls with a negative
+    width or height, as left by resizing a wall inside out in the editor,
+    are stored with their sides in the usual order. The edges are the
+    outline from outline_edges rather than all four sides of every wall.
+
+    Args:
+        wall_data (list): Dicts with x, y, width and height, as stored in
+            world JSON files.
+        bounds (tuple, optional): (left, top, right, bottom) of the arena.
+            Defaults to the bounds in constants.py.
+
+    Returns:
+        np.ndarray: (2 + N + E, 4) float64 array.
+    """
+    if bounds is None:
+        bounds = (LEFT_BOUNDARY, TOP_BOUNDARY, RIGHT_BOUNDARY, BOTTOM_BOUNDARY)
+    boxes = np.trunc(
+        np.array(
+            [[d["x"], d["y"], d["width"], d["height"]] for d in wall_data],
+            dtype=np.float64,
+        ).reshape(-1, 4)
+    )
+    x0, y0 = boxes[:, 0], boxes[:, 1]
+    x1, y1 = x0 + boxes[:, 2], y0 + boxes[:, 3]
+    left, right = np.minimum(x0, x1), np.maximum(x0, x1)
+    top, bottom = np.minimum(y0, y1), np.maximum(y0, y1)
+
+    rects = np.stack([left, top, right, bottom], axis=1)
+    edges = outline_edges(rects)
+
+    num_walls = len(rects)
+    packed = np.zeros((2 + num_walls + len(edges), 4))
+    packed[0, :3] = num_walls, SIDECAR_VERSION, len(edges)
+    packed[1] = bounds
+    packed[2 : 2 + num_walls] = rects
+    packed[2 + num_walls :] = edges
+    return packed
+
+
+def parse_world(data) -> tuple[list, tuple[float, float, float, float] | None]:
+    """
+    Split the contents of a world JSON file into walls and arena bounds.
+
+    World files are either a plain list of wall dicts, which use the default
+    arena, or {"bounds": [left, top, right, bottom], "walls": [...]}.
+
+    Args:
+        data: Parsed JSON of a world file.
+
+    Returns:
+        tuple: (wall_data, bounds) with bounds None if the file has none.
+    """
+    if isinstance(data, dict):
+        bounds = data.get("bounds")
+        return data["walls"], tuple(bounds) if bounds is not None else None
+    return data, None
+
+
+def sidecar_path(filename: str, digest: str) -> str:
+    """Path of the sidecar for a world file with the given content hash."""
+    stem, _ = os.path.splitext(filename)
+    return f"{stem}.{digest}.npy"
+
+
+def load_world(filename: str) -> CompiledWorld:
+    """
+    Load a world JSON file through its compiled sidecar.
+
+    The sidecar sits next to the JSON file and is named after a hash of the
+    file contents and the layout version. If it is missing or out of date
+    the JSON is compiled and the sidecar written, replacing older sidecars
+    of the same world. The sidecar is then opened with
+    np.load(mmap_mode="r"), so nothing is parsed or copied.
+
+    Args:
+        filename (str): Path of the world JSON file.
+
+    Returns:
+        CompiledWorld: The world geometry.
+    """
+    with open(filename, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content + f"v{SIDECAR_VERSION}".encode()).hexdigest()[:16]
+    path = sidecar_path(filename, digest)
+
+    if not os.path.exists(path):
+        packed = pack_world(*parse_world(json.loads(content)))
+        try:
+            stem, _ = os.path.splitext(filename)
+            for stale in glob.glob(glob.escape(stem) + ".*.npy"):
+                # Another loader may have written the current sidecar or
+                # removed a stale one since the check above
+                if stale != path and len(os.path.basename(stale)) == len(
+                    os.path.basename(path)
+                ):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(stale)
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as f:
+                np.save(f, packed)
+            os.replace(temporary, path)
+        except OSError:
+            # Read-only location, use the compiled arrays without caching
+            return CompiledWorld(packed)
+
+    return CompiledWorld(np.load(path, mmap_mode="r"), path)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("worlds", nargs="+")
+    args = parser.parse_args()
+
+    for filename in args.worlds:
+        start = time.perf_counter()
+        world = load_world(filename)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{filename}: {len(world)} walls, {len(world.edges)} edges "
+            f"({world.removed_edges} of {4 * len(world)} removed) "
+            f"-> {world.path} ({elapsed * 1e3:.2f} ms)"
+        )
+
+
+if __name__ == "__main__":
+    main()